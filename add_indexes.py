@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Create indexes on existing tables
+(models.Base.metadata.create_all only creates indexes for tables it creates)
+"""
+
+import sys
+import logging
+from sqlalchemy import text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEXES = [
+    # Keyset pagination of invoice and return lists, newest first
+    "CREATE INDEX IF NOT EXISTS ix_invoices_created_at_id ON invoices (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_returns_created_at_id ON returns (created_at, id)",
+    # Store-day range filters (created_at >= start AND created_at < end) in the cash register
+    # and reports also use the two indexes above; cash_register.date is indexed in the model
+    "CREATE INDEX IF NOT EXISTS ix_cash_expenses_cash_register_id ON cash_expenses (cash_register_id)",
+    # Top products: per-product totals over a date range straight from the index (index-only scan)
+    "CREATE INDEX IF NOT EXISTS ix_product_daily_sales_date_covering ON product_daily_sales (store_code, sales_date) "
+    "INCLUDE (product_id, quantity_sold, times_sold, revenue, net_revenue, cost, "
+    "returned_quantity, returns_amount, returns_net, return_cost)",
+    # Inventory aging: in-stock items by last sale (or receipt, if never sold), oldest first
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_aging ON inventory_items "
+    "((COALESCE(last_sold_at, created_at))) WHERE quantity > 0",
+    # Items of a product (product pages, search by product name)
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_product_id ON inventory_items (product_id)",
+    # Case-insensitive prefix search, read in order (lower(col) COLLATE "C" LIKE 'abc%' ORDER BY ...)
+    'CREATE INDEX IF NOT EXISTS ix_inventory_items_barcode_prefix ON inventory_items ((lower(barcode) COLLATE "C"))',
+    'CREATE INDEX IF NOT EXISTS ix_inventory_items_design_number_prefix ON inventory_items ((lower(design_number) COLLATE "C"), id)',
+    'CREATE INDEX IF NOT EXISTS ix_inventory_items_color_prefix ON inventory_items ((lower(color) COLLATE "C"), id)',
+]
+
+# Trigram indexes for /inventory/search (fuzzy matching, product name substrings).
+# Kept separate: pg_trgm may not be installable on every database.
+TRIGRAM_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_barcode_trgm ON inventory_items USING gin (barcode gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_design_number_trgm ON inventory_items USING gin (design_number gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_color_trgm ON inventory_items USING gin (color gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+]
+
+def add_indexes():
+    """Create any missing indexes"""
+    try:
+        from database import SessionLocal
+        
+        logger.info("🔧 Checking indexes...")
+        
+        db = SessionLocal()
+        try:
+            for statement in INDEXES:
+                db.execute(text(statement))
+            db.commit()
+            
+            try:
+                for statement in TRIGRAM_INDEXES:
+                    db.execute(text(statement))
+                db.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Trigram search indexes not created (inventory search will be slower): {e}")
+                db.rollback()
+            
+            logger.info("✅ Indexes are up to date")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error creating indexes: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+            
+    except Exception as e:
+        logger.error(f"❌ Database connection error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_indexes()
+    if success:
+        print("✅ Database migration completed successfully")
+    else:
+        print("❌ Database migration failed")
+        sys.exit(1)
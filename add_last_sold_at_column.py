@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Add last_sold_at column to inventory_items table
+(backfilled from the latest invoice line of each item)
+"""
+
+import os
+import sys
+import logging
+from sqlalchemy import text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def add_last_sold_at_column():
+    """Add last_sold_at column to inventory_items table"""
+    try:
+        from database import engine, SessionLocal
+        
+        logger.info("🔧 Adding last_sold_at column to inventory_items table...")
+        
+        db = SessionLocal()
+        try:
+            # Check if last_sold_at column exists
+            result = db.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'inventory_items' AND column_name = 'last_sold_at'
+            """))
+            
+            if result.fetchone():
+                logger.info("✅ last_sold_at column already exists")
+                return True
+            else:
+                # Add the column and fill it from sales history in one pass
+                db.execute(text("""
+                    ALTER TABLE inventory_items 
+                    ADD COLUMN last_sold_at TIMESTAMP WITH TIME ZONE
+                """))
+                db.execute(text("""
+                    UPDATE inventory_items AS i
+                    SET last_sold_at = s.last_sold_at
+                    FROM (
+                        SELECT inventory_item_id, max(created_at) AS last_sold_at
+                        FROM invoice_items
+                        GROUP BY inventory_item_id
+                    ) s
+                    WHERE s.inventory_item_id = i.id
+                """))
+                db.commit()
+                logger.info("✅ last_sold_at column added successfully")
+                return True
+                
+        except Exception as e:
+            logger.error(f"❌ Error adding last_sold_at column: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+            
+    except Exception as e:
+        logger.error(f"❌ Database connection error: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = add_last_sold_at_column()
+    if success:
+        print("✅ Database migration completed successfully")
+    else:
+        print("❌ Database migration failed")
+        sys.exit(1)
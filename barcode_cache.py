@@ -0,0 +1,90 @@
+"""
+Barcode Cache
+In-process LRU/TTL cache of barcode -> inventory item (with product) used by the
+scanner lookups. Writers (checkout, returns, inventory changes) invalidate the
+barcodes they touch. Each worker process has its own cache; the TTL bounds how
+long another worker can serve a stale stock figure.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Iterable, Dict, Any
+
+from config import settings
+
+class BarcodeCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # barcode -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a lookup that raced with a write can't cache stale data
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Return the cached item for a barcode, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(barcode)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[barcode]
+            self.misses += 1
+            return None
+
+    def epoch(self) -> int:
+        """Current invalidation epoch; read it before loading from the database"""
+        return self._epoch
+
+    def set(self, barcode: str, value: Dict[str, Any], epoch: int):
+        """Cache a value loaded at the given epoch, unless something was invalidated since"""
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._entries[barcode] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(barcode)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, barcodes: Iterable[str]):
+        """Drop the given barcodes from the cache"""
+        with self._lock:
+            self._epoch += 1
+            for barcode in barcodes:
+                if self._entries.pop(barcode, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# Global barcode cache instance
+barcode_cache = BarcodeCache(
+    max_entries=settings.BARCODE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.BARCODE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Checkout load test
+Seeds a scaled catalog (create_demo_data.create_scaled_inventory), then drives
+concurrent /checkout/ requests through the FastAPI app in-process and reports
+throughput, p50/p95/p99 latency and database queries per checkout.
+
+Exits non-zero when a checkout fails, when queries per checkout exceed the
+budget, or when latency/throughput regress against a saved baseline.
+
+The app relies on PostgreSQL features (unnest, SKIP LOCKED, generate_series),
+so point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_checkout.py
+    DATABASE_URL=... python benchmarks/bench_checkout.py --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+
+import main
+import models
+import database
+import auth
+from create_demo_data import create_scaled_inventory
+
+# Queries one checkout may issue (auth user lookup + sale); raise deliberately, not by accident
+MAX_QUERIES_PER_CHECKOUT = 14
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "checkout_baseline.json")
+
+class QueryCounter:
+    """Counts statements sent to the database while enabled"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.enabled = False
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        if self.enabled:
+            with self._lock:
+                self.count += 1
+
+def bench_headers():
+    """Bearer token for a benchmark cashier (created on first run)"""
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == "bench_cashier").first()
+        if user is None:
+            user = models.User(
+                username="bench_cashier",
+                email="bench_cashier@garments-pos.com",
+                hashed_password=auth.get_password_hash(uuid.uuid4().hex),
+                role=models.UserRole.CASHIER
+            )
+            db.add(user)
+            db.commit()
+    finally:
+        db.close()
+    token = auth.create_access_token({"sub": "bench_cashier", "role": "cashier"})
+    return {"Authorization": f"Bearer {token}"}
+
+def random_cart(barcodes, max_lines):
+    """Cart of 1..max_lines distinct SKUs, optionally with a customer and a discount"""
+    cart = {
+        "items": [{"barcode": barcode, "quantity": 1} for barcode in random.sample(barcodes, random.randint(1, max_lines))],
+        "payment_method": random.choice(["CASH", "UPI", "CARD"])
+    }
+    if random.random() < 0.3:
+        cart["customer_phone"] = f"9{random.randint(100000000, 999999999)}"
+        cart["customer_name"] = "Bench Customer"
+    if random.random() < 0.2:
+        cart["discount_type"] = "PERCENT"
+        cart["discount_value"] = 10
+    return cart
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def run_checkouts(client, headers, carts, concurrency):
+    """Post every cart with `concurrency` parallel tills; returns (latencies in ms, failures, elapsed seconds)"""
+    def checkout(cart):
+        started = time.perf_counter()
+        response = client.post("/checkout/", json=cart, headers=dict(headers, **{"Idempotency-Key": uuid.uuid4().hex}))
+        return (time.perf_counter() - started) * 1000, response.status_code, response.text
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(checkout, carts))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status_code, _ in outcomes if status_code == 200)
+    failures = [(status_code, text) for _, status_code, text in outcomes if status_code != 200]
+    return latencies, failures, elapsed
+
+def compare_with_baseline(results, baseline, tolerance):
+    """List of regressions against a saved baseline"""
+    regressions = []
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        if results[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key} {results[key]:.1f} > baseline {baseline[key]:.1f} (+{tolerance:.0%})")
+    if results["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {results['throughput']:.1f}/s < baseline {baseline['throughput']:.1f}/s (-{tolerance:.0%})")
+    if results["queries_per_checkout"] > baseline["queries_per_checkout"]:
+        regressions.append(
+            f"queries per checkout {results['queries_per_checkout']:.2f} > baseline {baseline['queries_per_checkout']:.2f}"
+        )
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Checkout load test")
+    parser.add_argument("--products", type=int, default=200, help="Products to seed")
+    parser.add_argument("--skus-per-product", type=int, default=20, help="SKUs per product")
+    parser.add_argument("--checkouts", type=int, default=500, help="Checkouts to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel tills")
+    parser.add_argument("--max-lines", type=int, default=5, help="Maximum lines per cart")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for carts")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed latency/throughput regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"🧪 Checkout load test: {args.products} products x {args.skus_per_product} SKUs, "
+          f"{args.checkouts} checkouts, {args.concurrency} parallel tills")
+
+    prefix = f"BENCH{uuid.uuid4().hex[:4].upper()}"
+    barcodes = create_scaled_inventory(
+        args.products, args.skus_per_product, quantity=args.checkouts, prefix=prefix
+    )
+    headers = bench_headers()
+    client = TestClient(main.app)
+    counter = QueryCounter(database.engine)
+
+    # Warm up connections and caches outside the measurement
+    run_checkouts(client, headers, [random_cart(barcodes, args.max_lines) for _ in range(args.concurrency * 2)], args.concurrency)
+
+    carts = [random_cart(barcodes, args.max_lines) for _ in range(args.checkouts)]
+    counter.enabled = True
+    latencies, failures, elapsed = run_checkouts(client, headers, carts, args.concurrency)
+    counter.enabled = False
+
+    results = {
+        "checkouts": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "queries_per_checkout": counter.count / len(carts)
+    }
+
+    print(f"Throughput:   {results['throughput']:.1f} checkouts/sec")
+    print(f"Latency:      p50 {results['p50_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms, p99 {results['p99_ms']:.1f} ms")
+    print(f"Queries:      {results['queries_per_checkout']:.2f} per checkout")
+
+    problems = []
+    if failures:
+        status_code, text = failures[0]
+        problems.append(f"{len(failures)} checkouts failed, e.g. {status_code}: {text[:200]}")
+    if results["queries_per_checkout"] > MAX_QUERIES_PER_CHECKOUT:
+        problems.append(
+            f"queries per checkout {results['queries_per_checkout']:.2f} exceeds budget {MAX_QUERIES_PER_CHECKOUT}"
+        )
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            problems.extend(compare_with_baseline(results, json.load(f), args.tolerance))
+    else:
+        print("No baseline found; run with --save-baseline to record one")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+if __name__ == "__main__":
+    main_cli()
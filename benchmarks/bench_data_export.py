@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the columnar data export
+Seeds a large sales history (default 500k invoice items) with set-based inserts,
+exports invoice_items as Parquet and Arrow IPC, and checks that peak memory stays
+bounded by the chunk size rather than growing with the number of rows.
+
+Point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_data_export.py [--invoices 100000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import tempfile
+import tracemalloc
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+import main  # Creates the schema
+import database
+from create_demo_data import create_scaled_inventory
+from data_export import data_export, PYARROW_AVAILABLE
+
+# Peak Python + Arrow memory allowed while exporting, whatever the row count
+MAX_PEAK_MB = 64
+
+def seed_sales(prefix, invoices, items_per_invoice):
+    """Bulk-insert invoices with items spread over three years"""
+    db = database.SessionLocal()
+    try:
+        db.execute(text("""
+            INSERT INTO invoices (invoice_number, customer_name, total_mrp, total_discount, total_final_price,
+                                  total_base_amount, total_gst_amount, total_cgst_amount, total_sgst_amount,
+                                  payment_method, loyalty_points_earned, loyalty_points_redeemed,
+                                  loyalty_discount_amount, created_at)
+            SELECT :prefix || '-' || g, 'Walk-in', 2000, 0, 2000, 1785.71, 214.29, 107.14, 107.15,
+                   (ARRAY['CASH', 'CARD', 'UPI'])[1 + g % 3], 0, 0, 0, now() - (random() * 1095) * interval '1 day'
+            FROM generate_series(1, :invoices) g
+        """), {"prefix": prefix, "invoices": invoices})
+        db.execute(text("""
+            INSERT INTO invoice_items (invoice_id, inventory_item_id, barcode, product_name, design_number, size, color,
+                                       unit_price, quantity, total_price, discount_amount, final_price, base_price,
+                                       gst_amount, cgst_amount, sgst_amount, gst_rate, created_at)
+            WITH items AS (
+                SELECT row_number() OVER (ORDER BY id) - 1 AS n, id, barcode, design_number, size, color, mrp
+                FROM inventory_items WHERE barcode LIKE :prefix || '%'
+            )
+            SELECT inv.id, i.id, i.barcode, 'Bench item', i.design_number, i.size, i.color,
+                   i.mrp, 1, i.mrp, 0, i.mrp, round((i.mrp / 1.12)::numeric, 2), round((i.mrp - i.mrp / 1.12)::numeric, 2),
+                   round(((i.mrp - i.mrp / 1.12) / 2)::numeric, 2), round(((i.mrp - i.mrp / 1.12) / 2)::numeric, 2), 12,
+                   inv.created_at
+            FROM invoices inv
+            CROSS JOIN generate_series(1, :items_per_invoice) AS line(no)
+            JOIN items i ON i.n = (inv.id * :items_per_invoice + line.no) % (SELECT count(*) FROM items)
+            WHERE inv.invoice_number LIKE :prefix || '-%'
+        """), {"prefix": prefix, "items_per_invoice": items_per_invoice})
+        db.commit()
+    finally:
+        db.close()
+
+def run_export(export_format, path):
+    """Export invoice_items to a file; returns (rows, bytes, seconds, peak MB)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    db = database.SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(path, "wb") as f:
+            for data in data_export.stream(db, "invoice_items", export_format):
+                f.write(data)
+        seconds = time.perf_counter() - started
+    finally:
+        db.close()
+
+    # Second pass for memory only (tracemalloc slows the export down several times)
+    db = database.SessionLocal()
+    tracemalloc.start()
+    peak_arrow = 0
+    try:
+        for _ in data_export.stream(db, "invoice_items", export_format):
+            peak_arrow = max(peak_arrow, pa.total_allocated_bytes())
+        _, peak_python = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        db.close()
+
+    if export_format == "parquet":
+        rows = pq.ParquetFile(path).metadata.num_rows
+    else:
+        with pa.OSFile(path) as f:
+            rows = pa.ipc.open_stream(f).read_all().num_rows
+    return rows, os.path.getsize(path), seconds, (peak_python + peak_arrow) / 1024 / 1024
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Data export benchmark")
+    parser.add_argument("--invoices", type=int, default=100000, help="Invoices to seed")
+    parser.add_argument("--items-per-invoice", type=int, default=5, help="Items per invoice")
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow is not installed")
+        sys.exit(1)
+
+    print(f"🧪 Data export: {args.invoices} invoices x {args.items_per_invoice} items")
+    prefix = f"EXP{uuid.uuid4().hex[:4].upper()}"
+    create_scaled_inventory(50, 20, quantity=1, prefix=prefix)
+    seed_sales(prefix, args.invoices, args.items_per_invoice)
+
+    db = database.SessionLocal()
+    try:
+        expected = db.execute(text("SELECT count(*) FROM invoice_items")).scalar()
+    finally:
+        db.close()
+
+    problems = []
+    directory = tempfile.mkdtemp(prefix="pos_export_")
+    for export_format in ["parquet", "arrow"]:
+        path = os.path.join(directory, f"invoice_items.{export_format}")
+        rows, size, seconds, peak_mb = run_export(export_format, path)
+        os.remove(path)
+        print(f"{export_format:<8}      {rows} rows, {size / 1024 / 1024:.1f} MB in {seconds:.2f} s "
+              f"({rows / seconds:.0f} rows/s), peak memory {peak_mb:.1f} MB")
+        if rows != expected:
+            problems.append(f"{export_format} export has {rows} rows, expected {expected}")
+        if peak_mb > MAX_PEAK_MB:
+            problems.append(f"{export_format} export peaked at {peak_mb:.1f} MB (budget {MAX_PEAK_MB} MB)")
+
+    os.rmdir(directory)
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Exports stream in bounded memory")
+
+if __name__ == "__main__":
+    main_cli()
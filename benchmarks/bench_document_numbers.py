@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the invoice/return number allocator
+Simulates parallel tills: every worker opens its own transaction per "checkout",
+takes a number and commits (or rolls back a share of them, like a failed sale).
+Reports allocations per second and verifies the issued series is gap-free.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_document_numbers.py [tills] [checkouts_per_till]
+"""
+
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+import database
+from config import settings
+from document_numbers import document_number_allocator
+
+ROLLBACK_EVERY = 10  # Every 10th sale fails and must give its number back
+
+def run_till(series, checkouts):
+    """One till: allocate numbers in separate transactions, returning those that committed"""
+    committed = []
+    db = database.SessionLocal()
+    try:
+        for i in range(checkouts):
+            number = document_number_allocator.next_number(db, series)
+            if i % ROLLBACK_EVERY == ROLLBACK_EVERY // 2:
+                db.rollback()
+            else:
+                db.commit()
+                committed.append(number)
+    finally:
+        db.close()
+    return committed
+
+def main():
+    tills = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    checkouts_per_till = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+
+    models.Base.metadata.create_all(bind=database.engine)
+
+    # A throwaway series so repeated runs start from 1
+    series = f"B{uuid.uuid4().hex[:6].upper()}"
+
+    print(f"🧪 Document number allocator: {tills} tills x {checkouts_per_till} checkouts "
+          f"(block size {settings.DOCUMENT_NUMBER_BLOCK_SIZE})")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=tills) as pool:
+        results = list(pool.map(lambda _: run_till(series, checkouts_per_till), range(tills)))
+    elapsed = time.perf_counter() - started
+
+    issued = [number for till in results for number in till]
+    sequence = sorted(int(number.rsplit("/", 1)[1]) for number in issued)
+    attempts = tills * checkouts_per_till
+
+    print(f"Allocations: {attempts} in {elapsed:.2f}s -> {attempts / elapsed:.0f} allocations/sec")
+    print(f"Committed numbers: {len(issued)}, first {sequence[0]}, last {sequence[-1]}")
+
+    if len(set(issued)) != len(issued):
+        print("❌ Duplicate numbers issued")
+        sys.exit(1)
+    if sequence != list(range(1, len(sequence) + 1)):
+        print("❌ Gaps in the issued series")
+        sys.exit(1)
+    print("✅ Unique and gap-free")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the inventory aging report
+Seeds a scaled catalog (default 50k SKUs) with a mix of recently sold, long unsold
+and never-sold items, then times /dashboard/inventory-aging/buckets and the
+oldest-first /dashboard/inventory-aging list, and shows the list's query plan.
+
+Point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_inventory_aging.py [--products 2500]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import statistics
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+
+import main
+import models
+import database
+import auth
+from create_demo_data import create_scaled_inventory
+
+# Median latency budget per report request
+MAX_MEDIAN_MS = 100
+RUNS = 20
+
+def bench_headers():
+    """Bearer token for a benchmark admin (created on first run)"""
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == "bench_admin").first()
+        if user is None:
+            user = models.User(
+                username="bench_admin",
+                email="bench_admin@garments-pos.com",
+                hashed_password=auth.get_password_hash(uuid.uuid4().hex),
+                role=models.UserRole.ADMIN
+            )
+            db.add(user)
+            db.commit()
+    finally:
+        db.close()
+    token = auth.create_access_token({"sub": "bench_admin", "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+def age_catalog(prefix):
+    """Spread receipt dates over the past year; about a third of the items never sold"""
+    db = database.SessionLocal()
+    try:
+        db.execute(text("""
+            UPDATE inventory_items
+            SET created_at = now() - (random() * 365) * interval '1 day',
+                last_sold_at = CASE WHEN random() < 0.66 THEN now() - (random() * 120) * interval '1 day' END
+            WHERE barcode LIKE :prefix
+        """), {"prefix": f"{prefix}%"})
+        db.execute(text("UPDATE inventory_items SET last_sold_at = created_at WHERE last_sold_at < created_at"))
+        db.commit()
+        db.execute(text("ANALYZE inventory_items"))
+        db.commit()
+    finally:
+        db.close()
+
+def time_request(client, headers, url):
+    """Median and max latency in ms over RUNS requests"""
+    latencies = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            print(f"❌ {url} returned {response.status_code}: {response.text[:200]}")
+            sys.exit(1)
+    return statistics.median(latencies), max(latencies), response.json()
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Inventory aging benchmark")
+    parser.add_argument("--products", type=int, default=2500, help="Products to seed")
+    parser.add_argument("--skus-per-product", type=int, default=20, help="SKUs per product")
+    args = parser.parse_args()
+
+    print(f"🧪 Inventory aging: {args.products} products x {args.skus_per_product} SKUs")
+    prefix = f"AGE{uuid.uuid4().hex[:4].upper()}"
+    create_scaled_inventory(args.products, args.skus_per_product, quantity=3, prefix=prefix)
+    age_catalog(prefix)
+
+    headers = bench_headers()
+    client = TestClient(main.app)
+    problems = []
+
+    median_ms, max_ms, report = time_request(client, headers, "/dashboard/inventory-aging/buckets")
+    print(f"Buckets:      median {median_ms:.1f} ms, max {max_ms:.1f} ms")
+    for bucket in report["buckets"]:
+        print(f"  {bucket['bucket']:>6} days: {bucket['sku_count']} SKUs ({bucket['never_sold_skus']} never sold), "
+              f"cost Rs. {bucket['cost_value']:.0f}, MRP Rs. {bucket['mrp_value']:.0f}")
+    if median_ms > MAX_MEDIAN_MS:
+        problems.append(f"buckets median {median_ms:.1f} ms exceeds {MAX_MEDIAN_MS} ms")
+
+    median_ms, max_ms, items = time_request(client, headers, "/dashboard/inventory-aging?days=90&limit=100")
+    print(f"Oldest 100:   median {median_ms:.1f} ms, max {max_ms:.1f} ms")
+    if median_ms > MAX_MEDIAN_MS:
+        problems.append(f"aging list median {median_ms:.1f} ms exceeds {MAX_MEDIAN_MS} ms")
+    if not any(item["never_sold"] for item in items):
+        problems.append("never-sold items are missing from the aging list")
+
+    db = database.SessionLocal()
+    try:
+        plan = db.execute(text("""
+            EXPLAIN SELECT id FROM inventory_items
+            WHERE quantity > 0 AND COALESCE(last_sold_at, created_at) < now() - interval '90 days'
+            ORDER BY COALESCE(last_sold_at, created_at) LIMIT 100
+        """)).fetchall()
+    finally:
+        db.close()
+    print("Plan:         " + "\n              ".join(row[0] for row in plan))
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Aging report runs in milliseconds")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for /inventory/search typeahead
+Seeds a scaled catalog (default 100k SKUs) and times typical staff queries: a
+partial barcode, a damaged barcode, a partial design number, a colour and a
+product name. The latency budget applies when pg_trgm is installed; without it
+the endpoint falls back to unindexed prefix/substring matching and only the
+timings are reported.
+
+Point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_inventory_search.py [--products 5000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+import main  # Creates the schema and runs the index migration
+import database
+from create_demo_data import create_scaled_inventory
+from inventory_search import inventory_search
+
+# Median latency budget per typeahead query (with pg_trgm)
+MAX_MEDIAN_MS = 20
+RUNS = 20
+
+def damage(barcode):
+    """A barcode with one character misread"""
+    position = random.randrange(len(barcode))
+    return barcode[:position] + "X" + barcode[position + 1:]
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Inventory search benchmark")
+    parser.add_argument("--products", type=int, default=5000, help="Products to seed")
+    parser.add_argument("--skus-per-product", type=int, default=20, help="SKUs per product")
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"🧪 Inventory search: {args.products} products x {args.skus_per_product} SKUs")
+    prefix = f"SRCH{uuid.uuid4().hex[:4].upper()}"
+    barcodes = create_scaled_inventory(args.products, args.skus_per_product, quantity=1, prefix=prefix)
+
+    db = database.SessionLocal()
+    try:
+        db.execute(text("ANALYZE inventory_items"))
+        db.execute(text("ANALYZE products"))
+        trigram = inventory_search.trigram_available(db)
+        print(f"pg_trgm:      {'installed' if trigram else 'NOT installed (prefix/substring fallback)'}")
+
+        sample = random.choice(barcodes)
+        design_number = db.execute(
+            text("SELECT design_number FROM inventory_items WHERE barcode = :barcode"), {"barcode": sample}
+        ).scalar()
+        queries = {
+            "barcode prefix": sample[:-3],
+            "damaged barcode": damage(sample),
+            "design number": design_number[:-2],
+            "colour": "Bla",
+            "product name": "Jeans",
+        }
+
+        problems = []
+        for label, q in queries.items():
+            latencies = []
+            for _ in range(RUNS):
+                started = time.perf_counter()
+                results = inventory_search.search(db, q, limit=20)
+                latencies.append((time.perf_counter() - started) * 1000)
+            median_ms = statistics.median(latencies)
+            top = results[0]["barcode"] if results else "-"
+            print(f"{label:<16} {q!r:<22} median {median_ms:6.1f} ms, {len(results)} results, top {top}")
+            if trigram and median_ms > MAX_MEDIAN_MS:
+                problems.append(f"{label} median {median_ms:.1f} ms exceeds {MAX_MEDIAN_MS} ms")
+    finally:
+        db.close()
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    if not trigram:
+        print("⚠️ Install pg_trgm (CREATE EXTENSION pg_trgm) and re-run add_indexes.py for indexed search")
+    else:
+        print(f"✅ Typeahead under {MAX_MEDIAN_MS} ms")
+
+if __name__ == "__main__":
+    main_cli()
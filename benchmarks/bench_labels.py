@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark for label sheet printing
+Renders a consignment of tags with vector Code128 barcodes onto A4 label sheets,
+and compares against rendering each barcode as a PNG through python-barcode's
+ImageWriter (the PDFGenerator.generate_barcode path).
+
+Usage:
+    python benchmarks/bench_labels.py [labels]
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from labels import label_generator, format_barcode
+from pdf_generator import pdf_generator
+
+PNG_SAMPLE = 50  # PNG rendering is slow; time a sample and extrapolate
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    labels = [
+        {
+            "barcode": format_barcode(number),
+            "product_name": "Levi's-Jeans",
+            "design_number": f"DES-{number % 97:03d}",
+            "size": ["S", "M", "L", "XL"][number % 4],
+            "color": "Indigo",
+            "mrp": 2499.0
+        }
+        for number in range(1, count + 1)
+    ]
+
+    print(f"🧪 Label sheet: {count} labels")
+
+    started = time.perf_counter()
+    output = BytesIO()
+    pages = label_generator.render(labels, output)
+    elapsed = time.perf_counter() - started
+    print(f"Vector sheet: {elapsed:.2f}s, {pages} pages, {len(output.getvalue()) / 1024:.0f} KB")
+
+    started = time.perf_counter()
+    for label in labels[:PNG_SAMPLE]:
+        pdf_generator.generate_barcode(label["barcode"])
+    png_elapsed = (time.perf_counter() - started) / PNG_SAMPLE * count
+    print(f"PNG barcodes alone (extrapolated): {png_elapsed:.2f}s")
+
+    if elapsed > 10:
+        print("❌ Printing the consignment took longer than 10 seconds")
+        sys.exit(1)
+    print("✅ Label sheet rendered in seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the pricing engine
+Prices random 1,000-line bills (mixed GST rates, percent/fixed/loyalty discounts)
+and returns against them, reports time per bill and checks that every bill balances
+to the paisa: lines add up to the header and CGST + SGST equals GST.
+
+Usage:
+    python benchmarks/bench_pricing.py [lines_per_bill] [bills]
+"""
+
+import os
+import sys
+import time
+import random
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import price_bill, price_return, to_paise
+
+GST_RATES = [0.0, 5.0, 12.0, 18.0, 28.0]
+
+def random_bill(lines):
+    """Random cart with garment-like MRPs"""
+    return {
+        "unit_mrps": [random.choice([199, 299.5, 499, 799, 999, 1299.99, 2499]) for _ in range(lines)],
+        "quantities": [random.randint(1, 5) for _ in range(lines)],
+        "gst_rates": [random.choice(GST_RATES) for _ in range(lines)],
+        "discount_type": random.choice([None, "PERCENT", "FIXED"]),
+        "discount_value": random.choice([0, 7.5, 10, 333.33]),
+        "extra_discount": random.choice([0, 0, 150])
+    }
+
+def paise_sum(values):
+    return int(to_paise(values).sum())
+
+def check_bill(bill):
+    """Header must equal the sum of lines, exactly"""
+    lines = bill["lines"]
+    for header_key, line_key in [
+        ("total_mrp", "total_price"),
+        ("total_discount", "discount_amount"),
+        ("total_final_price", "final_price"),
+        ("total_base_amount", "base_price"),
+        ("total_gst_amount", "gst_amount"),
+        ("total_cgst_amount", "cgst_amount"),
+        ("total_sgst_amount", "sgst_amount")
+    ]:
+        if paise_sum([line[line_key] for line in lines]) != paise_sum([bill[header_key]]):
+            return f"{header_key} does not match the sum of lines"
+    if paise_sum([bill["total_cgst_amount"], bill["total_sgst_amount"]]) != paise_sum([bill["total_gst_amount"]]):
+        return "CGST + SGST does not equal GST"
+    if paise_sum([bill["total_base_amount"], bill["total_gst_amount"]]) != paise_sum([bill["total_final_price"]]):
+        return "base + GST does not equal the final price"
+    return None
+
+def main():
+    lines_per_bill = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    bills = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    random.seed(42)
+    carts = [random_bill(lines_per_bill) for _ in range(bills)]
+
+    print(f"🧪 Pricing engine: {bills} bills x {lines_per_bill} lines")
+
+    started = time.perf_counter()
+    priced = [price_bill(**cart) for cart in carts]
+    bill_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    refunds = [
+        price_return(
+            final_prices=[line["final_price"] for line in bill["lines"]],
+            gst_amounts=[line["gst_amount"] for line in bill["lines"]],
+            original_quantities=cart["quantities"],
+            return_quantities=cart["quantities"]
+        )
+        for cart, bill in zip(carts, priced)
+    ]
+    return_elapsed = time.perf_counter() - started
+
+    print(f"price_bill:   {bill_elapsed / bills * 1000:.2f} ms per bill")
+    print(f"price_return: {return_elapsed / bills * 1000:.2f} ms per return")
+
+    for bill, refund in zip(priced, refunds):
+        error = check_bill(bill)
+        if error:
+            print(f"❌ {error}")
+            sys.exit(1)
+        # A full return refunds exactly what was charged
+        if paise_sum([refund["total_return_amount"]]) != -paise_sum([bill["total_final_price"]]) or \
+                paise_sum([refund["total_return_gst"]]) != -paise_sum([bill["total_gst_amount"]]):
+            print("❌ Full return does not refund the invoice exactly")
+            sys.exit(1)
+    print("✅ Every bill balances to the paisa")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark for stock-take reconciliation
+Seeds a scaled catalog (default 50k SKUs, one piece each), streams a full count of
+it to /stock-takes/{id}/scans in scanner-sized batches (with some pieces missing,
+some counted twice and some unknown barcodes), then times the variance report and
+posting, and checks that book stock matches the count afterwards.
+
+Point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_stock_take.py [--batch-size 1000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+
+import main
+import models
+import database
+import auth
+from create_demo_data import create_scaled_inventory
+from stock_service import stock_service
+
+# Minimum sustained ingest rate, and budgets for the variance report and posting
+MIN_SCANS_PER_SECOND = 10000
+MAX_VARIANCE_MS = 2000
+MAX_POST_MS = 5000
+
+def bench_headers():
+    """Bearer token for a benchmark admin (created on first run)"""
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == "bench_admin").first()
+        if user is None:
+            user = models.User(
+                username="bench_admin",
+                email="bench_admin@garments-pos.com",
+                hashed_password=auth.get_password_hash(uuid.uuid4().hex),
+                role=models.UserRole.ADMIN
+            )
+            db.add(user)
+            db.commit()
+    finally:
+        db.close()
+    token = auth.create_access_token({"sub": "bench_admin", "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Stock take benchmark")
+    parser.add_argument("--products", type=int, default=2500, help="Products to seed")
+    parser.add_argument("--skus-per-product", type=int, default=20, help="SKUs per product")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Scans per uploaded batch")
+    args = parser.parse_args()
+
+    print(f"🧪 Stock take: {args.products} products x {args.skus_per_product} SKUs, batches of {args.batch_size}")
+    prefix = f"STK{uuid.uuid4().hex[:4].upper()}"
+    barcodes = create_scaled_inventory(args.products, args.skus_per_product, quantity=1, prefix=prefix)
+
+    # Bulk-inserted items have no movements yet; give them opening balances like startup does
+    db = database.SessionLocal()
+    try:
+        stock_service.record_opening_balances(db)
+        db.commit()
+    finally:
+        db.close()
+
+    # 2% of the pieces are missing, 1% are counted twice, plus a few barcodes nobody knows
+    rng = random.Random(42)
+    scans = []
+    for barcode in barcodes:
+        roll = rng.random()
+        if roll < 0.02:
+            continue
+        scans.extend([barcode, barcode] if roll < 0.03 else [barcode])
+    scans.extend(f"UNKNOWN-{prefix}-{i}" for i in range(100))
+    rng.shuffle(scans)
+
+    headers = bench_headers()
+    client = TestClient(main.app)
+    problems = []
+
+    session = client.post("/stock-takes", json={"name": f"Benchmark {prefix}"}, headers=headers).json()
+    session_id = session["id"]
+
+    started = time.perf_counter()
+    for offset in range(0, len(scans), args.batch_size):
+        response = client.post(
+            f"/stock-takes/{session_id}/scans",
+            json={"barcodes": scans[offset:offset + args.batch_size], "batch_id": str(offset)},
+            headers=headers
+        )
+        if response.status_code != 200:
+            print(f"❌ Scan batch returned {response.status_code}: {response.text[:200]}")
+            sys.exit(1)
+    ingest_seconds = time.perf_counter() - started
+    rate = len(scans) / ingest_seconds
+    print(f"Ingest:       {len(scans)} scans in {ingest_seconds:.2f} s ({rate:.0f} scans/s)")
+    if rate < MIN_SCANS_PER_SECOND:
+        problems.append(f"ingest rate {rate:.0f} scans/s is below {MIN_SCANS_PER_SECOND}")
+
+    started = time.perf_counter()
+    report = client.get(f"/stock-takes/{session_id}/variance", headers=headers).json()
+    variance_ms = (time.perf_counter() - started) * 1000
+    summary = report["summary"]
+    print(f"Variance:     {variance_ms:.0f} ms for {summary['skus_in_scope']} SKUs "
+          f"({summary['shrinkage_skus']} short, {summary['excess_skus']} over, {summary['unknown_barcodes']} unknown)")
+    if variance_ms > MAX_VARIANCE_MS:
+        problems.append(f"variance report took {variance_ms:.0f} ms (budget {MAX_VARIANCE_MS} ms)")
+    if summary["unknown_barcodes"] != 100:
+        problems.append(f"expected 100 unknown barcodes, got {summary['unknown_barcodes']}")
+
+    started = time.perf_counter()
+    response = client.post(f"/stock-takes/{session_id}/post", headers=headers)
+    post_ms = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        print(f"❌ Posting returned {response.status_code}: {response.text[:200]}")
+        sys.exit(1)
+    print(f"Post:         {post_ms:.0f} ms for {response.json()['adjustments']} adjustments")
+    if post_ms > MAX_POST_MS:
+        problems.append(f"posting took {post_ms:.0f} ms (budget {MAX_POST_MS} ms)")
+
+    db = database.SessionLocal()
+    try:
+        book = db.execute(
+            text("SELECT COALESCE(SUM(quantity), 0) FROM inventory_items WHERE barcode LIKE :prefix"),
+            {"prefix": f"{prefix}%"}
+        ).scalar()
+    finally:
+        db.close()
+    counted = sum(1 for barcode in scans if barcode.startswith(prefix))
+    print(f"Book stock:   {book} pieces after posting, {counted} counted")
+    if book != counted:
+        problems.append("book stock does not match the count after posting")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Stock take reconciles a full count without per-scan round-trips")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark for store-day date filters
+Seeds a large invoice history (default 1M invoices over three years), then compares
+the old func.date(created_at) = today filter with the store-local range filter
+(created_at >= start AND created_at < end) used by the cash register: query plans
+and median time of the "today's cash sales" total. Also times /cash-register/status.
+
+Point DATABASE_URL at a local, disposable Postgres database.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/pos_bench python benchmarks/bench_store_day_filters.py [--invoices 1000000]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import statistics
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+
+import main  # Creates the schema and indexes
+import models
+import database
+import auth
+from store_time import store_now, store_day_bounds, on_store_days
+
+RUNS = 20
+# Median budget for today's cash sales total with the range filter
+MAX_MEDIAN_MS = 20
+
+OLD_SQL = """
+    SELECT sum(total_final_price) FROM invoices
+    WHERE date(created_at) = :today AND payment_method = 'CASH'
+"""
+NEW_SQL = """
+    SELECT sum(total_final_price) FROM invoices
+    WHERE created_at >= :start AND created_at < :end AND payment_method = 'CASH'
+"""
+
+def bench_headers():
+    """Bearer token for a benchmark admin (created on first run)"""
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == "bench_admin").first()
+        if user is None:
+            user = models.User(
+                username="bench_admin",
+                email="bench_admin@garments-pos.com",
+                hashed_password=auth.get_password_hash(uuid.uuid4().hex),
+                role=models.UserRole.ADMIN
+            )
+            db.add(user)
+            db.commit()
+    finally:
+        db.close()
+    token = auth.create_access_token({"sub": "bench_admin", "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+def seed_invoices(prefix, invoices):
+    """Bulk-insert invoices (and 2% returns) spread over three years"""
+    db = database.SessionLocal()
+    try:
+        db.execute(text("""
+            INSERT INTO invoices (invoice_number, customer_name, total_mrp, total_discount, total_final_price,
+                                  total_base_amount, total_gst_amount, total_cgst_amount, total_sgst_amount,
+                                  payment_method, loyalty_points_earned, loyalty_points_redeemed,
+                                  loyalty_discount_amount, created_at)
+            SELECT :prefix || '-' || g, 'Walk-in', 2000, 0, 2000, 1785.71, 214.29, 107.14, 107.15,
+                   (ARRAY['CASH', 'CARD', 'UPI'])[1 + g % 3], 0, 0, 0, now() - (random() * 1095) * interval '1 day'
+            FROM generate_series(1, :invoices) g
+        """), {"prefix": prefix, "invoices": invoices})
+        db.execute(text("""
+            INSERT INTO returns (return_number, invoice_id, invoice_number, customer_name, return_reason,
+                                 return_method, total_return_amount, total_return_gst, total_return_cgst,
+                                 total_return_sgst, wallet_credit, cash_refund, created_at)
+            SELECT 'R' || invoice_number, id, invoice_number, 'Walk-in', 'Size', 'CASH',
+                   -2000, -214.29, -107.14, -107.15, 0, 2000, created_at + interval '1 day'
+            FROM invoices
+            WHERE invoice_number LIKE :prefix || '-%' AND id % 50 = 0
+        """), {"prefix": prefix})
+        db.commit()
+        db.execute(text("ANALYZE invoices"))
+        db.execute(text("ANALYZE returns"))
+        db.commit()
+    finally:
+        db.close()
+
+def time_query(sql, params):
+    """Median ms over RUNS executions, plus the query plan"""
+    db = database.SessionLocal()
+    try:
+        latencies = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            db.execute(text(sql), params).scalar()
+            latencies.append((time.perf_counter() - started) * 1000)
+        plan = [row[0] for row in db.execute(text("EXPLAIN " + sql), params)]
+    finally:
+        db.close()
+    return statistics.median(latencies), plan
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Store-day date filter benchmark")
+    parser.add_argument("--invoices", type=int, default=1000000, help="Invoices to seed")
+    args = parser.parse_args()
+
+    print(f"🧪 Store-day filters: {args.invoices} invoices over three years")
+    prefix = f"DAY{uuid.uuid4().hex[:4].upper()}"
+    seed_invoices(prefix, args.invoices)
+
+    today = store_now().date()
+    start, end = store_day_bounds(today)
+    problems = []
+
+    old_ms, old_plan = time_query(OLD_SQL, {"today": today})
+    new_ms, new_plan = time_query(NEW_SQL, {"start": start, "end": end})
+    print(f"func.date():  median {old_ms:.1f} ms")
+    print("  " + "\n  ".join(old_plan))
+    print(f"Range:        median {new_ms:.1f} ms ({old_ms / new_ms:.0f}x faster)")
+    print("  " + "\n  ".join(new_plan))
+    if not any("Index" in line for line in new_plan) or any("Seq Scan on invoices" in line for line in new_plan):
+        problems.append("range filter does not use an index on invoices.created_at")
+    if new_ms > MAX_MEDIAN_MS:
+        problems.append(f"range filter median {new_ms:.1f} ms exceeds {MAX_MEDIAN_MS} ms")
+
+    headers = bench_headers()
+    client = TestClient(main.app)
+    db = database.SessionLocal()
+    try:
+        register_open = db.query(models.CashRegister).filter(on_store_days(models.CashRegister.date)).first() is not None
+    finally:
+        db.close()
+    if not register_open:
+        client.post("/cash-register/open", json={"opening_balance": 5000}, headers=headers)
+    latencies = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        response = client.get("/cash-register/status", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            print(f"❌ /cash-register/status returned {response.status_code}: {response.text[:200]}")
+            sys.exit(1)
+    print(f"Cash status:  median {statistics.median(latencies):.1f} ms, "
+          f"today's cash sales Rs. {response.json()['total_sales']:.0f}")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Store-day filters use index range scans")
+
+if __name__ == "__main__":
+    main_cli()
@@ -28,6 +28,32 @@ class Settings:
     # WhatsApp configuration
     WHATSAPP_ENABLED: bool = bool(INTERAKT_API_KEY and INTERAKT_API_SECRET)
     
+    # WhatsApp outbox dispatcher (messages queued at checkout are sent in the background)
+    WHATSAPP_OUTBOX_ENABLED: bool = os.getenv("WHATSAPP_OUTBOX_ENABLED", "true").lower() == "true"
+    WHATSAPP_OUTBOX_POLL_SECONDS: float = float(os.getenv("WHATSAPP_OUTBOX_POLL_SECONDS", "2"))
+    WHATSAPP_OUTBOX_BATCH_SIZE: int = int(os.getenv("WHATSAPP_OUTBOX_BATCH_SIZE", "20"))
+    WHATSAPP_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("WHATSAPP_OUTBOX_MAX_ATTEMPTS", "5"))
+    
+    # Maximum number of sales accepted by /checkout/batch in one request
+    CHECKOUT_BATCH_MAX_SALES: int = int(os.getenv("CHECKOUT_BATCH_MAX_SALES", "1000"))
+    
+    # Scanner barcode lookup cache (per worker process)
+    BARCODE_CACHE_MAX_ENTRIES: int = int(os.getenv("BARCODE_CACHE_MAX_ENTRIES", "5000"))
+    BARCODE_CACHE_TTL_SECONDS: float = float(os.getenv("BARCODE_CACHE_TTL_SECONDS", "30"))
+    
+    # Size x colour variant matrix cache (per worker process, keyed by product)
+    VARIANT_MATRIX_CACHE_MAX_ENTRIES: int = int(os.getenv("VARIANT_MATRIX_CACHE_MAX_ENTRIES", "1000"))
+    VARIANT_MATRIX_CACHE_TTL_SECONDS: float = float(os.getenv("VARIANT_MATRIX_CACHE_TTL_SECONDS", "60"))
+    
+    # Report response cache (/dashboard/*, /crm/analytics, /ml/*): in-process LRU unless
+    # RESPONSE_CACHE_URL points at a Redis-compatible server shared by all workers
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_URL: str = os.getenv("RESPONSE_CACHE_URL", "")
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+    RESPONSE_CACHE_DASHBOARD_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_DASHBOARD_TTL_SECONDS", "30"))
+    RESPONSE_CACHE_CRM_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_CRM_TTL_SECONDS", "120"))
+    RESPONSE_CACHE_ML_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_ML_TTL_SECONDS", "300"))
+    
     # Shop details for invoices
     SHOP_NAME: str = os.getenv("SHOP_NAME", "Your Garments Store")
     SHOP_ADDRESS: str = os.getenv("SHOP_ADDRESS", "123 Main Street, City, State 12345")
@@ -35,6 +61,26 @@ class Settings:
     SHOP_EMAIL: str = os.getenv("SHOP_EMAIL", "info@yourstore.com")
     SHOP_GSTIN: str = os.getenv("SHOP_GSTIN", "22AAAAA0000A1Z5")  # Replace with your actual GSTIN
     
+    # Store identity and local time (India Standard Time by default)
+    STORE_CODE: str = os.getenv("STORE_CODE", "")
+    STORE_UTC_OFFSET_MINUTES: int = int(os.getenv("STORE_UTC_OFFSET_MINUTES", "330"))
+    
+    # Invoice/return numbers are handed out from pre-allocated blocks of this size
+    DOCUMENT_NUMBER_BLOCK_SIZE: int = int(os.getenv("DOCUMENT_NUMBER_BLOCK_SIZE", "50"))
+    # Background check that keeps at least a block of numbers in each pool
+    DOCUMENT_NUMBER_REFILL_SECONDS: float = float(os.getenv("DOCUMENT_NUMBER_REFILL_SECONDS", "5"))
+    
+    # Barcodes allocated for printed tags: prefix + store code + 8-digit sequence
+    BARCODE_PREFIX: str = os.getenv("BARCODE_PREFIX", "GP")
+    BARCODE_ALLOCATION_MAX: int = int(os.getenv("BARCODE_ALLOCATION_MAX", "10000"))
+    
+    # Maximum number of scanned barcodes accepted in one stock-take batch
+    STOCK_TAKE_MAX_BATCH_SIZE: int = int(os.getenv("STOCK_TAKE_MAX_BATCH_SIZE", "5000"))
+    
+    # Columnar data exports (data_export.py)
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "exports")
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))  # Rows per fetch / row group
+    
     # Default settings
     DEFAULT_GST_RATE: float = float(os.getenv("DEFAULT_GST_RATE", "12.0"))
     DEFAULT_CURRENCY: str = os.getenv("DEFAULT_CURRENCY", "INR")
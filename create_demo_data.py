@@ -7,6 +7,7 @@ Creates sample users, products, brands, dealers, and transactions
 import os
 import sys
 import logging
+import argparse
 from datetime import datetime, timedelta
 import random
 from decimal import Decimal
@@ -401,8 +402,79 @@ def create_demo_sales():
     db.commit()
     logger.info("✅ Demo sales created successfully!")
 
+def create_scaled_inventory(product_count: int, skus_per_product: int, quantity: int = 1, prefix: str = "SCALE"):
+    """
+    Create a large catalog for load testing: product_count products, each with
+    skus_per_product size/colour SKUs. Rows are bulk-inserted in chunks.
+    Returns the list of created barcodes.
+    """
+    logger.info(f"Creating scaled inventory: {product_count} products x {skus_per_product} SKUs...")
+    
+    db = next(get_db())
+    brands = db.query(Brand).all()
+    if not brands:
+        create_demo_brands()
+        brands = db.query(Brand).all()
+    
+    sizes = ["XS", "S", "M", "L", "XL", "XXL", "XXXL"]
+    colors = ["Black", "White", "Blue", "Red", "Green", "Gray", "Navy", "Maroon", "Olive", "Beige"]
+    types = ["T-Shirt", "Shirt", "Jeans", "Trousers", "Kurta", "Jacket"]
+    gst_rates = [5.0, 12.0, 18.0]
+    chunk_size = 1000
+    
+    barcodes = []
+    for chunk_start in range(0, product_count, chunk_size):
+        chunk = range(chunk_start, min(chunk_start + chunk_size, product_count))
+        product_rows = [
+            {
+                "name": f"{prefix}-{brands[i % len(brands)].name}-{types[i % len(types)]}-{i}",
+                "brand_id": brands[i % len(brands)].id,
+                "type": types[i % len(types)],
+                "size_type": "ALPHA",
+                "gst_rate": gst_rates[i % len(gst_rates)]
+            }
+            for i in chunk
+        ]
+        product_ids = [
+            row.id for row in db.execute(
+                Product.__table__.insert().values(product_rows).returning(Product.__table__.c.id)
+            )
+        ]
+        
+        inventory_rows = []
+        for product_id in product_ids:
+            for sku in range(skus_per_product):
+                size = sizes[sku % len(sizes)]
+                color = colors[(sku // len(sizes)) % len(colors)]
+                barcode = f"{prefix}{product_id:07d}{sku:04d}"
+                mrp = float(random.randint(4, 50) * 100 - 1)
+                inventory_rows.append({
+                    "product_id": product_id,
+                    "barcode": barcode,
+                    "design_number": f"DES-{product_id:05d}-{sku // (len(sizes) * len(colors)):02d}",
+                    "size": size,
+                    "color": color,
+                    "cost_price": round(mrp * 0.55, 2),
+                    "mrp": mrp,
+                    "quantity": quantity
+                })
+                barcodes.append(barcode)
+        db.bulk_insert_mappings(InventoryItem, inventory_rows)
+        db.commit()
+        logger.info(f"Created {chunk.stop} / {product_count} products")
+    
+    db.close()
+    logger.info(f"✅ Scaled inventory created: {len(barcodes)} SKUs")
+    return barcodes
+
 def main():
     """Main function to create all demo data"""
+    parser = argparse.ArgumentParser(description="Create demo data for the Garments POS System")
+    parser.add_argument("--products", type=int, default=0, help="Also create this many extra products for load testing")
+    parser.add_argument("--skus-per-product", type=int, default=20, help="SKUs per extra product")
+    parser.add_argument("--quantity", type=int, default=100, help="Stock per extra SKU")
+    args = parser.parse_args()
+    
     logger.info("🚀 Starting demo data creation...")
     
     try:
@@ -413,6 +485,8 @@ def main():
         create_demo_products()
         create_demo_inventory()
         create_demo_sales()
+        if args.products:
+            create_scaled_inventory(args.products, args.skus_per_product, args.quantity)
         
         logger.info("🎉 All demo data created successfully!")
         logger.info("\n📋 Demo Login Credentials:")
@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import get_db
 import models
+from sales_rollup import sales_rollup
 from datetime import datetime, timedelta
 import random
 
@@ -103,6 +104,9 @@ def create_test_data():
                     # Update inventory
                     inventory_item.quantity = max(0, inventory_item.quantity - sales_pattern[day])
     
+    # Backdated sales bypass checkout, so rebuild the daily sales rollup from them
+    db.flush()
+    sales_rollup.rebuild(db)
     db.commit()
     print("✅ Test sales data created successfully!")
     print("📊 Created sales patterns:")
@@ -0,0 +1,200 @@
+"""
+Data Export
+Columnar (Parquet / Arrow IPC) extracts of sales, returns and inventory for offline
+analysis. Rows are read through a server-side cursor in chunks and each chunk is
+encoded and handed on before the next is fetched, so memory stays bounded however
+many years are exported.
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+from sqlalchemy import select, Integer, Float, Boolean, DateTime
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# pyarrow is only needed for exports; the rest of the API works without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow not available. Parquet/Arrow exports are disabled.")
+
+EXPORT_TABLES = {
+    "invoices": models.Invoice.__table__,
+    "invoice_items": models.InvoiceItem.__table__,
+    "returns": models.Return.__table__,
+    "return_items": models.ReturnItem.__table__,
+    "inventory": models.InventoryItem.__table__,
+    "products": models.Product.__table__,
+}
+
+# Transaction tables can be limited to a created_at range; the others are exported whole
+DATED_TABLES = ["invoices", "invoice_items", "returns", "return_items"]
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+class _ChunkSink:
+    """Write-only file object that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+class DataExportService:
+    def arrow_schema(self, table) -> "pa.Schema":
+        """Arrow schema for a table, taken from the SQLAlchemy column types"""
+        fields = []
+        for column in table.columns:
+            if isinstance(column.type, Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column.type, Float):
+                arrow_type = pa.float64()
+            elif isinstance(column.type, Boolean):
+                arrow_type = pa.bool_()
+            elif isinstance(column.type, DateTime):
+                arrow_type = pa.timestamp("us", tz="UTC") if column.type.timezone else pa.timestamp("us")
+            else:
+                arrow_type = pa.string()
+            # Every field is nullable: older databases were migrated without all NOT NULLs
+            fields.append(pa.field(column.name, arrow_type))
+        return pa.schema(fields)
+
+    def iter_batches(
+        self,
+        db: Session,
+        name: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator["pa.RecordBatch"]:
+        """Record batches of a table in id order, read through a server-side cursor"""
+        table = EXPORT_TABLES[name]
+        schema = self.arrow_schema(table)
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+
+        query = select(table).order_by(table.c.id)
+        if name in DATED_TABLES:
+            if start is not None:
+                query = query.where(table.c.created_at >= start)
+            if end is not None:
+                query = query.where(table.c.created_at < end)
+
+        result = db.execute(query.execution_options(stream_results=True, max_row_buffer=chunk_size))
+        for rows in result.partitions(chunk_size):
+            columns = list(zip(*rows))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            )
+
+    def stream(
+        self,
+        db: Session,
+        name: str,
+        export_format: str = "parquet",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Iterator[bytes]:
+        """Encoded file contents, yielded after every chunk"""
+        schema = self.arrow_schema(EXPORT_TABLES[name])
+        sink = _ChunkSink()
+        if export_format == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        for batch in self.iter_batches(db, name, start, end):
+            if export_format == "parquet":
+                # One row group per chunk
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            else:
+                writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    def write(
+        self,
+        db: Session,
+        name: str,
+        directory: str,
+        export_format: str = "parquet",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> str:
+        """Write one table to directory/<name>.<ext>; readers never see a partial file"""
+        path = os.path.join(directory, f"{name}.{EXPORT_FORMATS[export_format][1]}")
+        partial = f"{path}.partial"
+        with open(partial, "wb") as f:
+            for data in self.stream(db, name, export_format, start, end):
+                f.write(data)
+        os.replace(partial, path)
+        return path
+
+# Global data export instance
+data_export = DataExportService()
+
+if __name__ == "__main__":
+    # Nightly job: python data_export.py [YYYY-MM-DD]
+    # Exports the sales and returns of the given store-local day (default: yesterday)
+    # plus the current inventory and products to EXPORT_DIR/<day>/
+    import sys
+    from database import SessionLocal
+    from store_time import store_day_start
+
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow is not installed")
+        sys.exit(1)
+
+    if len(sys.argv) > 1:
+        day = store_day_start(datetime.fromisoformat(sys.argv[1]))
+    else:
+        day = store_day_start(store_day_start() - timedelta(hours=12))
+    next_day = store_day_start(day + timedelta(hours=36))
+    directory = os.path.join(settings.EXPORT_DIR, day.strftime("%Y-%m-%d"))
+    os.makedirs(directory, exist_ok=True)
+
+    db = SessionLocal()
+    try:
+        # All tables are read from one snapshot, so items always match their invoices
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        for name in EXPORT_TABLES:
+            path = data_export.write(db, name, directory, start=day, end=next_day)
+            print(f"✅ {name}: {path} ({os.path.getsize(path)} bytes)")
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
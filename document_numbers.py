@@ -0,0 +1,217 @@
+"""
+Document Number Allocator
+Issues GST-sequential invoice and return numbers per store and financial year,
+e.g. INV/2026-27/000123.
+
+Numbers are pre-allocated in blocks from a counter row into a pool table. A
+checkout takes the lowest free number from the pool with SKIP LOCKED, so
+parallel tills never wait on each other. The number is deleted from the pool
+in the sale's own transaction. If the sale rolls back, the number goes back to
+the pool and is reused, so the issued series has no gaps. It is not strictly
+chronological, though: a returned number is reissued after higher numbers that
+were already used, so sort by created_at, not number, for a time-ordered listing.
+
+A background refiller tops the pool up to a block ahead of demand, so checkouts
+don't normally refill at all. When a burst empties the pool, the checkout refills
+through the allocator's own single-connection engine instead of a second
+connection from the request pool, so busy tills can't exhaust the pool waiting
+on each other.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, List, Iterable
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+from config import settings
+from store_time import financial_year
+
+logger = logging.getLogger(__name__)
+
+# Refills run in short transactions of their own, on one dedicated connection
+refill_engine = create_engine(
+    database.SQLALCHEMY_DATABASE_URL,
+    pool_size=1,
+    max_overflow=0,
+    pool_pre_ping=True,
+    pool_recycle=300
+)
+RefillSession = sessionmaker(autocommit=False, autoflush=False, bind=refill_engine)
+
+class DocumentNumberAllocator:
+    POOL_SIZE_SQL = text("""
+        SELECT count(*) FROM document_number_pool
+        WHERE series = :series AND store_code = :store_code AND financial_year = :financial_year
+    """)
+
+    TAKE_SQL = text("""
+        DELETE FROM document_number_pool
+        WHERE id = (
+            SELECT id FROM document_number_pool
+            WHERE series = :series AND store_code = :store_code AND financial_year = :financial_year
+            ORDER BY number
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING number
+    """)
+
+    TAKE_MANY_SQL = text("""
+        DELETE FROM document_number_pool
+        WHERE id IN (
+            SELECT id FROM document_number_pool
+            WHERE series = :series AND store_code = :store_code AND financial_year = :financial_year
+            ORDER BY number
+            LIMIT :count
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING number
+    """)
+
+    ENSURE_COUNTER_SQL = text("""
+        INSERT INTO document_counters (series, store_code, financial_year, next_number)
+        VALUES (:series, :store_code, :financial_year, 1)
+        ON CONFLICT ON CONSTRAINT uq_document_counter_series DO NOTHING
+    """)
+
+    LOCK_COUNTER_SQL = text("""
+        SELECT next_number FROM document_counters
+        WHERE series = :series AND store_code = :store_code AND financial_year = :financial_year
+        FOR UPDATE
+    """)
+
+    FILL_POOL_SQL = text("""
+        INSERT INTO document_number_pool (series, store_code, financial_year, number)
+        SELECT :series, :store_code, :financial_year, n
+        FROM generate_series(CAST(:first AS integer), CAST(:last AS integer)) AS n
+    """)
+
+    ADVANCE_COUNTER_SQL = text("""
+        UPDATE document_counters
+        SET next_number = :next_number, updated_at = now()
+        WHERE series = :series AND store_code = :store_code AND financial_year = :financial_year
+    """)
+
+    def __init__(self):
+        self._series = set()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def format_number(self, series: str, store_code: str, fy: str, number: int) -> str:
+        """Render a document number, e.g. INV/2026-27/000123 or INV/S1/2026-27/000123"""
+        if store_code:
+            return f"{series}/{store_code}/{fy}/{number:06d}"
+        return f"{series}/{fy}/{number:06d}"
+
+    def refill(self, series: str, store_code: str, fy: str, block_size: Optional[int] = None):
+        """Move the next block of numbers from the counter into the pool, on the refill connection"""
+        block_size = block_size or settings.DOCUMENT_NUMBER_BLOCK_SIZE
+        params = {"series": series, "store_code": store_code, "financial_year": fy}
+        db = RefillSession()
+        try:
+            db.execute(self.ENSURE_COUNTER_SQL, params)
+            first = db.execute(self.LOCK_COUNTER_SQL, params).scalar()
+            last = first + block_size - 1
+            db.execute(self.FILL_POOL_SQL, dict(params, first=first, last=last))
+            db.execute(self.ADVANCE_COUNTER_SQL, dict(params, next_number=last + 1))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def next_number(self, db: Session, series: str, when: Optional[datetime] = None) -> str:
+        """Take the next free number for a series inside the caller's transaction"""
+        store_code = settings.STORE_CODE
+        fy = financial_year(when)
+        params = {"series": series, "store_code": store_code, "financial_year": fy}
+
+        self._series.add(series)
+        number = db.execute(self.TAKE_SQL, params).scalar()
+        while number is None:
+            self.refill(series, store_code, fy)
+            self._wake_event.set()
+            number = db.execute(self.TAKE_SQL, params).scalar()
+
+        return self.format_number(series, store_code, fy, number)
+
+    def next_numbers(self, db: Session, series: str, count: int, when: Optional[datetime] = None) -> List[str]:
+        """Take the next `count` free numbers for a series inside the caller's transaction, in order"""
+        store_code = settings.STORE_CODE
+        fy = financial_year(when)
+        params = {"series": series, "store_code": store_code, "financial_year": fy}
+
+        self._series.add(series)
+        numbers = []
+        while len(numbers) < count:
+            taken = [row.number for row in db.execute(self.TAKE_MANY_SQL, dict(params, count=count - len(numbers)))]
+            numbers.extend(taken)
+            if len(numbers) < count:
+                self.refill(series, store_code, fy, max(count - len(numbers), settings.DOCUMENT_NUMBER_BLOCK_SIZE))
+                self._wake_event.set()
+
+        return [self.format_number(series, store_code, fy, number) for number in sorted(numbers)]
+
+    def reserve_block(self, db: Session, series: str, count: int, fy: str = "") -> int:
+        """
+        Advance a counter by `count` inside the caller's transaction and return the first
+        number of the reserved block. For series where gaps don't matter (e.g. printed
+        barcodes), so the pool is bypassed and the counter row stays locked until commit.
+        """
+        params = {"series": series, "store_code": settings.STORE_CODE, "financial_year": fy}
+        db.execute(self.ENSURE_COUNTER_SQL, params)
+        first = db.execute(self.LOCK_COUNTER_SQL, params).scalar()
+        db.execute(self.ADVANCE_COUNTER_SQL, dict(params, next_number=first + count))
+        return first
+
+    def top_up(self, series: Iterable[str], when: Optional[datetime] = None):
+        """Refill each series' pool that has fewer than a block of free numbers left"""
+        store_code = settings.STORE_CODE
+        fy = financial_year(when)
+        for name in series:
+            db = RefillSession()
+            try:
+                free = db.execute(
+                    self.POOL_SIZE_SQL, {"series": name, "store_code": store_code, "financial_year": fy}
+                ).scalar()
+            finally:
+                db.close()
+            if free < settings.DOCUMENT_NUMBER_BLOCK_SIZE:
+                self.refill(name, store_code, fy)
+
+    def run_forever(self):
+        """Keep the pools topped up until stop() is called"""
+        logger.info("Document number refiller started")
+        while not self._stop_event.is_set():
+            try:
+                self.top_up(sorted(self._series))
+            except Exception as e:
+                logger.error(f"Document number refill error: {e}")
+            # Woken early when a checkout found its pool empty
+            self._wake_event.wait(settings.DOCUMENT_NUMBER_REFILL_SECONDS)
+            self._wake_event.clear()
+        logger.info("Document number refiller stopped")
+
+    def start(self, series: Iterable[str] = ("INV", "RET")):
+        """Start the refiller in a daemon thread; its first pass fills the pools before the first sale"""
+        self._series.update(series)
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="document-number-refiller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the refiller thread to stop and wait for it"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+# Global document number allocator instance
+document_number_allocator = DocumentNumberAllocator()
@@ -0,0 +1,125 @@
+"""
+Inventory Search
+Typeahead search over barcode, design number, colour and product name. Prefix matches
+use the lower(...) COLLATE "C" indexes, which serve both LIKE 'abc%' and the ordering; with pg_trgm installed, queries of three
+or more characters also match fuzzily through the trigram GIN indexes, which finds
+mistyped or mis-scanned barcodes and design numbers (see add_indexes.py).
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List
+
+# Below this length trigram similarity is meaningless, so only prefix matching is used
+FUZZY_MIN_LENGTH = 3
+
+class InventorySearchService:
+    # Every branch returns only its own best `limit` rows, read in index order, so a
+    # keystroke never ranks the whole catalog. Within a rank rows are ordered the same
+    # way as in their branch (by the matched value, then id; fuzzy matches by similarity).
+    SEARCH_SQL = """
+        WITH candidates AS (
+            (SELECT i.id FROM inventory_items i
+             WHERE lower(i.barcode) COLLATE "C" LIKE :prefix {in_stock} ORDER BY lower(i.barcode) COLLATE "C" LIMIT :limit)
+            UNION
+            (SELECT i.id FROM inventory_items i
+             WHERE lower(i.design_number) COLLATE "C" LIKE :prefix {in_stock} ORDER BY lower(i.design_number) COLLATE "C", i.id LIMIT :limit)
+            UNION
+            (SELECT i.id FROM inventory_items i
+             WHERE lower(i.color) COLLATE "C" LIKE :prefix {in_stock} ORDER BY lower(i.color) COLLATE "C", i.id LIMIT :limit)
+            UNION
+            -- Matching products are walked in name order, stopping after `limit` items
+            (SELECT i.id
+             FROM (SELECT id FROM products WHERE name ILIKE :contains ORDER BY name COLLATE "C", id) p
+             CROSS JOIN LATERAL (
+                 SELECT i.id FROM inventory_items i
+                 WHERE i.product_id = p.id {in_stock} ORDER BY i.id LIMIT :limit
+             ) i
+             LIMIT :limit)
+            {fuzzy}
+        ),
+        ranked AS (
+            SELECT i.id, i.product_id, p.name AS product_name, i.barcode, i.design_number, i.size, i.color,
+                   i.mrp, i.quantity,
+                   CASE
+                       WHEN lower(i.barcode) = :exact THEN 0
+                       WHEN lower(i.barcode) COLLATE "C" LIKE :prefix THEN 1
+                       WHEN lower(i.design_number) COLLATE "C" LIKE :prefix THEN 2
+                       WHEN lower(i.color) COLLATE "C" LIKE :prefix THEN 3
+                       WHEN p.name ILIKE :contains THEN 4
+                       ELSE 5
+                   END AS rank,
+                   {score} AS score
+            FROM candidates c
+            JOIN inventory_items i ON i.id = c.id
+            JOIN products p ON p.id = i.product_id
+        )
+        SELECT * FROM ranked
+        ORDER BY rank,
+                 CASE WHEN rank = 5 THEN score ELSE 0 END DESC,
+                 CASE rank
+                     WHEN 2 THEN lower(design_number)
+                     WHEN 3 THEN lower(color)
+                     WHEN 4 THEN product_name
+                     WHEN 5 THEN ''
+                     ELSE lower(barcode)
+                 END COLLATE "C",
+                 CASE WHEN rank = 4 THEN product_id END,
+                 id
+        LIMIT :limit
+    """
+
+    SIMILARITY = "GREATEST(similarity(i.barcode, :q), similarity(i.design_number, :q), similarity(i.color, :q), similarity(p.name, :q))"
+
+    FUZZY = """
+            UNION
+            (SELECT i.id FROM inventory_items i JOIN products p ON p.id = i.product_id
+             WHERE (i.barcode % :q OR i.design_number % :q OR i.color % :q) {in_stock}
+             ORDER BY {score} DESC, i.id LIMIT :limit)
+            UNION
+            (SELECT i.id FROM inventory_items i JOIN products p ON p.id = i.product_id
+             WHERE p.name % :q {in_stock}
+             ORDER BY {score} DESC, i.id LIMIT :limit)
+    """
+
+    MATCH_TYPES = {0: "exact", 1: "prefix", 2: "prefix", 3: "prefix", 4: "prefix", 5: "fuzzy"}
+
+    def __init__(self):
+        self._trigram_available = None
+
+    def trigram_available(self, db: Session) -> bool:
+        """Whether pg_trgm is installed (checked once per process)"""
+        if self._trigram_available is None:
+            self._trigram_available = db.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+        return self._trigram_available
+
+    def search(self, db: Session, q: str, limit: int = 20, in_stock: bool = False) -> List[dict]:
+        """Best matches first: exact barcode, barcode/design/colour prefixes, product name, then fuzzy matches"""
+        q = q.strip()
+        # Match the typed text literally, not as LIKE wildcards
+        escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        fuzzy = len(q) >= FUZZY_MIN_LENGTH and self.trigram_available(db)
+
+        in_stock_filter = "AND i.quantity > 0" if in_stock else ""
+        sql = self.SEARCH_SQL.format(
+            fuzzy=self.FUZZY.format(score=self.SIMILARITY, in_stock=in_stock_filter) if fuzzy else "",
+            score=self.SIMILARITY if fuzzy else "0.0",
+            in_stock=in_stock_filter
+        )
+        rows = db.execute(text(sql), {
+            "q": q,
+            "exact": q.lower(),
+            "prefix": f"{escaped}%",
+            "contains": f"%{escaped}%",
+            "limit": limit
+        }).mappings().all()
+
+        return [
+            dict(row, match_type=self.MATCH_TYPES[row["rank"]], score=round(float(row["score"]), 3))
+            for row in rows
+        ]
+
+# Global inventory search instance
+inventory_search = InventorySearchService()
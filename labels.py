@@ -0,0 +1,119 @@
+"""
+Label Sheet Generator
+Renders price tags (name, size/colour, MRP and a Code128 barcode) onto multi-page
+A4 label sheets. Barcodes are drawn as vector bars directly on the ReportLab canvas,
+so there is no per-label image rendering.
+"""
+
+import tempfile
+from typing import Iterable, Iterator, Dict
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.graphics.barcode.code128 import Code128
+
+from config import settings
+
+# Default sheet: A4, 3 columns x 8 rows of 70 x 37 mm labels
+LABEL_COLUMNS = 3
+LABEL_ROWS = 8
+LABEL_WIDTH = 70 * mm
+LABEL_HEIGHT = 37 * mm
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def format_barcode(number: int) -> str:
+    """Barcode text for an allocated sequence number, e.g. GP00001234"""
+    return f"{settings.BARCODE_PREFIX}{settings.STORE_CODE}{number:08d}"
+
+def fit_text(pdf: canvas.Canvas, text: str, font: str, size: float, max_width: float) -> str:
+    """Truncate text with an ellipsis so it fits the label width"""
+    if pdf.stringWidth(text, font, size) <= max_width:
+        return text
+    while text and pdf.stringWidth(text + "...", font, size) > max_width:
+        text = text[:-1]
+    return text + "..."
+
+class LabelSheetGenerator:
+    def __init__(self, columns: int = LABEL_COLUMNS, rows: int = LABEL_ROWS,
+                 label_width: float = LABEL_WIDTH, label_height: float = LABEL_HEIGHT):
+        self.columns = columns
+        self.rows = rows
+        self.label_width = label_width
+        self.label_height = label_height
+        page_width, page_height = A4
+        # Centre the grid on the page
+        self.margin_x = (page_width - columns * label_width) / 2
+        self.margin_y = (page_height - rows * label_height) / 2
+
+    def draw_label(self, pdf: canvas.Canvas, x: float, y: float, label: Dict):
+        """Draw one tag with its bottom-left corner at (x, y)"""
+        padding = 3 * mm
+        inner_width = self.label_width - 2 * padding
+        top = y + self.label_height - padding
+
+        pdf.setFont("Helvetica-Bold", 8)
+        pdf.drawString(x + padding, top - 8, fit_text(pdf, settings.SHOP_NAME, "Helvetica-Bold", 8, inner_width))
+
+        pdf.setFont("Helvetica", 7)
+        if label.get("product_name"):
+            pdf.drawString(x + padding, top - 17, fit_text(pdf, label["product_name"], "Helvetica", 7, inner_width))
+        details = "  ".join(
+            part for part in [
+                f"Size: {label['size']}" if label.get("size") else "",
+                f"Colour: {label['color']}" if label.get("color") else "",
+                label.get("design_number") or ""
+            ] if part
+        )
+        if details:
+            pdf.drawString(x + padding, top - 25, fit_text(pdf, details, "Helvetica", 7, inner_width))
+        if label.get("mrp") is not None:
+            pdf.setFont("Helvetica-Bold", 9)
+            pdf.drawRightString(x + self.label_width - padding, top - 8, f"MRP Rs. {label['mrp']:.2f}")
+
+        # Vector Code128: scale the module width so the symbol fits the label
+        symbol = Code128(label["barcode"], barHeight=10 * mm, barWidth=0.33 * mm, quiet=False)
+        if symbol.width > inner_width:
+            symbol = Code128(label["barcode"], barHeight=10 * mm,
+                             barWidth=0.33 * mm * inner_width / symbol.width, quiet=False)
+        symbol.drawOn(pdf, x + (self.label_width - symbol.width) / 2, y + padding + 8)
+
+        pdf.setFont("Helvetica", 7)
+        pdf.drawCentredString(x + self.label_width / 2, y + padding, label["barcode"])
+
+    def render(self, labels: Iterable[Dict], output) -> int:
+        """Render labels onto as many A4 sheets as needed; returns the number of pages"""
+        pdf = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+        pdf.setTitle("Barcode labels")
+        per_page = self.columns * self.rows
+        _, page_height = A4
+        count = 0
+
+        for label in labels:
+            slot = count % per_page
+            if count and slot == 0:
+                pdf.showPage()
+            column = slot % self.columns
+            row = slot // self.columns
+            x = self.margin_x + column * self.label_width
+            y = page_height - self.margin_y - (row + 1) * self.label_height
+            self.draw_label(pdf, x, y, label)
+            count += 1
+
+        pdf.showPage()
+        pdf.save()
+        return max(1, -(-count // per_page))
+
+    def stream(self, labels: Iterable[Dict]) -> Iterator[bytes]:
+        """Render to a temporary file and yield the PDF in chunks for a StreamingResponse"""
+        with tempfile.TemporaryFile(suffix=".pdf") as tmp_file:
+            self.render(labels, tmp_file)
+            tmp_file.seek(0)
+            while True:
+                chunk = tmp_file.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+# Global label sheet generator instance
+label_generator = LabelSheetGenerator()
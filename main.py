@@ -1,17 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, extract
+from fastapi import FastAPI, Depends, HTTPException, status, Header, UploadFile, File
+from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload
+from sqlalchemy import func, desc, and_, extract, case
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from fastapi.responses import Response
+from pydantic import ValidationError
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import models, schemas, database, auth
-import uuid
+import json
+import hashlib
+import csv
+import io
 import datetime
 from pdf_generator import pdf_generator
+from labels import label_generator, format_barcode
 from datetime import datetime, timedelta
 from ml_forecasting import InventoryOptimizer
 from whatsapp_service import whatsapp_service
+from whatsapp_outbox import enqueue_whatsapp_message, whatsapp_dispatcher
 from rbac_service import rbac_service
+from stock_service import stock_service
+from stock_take import stock_take_service
+from store_time import store_now, as_store_time, store_day_start, store_day_bounds, on_store_days
+from pricing import price_bill, price_return
+from barcode_cache import barcode_cache
+from variant_matrix import variant_matrix_service, variant_matrix_cache
+from sales_rollup import sales_rollup, TOP_PRODUCT_METRICS, TOP_PRODUCT_GROUPS
+from response_cache import response_cache
+from inventory_search import inventory_search
+from data_export import data_export, EXPORT_TABLES, EXPORT_FORMATS, PYARROW_AVAILABLE
+from pagination import paginate, NEXT_CURSOR_HEADER
+from document_numbers import document_number_allocator
 from config import settings
 from error_handler import setup_error_handlers, health_check as error_health_check, validate_dependencies, validate_database_connection
 import logging
@@ -36,6 +55,47 @@ try:
 except Exception as e:
     logger.warning(f"Database migration warning: {e}")
 
+# Run database migration for last_sold_at column
+try:
+    from add_last_sold_at_column import add_last_sold_at_column
+    add_last_sold_at_column()
+except Exception as e:
+    logger.warning(f"Database migration warning: {e}")
+
+# Create indexes that create_all() does not add to existing tables
+try:
+    from add_indexes import add_indexes
+    add_indexes()
+except Exception as e:
+    logger.warning(f"Database migration warning: {e}")
+
+# Give stock that predates the movement ledger an opening balance
+try:
+    db = database.SessionLocal()
+    try:
+        opened = stock_service.record_opening_balances(db)
+        db.commit()
+        if opened:
+            logger.info(f"Recorded opening stock balances for {opened} inventory items")
+    finally:
+        db.close()
+except Exception as e:
+    logger.warning(f"Database migration warning: {e}")
+
+# Build the daily sales rollup from existing invoices and returns on first start
+try:
+    db = database.SessionLocal()
+    try:
+        if sales_rollup.is_empty(db):
+            rows = sales_rollup.rebuild(db)
+            db.commit()
+            if rows:
+                logger.info(f"Backfilled {rows} daily sales rollup rows")
+    finally:
+        db.close()
+except Exception as e:
+    logger.warning(f"Database migration warning: {e}")
+
 # Ensure Product model has all required columns
 try:
     from sqlalchemy import text
@@ -124,8 +184,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Idempotent-Replayed"],
 )
 
+# ==================== BACKGROUND WORKERS ====================
+@app.on_event("startup")
+def start_background_workers():
+    """Start the WhatsApp outbox dispatcher and the document number refiller"""
+    if settings.WHATSAPP_OUTBOX_ENABLED:
+        whatsapp_dispatcher.start()
+    document_number_allocator.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    """Stop the WhatsApp outbox dispatcher and the document number refiller"""
+    whatsapp_dispatcher.stop()
+    document_number_allocator.stop()
+
 # ==================== HEALTH CHECK ====================
 @app.get("/health")
 def health_check():
@@ -377,58 +452,195 @@ PRODUCT_TYPES = [
     "3/4 Sleeve", "Bell Sleeve", "Puff Sleeve", "Ruffle", "Lace", "Embroidered"
 ]
 
-def generate_invoice_number():
-    """Generate a unique invoice number"""
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_suffix = str(uuid.uuid4())[:8].upper()
-    return f"INV-{timestamp}-{random_suffix}"
+def generate_invoice_number(db: Session):
+    """Allocate the next sequential invoice number for this store and financial year"""
+    return document_number_allocator.next_number(db, "INV")
+
+def invalidate_stock_caches(barcodes, product_ids, sales: bool = False):
+    """
+    Drop cached barcode lookups, variant grids and stock reports after a committed stock
+    change; sales=True (checkout, returns) also retires the cached sales reports
+    """
+    barcode_cache.invalidate(barcodes)
+    variant_matrix_cache.invalidate(product_ids)
+    response_cache.invalidate(["stock", "sales"] if sales else ["stock"])
+
+def load_inventory_by_barcodes(db: Session, barcodes: List[str]) -> dict:
+    """Load inventory items and their products for a set of barcodes in one query"""
+    if not barcodes:
+        return {}
+
+    rows = db.query(models.InventoryItem, models.Product).outerjoin(
+        models.Product, models.Product.id == models.InventoryItem.product_id
+    ).filter(
+        models.InventoryItem.barcode.in_(set(barcodes))
+    ).all()
+
+    return {inventory_item.barcode: (inventory_item, product) for inventory_item, product in rows}
+
+def validate_cart_barcodes(items, inventory_by_barcode: dict):
+    """Report all missing and duplicate barcodes in a cart as one error"""
+    seen = set()
+    duplicates = []
+    missing = []
+    for item in items:
+        if item.barcode in seen:
+            if item.barcode not in duplicates:
+                duplicates.append(item.barcode)
+            continue
+        seen.add(item.barcode)
+        if item.barcode not in inventory_by_barcode:
+            missing.append(item.barcode)
+
+    if missing or duplicates:
+        problems = []
+        if missing:
+            problems.append(f"Inventory items not found for barcodes: {', '.join(missing)}")
+        if duplicates:
+            problems.append(f"Duplicate barcodes in cart: {', '.join(duplicates)}")
+        raise HTTPException(
+            status_code=404 if missing else 400,
+            detail="; ".join(problems)
+        )
+
+def reserve_cart_stock(db: Session, items, inventory_by_barcode: dict, invoice_id: Optional[int] = None, created_by: Optional[int] = None):
+    """Atomically decrement stock (and log SALE movements) for every cart line, rejecting the sale if any line falls short"""
+    quantities = {}
+    barcode_by_id = {}
+    for item in items:
+        inventory_item, _ = inventory_by_barcode[item.barcode]
+        quantities[inventory_item.id] = quantities.get(inventory_item.id, 0) + item.quantity
+        barcode_by_id[inventory_item.id] = item.barcode
+
+    shortfalls = stock_service.decrement(
+        db, quantities, movement_type="SALE", reference_type="INVOICE", reference_id=invoice_id, created_by=created_by
+    )
+    if shortfalls:
+        raise HTTPException(
+            status_code=400,
+            detail="; ".join(
+                f"Insufficient stock for barcode {barcode_by_id[s['inventory_item_id']]}. "
+                f"Available: {s['available']}, Requested: {s['requested']}"
+                for s in shortfalls
+            )
+        )
+
+def build_cart_lines(items, inventory_by_barcode: dict) -> list:
+    """Pair each cart line with its inventory item, product name, MRP and GST rate"""
+    cart_lines = []
+    for item in items:
+        inventory_item, product = inventory_by_barcode[item.barcode]
+        cart_lines.append({
+            'inventory_item': inventory_item,
+            'quantity': item.quantity,
+            'product_name': product.name if product else "Unknown Product",
+            'unit_mrp': inventory_item.mrp,
+            'gst_rate': product.gst_rate if product else 12.0  # Default 12% GST
+        })
+    return cart_lines
+
+def build_invoice_item_rows(invoice_id: int, cart_lines: list, bill: dict) -> list:
+    """Invoice item rows for a bulk insert, from cart lines and their priced bill lines"""
+    return [
+        {
+            'invoice_id': invoice_id,
+            'inventory_item_id': item_data['inventory_item'].id,
+            'barcode': item_data['inventory_item'].barcode,
+            'product_name': item_data['product_name'],
+            'design_number': item_data['inventory_item'].design_number,
+            'size': item_data['inventory_item'].size,
+            'color': item_data['inventory_item'].color,
+            'unit_price': item_data['unit_mrp'],
+            'quantity': item_data['quantity'],
+            'total_price': line['total_price'],
+            'discount_amount': line['discount_amount'],
+            'final_price': line['final_price'],
+            'base_price': line['base_price'],
+            'gst_amount': line['gst_amount'],
+            'cgst_amount': line['cgst_amount'],
+            'sgst_amount': line['sgst_amount'],
+            'gst_rate': item_data['gst_rate']
+        }
+        for item_data, line in zip(cart_lines, bill['lines'])
+    ]
+
+def build_thank_you_message(invoice_number: str, total_final_price: float, loyalty_points_earned: int, total_mrp: float) -> str:
+    """WhatsApp thank-you message sent after a purchase"""
+    return f"""
+🎉 Thank you for your purchase!
+
+Invoice: #{invoice_number}
+Total: ₹{total_final_price:.2f}
+Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+
+Your loyalty points: {loyalty_points_earned} earned
+Total spent: ₹{total_mrp:.2f}
+
+Thank you for choosing us! 🙏
+    """.strip()
+
+def checkout_request_hash(checkout_data: schemas.CheckoutRequest) -> str:
+    """Fingerprint of a checkout request, stored with its Idempotency-Key"""
+    return hashlib.sha256(
+        json.dumps(checkout_data.dict(), sort_keys=True).encode()
+    ).hexdigest()
+
+def claim_checkout_idempotency_key(db: Session, key: str, request_hash: str):
+    """Claim an Idempotency-Key for a new checkout, or return the invoice it already produced"""
+    existing = db.query(models.CheckoutIdempotencyKey).filter(
+        models.CheckoutIdempotencyKey.key == key
+    ).first()
+
+    if existing is None:
+        claim = models.CheckoutIdempotencyKey(key=key, request_hash=request_hash)
+        db.add(claim)
+        try:
+            # Blocks while a concurrent request holds the same key, then fails once it commits
+            db.flush()
+            return claim, None
+        except IntegrityError:
+            db.rollback()
+            existing = db.query(models.CheckoutIdempotencyKey).filter(
+                models.CheckoutIdempotencyKey.key == key
+            ).first()
+
+    if existing.request_hash != request_hash:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different checkout")
+
+    return None, existing.invoice
 
 @app.post("/checkout/", response_model=schemas.CheckoutResponse)
 def create_checkout(
     checkout_data: schemas.CheckoutRequest, 
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_cashier_or_admin)
 ):
     """Create a new invoice from checkout data with proper Indian retail billing"""
     try:
-        # Validate all items exist and have sufficient stock
-        items_to_process = []
-        total_mrp = 0
-        
-        for item in checkout_data.items:
-            inventory_item = db.query(models.InventoryItem).filter(
-                models.InventoryItem.barcode == item.barcode
-            ).first()
-            
-            if not inventory_item:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Inventory item with barcode {item.barcode} not found"
+        # A retried request with the same Idempotency-Key returns the original invoice
+        idempotency_claim = None
+        if idempotency_key:
+            request_hash = checkout_request_hash(checkout_data)
+            idempotency_claim, original_invoice = claim_checkout_idempotency_key(db, idempotency_key, request_hash)
+            if original_invoice is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return schemas.CheckoutResponse(
+                    invoice=original_invoice,
+                    message=f"Invoice {original_invoice.invoice_number} created successfully!"
                 )
-            
-            if inventory_item.quantity < item.quantity:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Insufficient stock for barcode {item.barcode}. Available: {inventory_item.quantity}, Requested: {item.quantity}"
-                )
-            
-            # Get product details for invoice
-            product = db.query(models.Product).filter(models.Product.id == inventory_item.product_id).first()
-            product_name = product.name if product else "Unknown Product"
-            gst_rate = product.gst_rate if product else 12.0  # Default 12% GST
-            
-            # Calculate item totals (MRP is GST-inclusive)
-            item_mrp = inventory_item.mrp * item.quantity
-            total_mrp += item_mrp
-            
-            items_to_process.append({
-                'inventory_item': inventory_item,
-                'quantity': item.quantity,
-                'product_name': product_name,
-                'item_mrp': item_mrp,
-                'unit_mrp': inventory_item.mrp,
-                'gst_rate': gst_rate
-            })
+
+        # Resolve every barcode in the cart (with its product) in a single query
+        inventory_by_barcode = load_inventory_by_barcodes(
+            db, [item.barcode for item in checkout_data.items]
+        )
+        validate_cart_barcodes(checkout_data.items, inventory_by_barcode)
+
+        items_to_process = build_cart_lines(checkout_data.items, inventory_by_barcode)
+        
+        # Total MRP (GST-inclusive), rounded to paise
+        total_mrp = round(sum(item_data['unit_mrp'] * item_data['quantity'] for item_data in items_to_process), 2)
         
         # Handle customer and loyalty points
         customer = None
@@ -447,8 +659,7 @@ def create_checkout(
                     email=checkout_data.customer_email
                 )
                 db.add(customer)
-                db.commit()
-                db.refresh(customer)
+                db.flush()
             
             # Calculate loyalty points earned (1 point per Rs. 100 spent)
             loyalty_points_earned = int(total_mrp / 100)
@@ -469,40 +680,32 @@ def create_checkout(
             customer.total_orders += 1
             customer.last_visit_date = datetime.now()
         
-        # Calculate bill-level discount
-        total_discount = 0
-        if checkout_data.discount_type == "PERCENT" and checkout_data.discount_value > 0:
-            total_discount = total_mrp * (checkout_data.discount_value / 100)
-        elif checkout_data.discount_type == "FIXED" and checkout_data.discount_value > 0:
-            total_discount = min(checkout_data.discount_value, total_mrp)
-        
-        # Add loyalty discount to total discount
-        total_discount += loyalty_discount_amount
-        
-        # Calculate final price after all discounts
-        total_final_price = total_mrp - total_discount
-        
-        # Calculate base amount and GST (reverse calculation)
-        total_base_amount = total_final_price / (1 + 12.0 / 100)  # Assuming 12% GST
-        total_gst_amount = total_final_price - total_base_amount
-        total_cgst_amount = total_gst_amount / 2
-        total_sgst_amount = total_gst_amount / 2
+        # Price the whole bill: bill-level and loyalty discounts spread across lines,
+        # GST reverse-calculated at each line's own rate, header = sum of lines
+        bill = price_bill(
+            unit_mrps=[item_data['unit_mrp'] for item_data in items_to_process],
+            quantities=[item_data['quantity'] for item_data in items_to_process],
+            gst_rates=[item_data['gst_rate'] for item_data in items_to_process],
+            discount_type=checkout_data.discount_type,
+            discount_value=checkout_data.discount_value,
+            extra_discount=loyalty_discount_amount
+        )
         
         # Create invoice
-        invoice_number = generate_invoice_number()
+        invoice_number = generate_invoice_number(db)
         db_invoice = models.Invoice(
             invoice_number=invoice_number,
             customer_id=customer.id if customer else None,
             customer_name=checkout_data.customer_name,
             customer_phone=checkout_data.customer_phone,
             customer_email=checkout_data.customer_email,
-            total_mrp=total_mrp,
-            total_discount=total_discount,
-            total_final_price=total_final_price,
-            total_base_amount=total_base_amount,
-            total_gst_amount=total_gst_amount,
-            total_cgst_amount=total_cgst_amount,
-            total_sgst_amount=total_sgst_amount,
+            total_mrp=bill['total_mrp'],
+            total_discount=bill['total_discount'],
+            total_final_price=bill['total_final_price'],
+            total_base_amount=bill['total_base_amount'],
+            total_gst_amount=bill['total_gst_amount'],
+            total_cgst_amount=bill['total_cgst_amount'],
+            total_sgst_amount=bill['total_sgst_amount'],
             payment_method=checkout_data.payment_method,
             loyalty_points_earned=loyalty_points_earned,
             loyalty_points_redeemed=loyalty_points_redeemed,
@@ -511,51 +714,18 @@ def create_checkout(
         )
         
         db.add(db_invoice)
-        db.commit()
-        db.refresh(db_invoice)
+        db.flush()
         
-        # Create invoice items and update inventory
-        for item_data in items_to_process:
-            inventory_item = item_data['inventory_item']
-            
-            # Calculate item-level discount proportion
-            item_discount = 0
-            if total_discount > 0:
-                item_discount = (item_data['item_mrp'] / total_mrp) * total_discount
-            
-            item_final_price = item_data['item_mrp'] - item_discount
-            item_base_price = item_final_price / (1 + item_data['gst_rate'] / 100)
-            item_gst_amount = item_final_price - item_base_price
-            item_cgst_amount = item_gst_amount / 2
-            item_sgst_amount = item_gst_amount / 2
-            
-            # Create invoice item
-            db_invoice_item = models.InvoiceItem(
-                invoice_id=db_invoice.id,
-                inventory_item_id=inventory_item.id,
-                barcode=inventory_item.barcode,
-                product_name=item_data['product_name'],
-                design_number=inventory_item.design_number,
-                size=inventory_item.size,
-                color=inventory_item.color,
-                unit_price=item_data['unit_mrp'],
-                quantity=item_data['quantity'],
-                total_price=item_data['item_mrp'],
-                discount_amount=item_discount,
-                final_price=item_final_price,
-                base_price=item_base_price,
-                gst_amount=item_gst_amount,
-                cgst_amount=item_cgst_amount,
-                sgst_amount=item_sgst_amount,
-                gst_rate=item_data['gst_rate']
-            )
-            db.add(db_invoice_item)
-            
-            # Update inventory (subtract quantity)
-            inventory_item.quantity -= item_data['quantity']
+        if idempotency_claim is not None:
+            idempotency_claim.invoice_id = db_invoice.id
         
-        db.commit()
-        db.refresh(db_invoice)
+        # Reserve stock for the whole cart with one conditional UPDATE, logged against the invoice;
+        # a shortfall rolls back the invoice as well
+        reserve_cart_stock(db, checkout_data.items, inventory_by_barcode, db_invoice.id, current_user.id)
+        
+        # Create invoice items
+        invoice_item_rows = build_invoice_item_rows(db_invoice.id, items_to_process, bill)
+        db.bulk_insert_mappings(models.InvoiceItem, invoice_item_rows)
         
         # Create loyalty transaction if customer exists and points were earned
         if customer and loyalty_points_earned > 0:
@@ -571,44 +741,28 @@ def create_checkout(
             
             # Update customer points earned
             customer.loyalty_points += loyalty_points_earned
-            db.commit()
         
-        # Send WhatsApp messages if customer phone is provided
+        # Queue the WhatsApp thank-you message in the outbox; the dispatcher sends it after commit
         if checkout_data.customer_phone and whatsapp_service.validate_phone_number(checkout_data.customer_phone):
-            try:
-                # Send thank you message with loyalty points
-                thank_you_message = f"""
-🎉 Thank you for your purchase!
-
-Invoice: #{db_invoice.invoice_number}
-Total: ₹{db_invoice.total_final_price:.2f}
-Date: {db_invoice.created_at.strftime('%Y-%m-%d %H:%M')}
-
-Your loyalty points: {loyalty_points_earned} earned
-Total spent: ₹{total_mrp:.2f}
-
-Thank you for choosing us! 🙏
-                """.strip()
-                
-                whatsapp_result = whatsapp_service.send_text_message(checkout_data.customer_phone, thank_you_message)
-                
-                # Log the WhatsApp message
-                whatsapp_log = models.WhatsAppLog(
-                    customer_id=customer.id if customer else None,
-                    invoice_id=db_invoice.id,
-                    phone_number=checkout_data.customer_phone,
-                    message_type="THANK_YOU",
-                    message_content=thank_you_message,
-                    status=whatsapp_result["status"],
-                    interakt_message_id=whatsapp_result.get("message_id"),
-                    error_message=whatsapp_result.get("error")
-                )
-                db.add(whatsapp_log)
-                db.commit()
-                
-            except Exception as e:
-                # Log WhatsApp error but don't fail the checkout
-                logger.error(f"Error sending WhatsApp message: {str(e)}")
+            enqueue_whatsapp_message(
+                db,
+                phone_number=checkout_data.customer_phone,
+                message=build_thank_you_message(
+                    db_invoice.invoice_number, db_invoice.total_final_price, loyalty_points_earned, total_mrp
+                ),
+                message_type="THANK_YOU",
+                customer_id=customer.id if customer else None,
+                invoice_id=db_invoice.id
+            )
+        
+        # Add the sale to today's rollups last, so their row locks are held only until the commit
+        sales_rollup.record_product_sales(db, invoice_item_rows)
+        sales_rollup.record_sales(db, [dict(bill, payment_method=checkout_data.payment_method)])
+        
+        # Commit the whole sale (customer, invoice, items, stock, loyalty, outbox) at once
+        touched_products = {inventory_item.product_id for inventory_item, _ in inventory_by_barcode.values()}
+        db.commit()
+        invalidate_stock_caches(inventory_by_barcode.keys(), touched_products, sales=True)
         
         return schemas.CheckoutResponse(
             invoice=db_invoice,
@@ -616,21 +770,298 @@ Thank you for choosing us! 🙏
         )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating invoice: {str(e)}")
 
+@app.post("/checkout/batch", response_model=schemas.CheckoutBatchResponse)
+def create_checkout_batch(
+    batch: schemas.CheckoutBatchRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_cashier_or_admin)
+):
+    """Record many queued sales at once (e.g. bills written on paper while a till was offline).
+    Sales are checked and priced independently; every sale that passes is committed in one transaction."""
+    if len(batch.sales) > settings.CHECKOUT_BATCH_MAX_SALES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.CHECKOUT_BATCH_MAX_SALES} sales"
+        )
+    
+    results = {}
+    
+    def fail(index, sale, status_code, error):
+        results[index] = schemas.CheckoutBatchResult(
+            index=index, client_reference=sale.client_reference, success=False,
+            status_code=status_code, error=error
+        )
+    
+    try:
+        # Idempotency keys: replay sales that were already recorded by an earlier attempt
+        request_hashes = {}
+        pending = []
+        seen_keys = set()
+        for index, sale in enumerate(batch.sales):
+            if sale.idempotency_key:
+                if sale.idempotency_key in seen_keys:
+                    fail(index, sale, 400, "Duplicate idempotency key in batch")
+                    continue
+                seen_keys.add(sale.idempotency_key)
+                request_hashes[index] = checkout_request_hash(
+                    schemas.CheckoutRequest(**sale.dict(exclude={"client_reference", "idempotency_key"}))
+                )
+            pending.append(index)
+        
+        existing_claims = {}
+        if seen_keys:
+            existing_claims = {
+                claim.key: claim
+                for claim in db.query(models.CheckoutIdempotencyKey).options(
+                    joinedload(models.CheckoutIdempotencyKey.invoice)
+                ).filter(models.CheckoutIdempotencyKey.key.in_(seen_keys)).all()
+            }
+        
+        to_validate = []
+        for index in pending:
+            sale = batch.sales[index]
+            claim = existing_claims.get(sale.idempotency_key) if sale.idempotency_key else None
+            if claim is None:
+                to_validate.append(index)
+            elif claim.request_hash != request_hashes[index] or claim.invoice is None:
+                fail(index, sale, 409, "Idempotency-Key was already used for a different checkout")
+            else:
+                results[index] = schemas.CheckoutBatchResult(
+                    index=index, client_reference=sale.client_reference, success=True, status_code=200,
+                    invoice_id=claim.invoice.id, invoice_number=claim.invoice.invoice_number,
+                    total_final_price=claim.invoice.total_final_price, replayed=True
+                )
+        
+        # Resolve every barcode across the whole batch in a single query
+        inventory_by_barcode = load_inventory_by_barcodes(
+            db, [item.barcode for index in to_validate for item in batch.sales[index].items]
+        )
+        valid = []
+        for index in to_validate:
+            sale = batch.sales[index]
+            try:
+                validate_cart_barcodes(sale.items, inventory_by_barcode)
+                valid.append(index)
+            except HTTPException as e:
+                fail(index, sale, e.status_code, e.detail)
+        
+        # Lock the stock of every item in the batch, then allocate it to sales in order
+        available = stock_service.lock_quantities(
+            db, [inventory_by_barcode[item.barcode][0].id for index in valid for item in batch.sales[index].items]
+        )
+        phones = {batch.sales[index].customer_phone for index in valid if batch.sales[index].customer_phone}
+        customers_by_phone = {}
+        if phones:
+            customers_by_phone = {
+                customer.phone: customer
+                for customer in db.query(models.Customer).filter(models.Customer.phone.in_(phones)).all()
+            }
+        
+        accepted = []
+        for index in valid:
+            sale = batch.sales[index]
+            quantities = {}
+            for item in sale.items:
+                inventory_item = inventory_by_barcode[item.barcode][0]
+                quantities[inventory_item.id] = quantities.get(inventory_item.id, 0) + item.quantity
+            shortfalls = [
+                f"Insufficient stock for barcode {inventory_by_barcode[item.barcode][0].barcode}. "
+                f"Available: {available.get(inventory_by_barcode[item.barcode][0].id, 0)}, Requested: {item.quantity}"
+                for item in sale.items
+                if available.get(inventory_by_barcode[item.barcode][0].id, 0) < quantities[inventory_by_barcode[item.barcode][0].id]
+            ]
+            if shortfalls:
+                fail(index, sale, 400, "; ".join(shortfalls))
+                continue
+            
+            # Loyalty points are redeemed against the balance left by earlier sales in the batch
+            cart_lines = build_cart_lines(sale.items, inventory_by_barcode)
+            total_mrp = round(sum(item_data['unit_mrp'] * item_data['quantity'] for item_data in cart_lines), 2)
+            customer = customers_by_phone.get(sale.customer_phone) if sale.customer_phone else None
+            if sale.customer_phone and sale.loyalty_points_redeemed > 0:
+                # A customer not created yet has no points
+                points_available = (customer.loyalty_points or 0) if customer is not None else 0
+                if points_available < sale.loyalty_points_redeemed:
+                    fail(index, sale, 400, "Insufficient loyalty points")
+                    continue
+                customer.loyalty_points -= sale.loyalty_points_redeemed
+            # New customers are only added once their sale is accepted
+            if sale.customer_phone and customer is None:
+                customer = models.Customer(
+                    phone=sale.customer_phone,
+                    name=sale.customer_name,
+                    email=sale.customer_email
+                )
+                db.add(customer)
+                customers_by_phone[sale.customer_phone] = customer
+            
+            loyalty_points_earned = 0
+            if customer is not None:
+                # 1 point per Rs. 100 spent
+                loyalty_points_earned = int(total_mrp / 100)
+                customer.loyalty_points = (customer.loyalty_points or 0) + loyalty_points_earned
+                customer.total_spent = (customer.total_spent or 0) + total_mrp
+                customer.total_orders = (customer.total_orders or 0) + 1
+                customer.last_visit_date = datetime.now()
+            
+            for inventory_item_id, quantity in quantities.items():
+                available[inventory_item_id] -= quantity
+            accepted.append((index, customer, cart_lines, total_mrp, loyalty_points_earned))
+        
+        if accepted:
+            db.flush()  # Assigns ids to new customers
+            
+            invoice_numbers = document_number_allocator.next_numbers(db, "INV", len(accepted))
+            invoice_rows = []
+            sale_details = []
+            for (index, customer, cart_lines, total_mrp, loyalty_points_earned), invoice_number in zip(accepted, invoice_numbers):
+                sale = batch.sales[index]
+                loyalty_points_redeemed = sale.loyalty_points_redeemed
+                # 1 redeemed point = Rs. 1 off the bill
+                loyalty_discount_amount = loyalty_points_redeemed if customer is not None else 0
+                
+                bill = price_bill(
+                    unit_mrps=[item_data['unit_mrp'] for item_data in cart_lines],
+                    quantities=[item_data['quantity'] for item_data in cart_lines],
+                    gst_rates=[item_data['gst_rate'] for item_data in cart_lines],
+                    discount_type=sale.discount_type,
+                    discount_value=sale.discount_value,
+                    extra_discount=loyalty_discount_amount
+                )
+                invoice_rows.append({
+                    'invoice_number': invoice_number,
+                    'customer_id': customer.id if customer else None,
+                    'customer_name': sale.customer_name,
+                    'customer_phone': sale.customer_phone,
+                    'customer_email': sale.customer_email,
+                    'total_mrp': bill['total_mrp'],
+                    'total_discount': bill['total_discount'],
+                    'total_final_price': bill['total_final_price'],
+                    'total_base_amount': bill['total_base_amount'],
+                    'total_gst_amount': bill['total_gst_amount'],
+                    'total_cgst_amount': bill['total_cgst_amount'],
+                    'total_sgst_amount': bill['total_sgst_amount'],
+                    'payment_method': sale.payment_method,
+                    'loyalty_points_earned': loyalty_points_earned,
+                    'loyalty_points_redeemed': loyalty_points_redeemed,
+                    'loyalty_discount_amount': loyalty_discount_amount,
+                    'notes': sale.notes
+                })
+                sale_details.append((index, customer, cart_lines, bill, total_mrp, loyalty_points_earned))
+            
+            # Bulk-insert the invoices in one statement and match the generated ids by invoice number
+            invoice_ids = dict(
+                (row.invoice_number, row.id)
+                for row in db.execute(
+                    models.Invoice.__table__.insert().values(invoice_rows).returning(
+                        models.Invoice.__table__.c.id, models.Invoice.__table__.c.invoice_number
+                    )
+                )
+            )
+            
+            invoice_item_rows = []
+            loyalty_rows = []
+            idempotency_rows = []
+            stock_movements = []
+            for (index, customer, cart_lines, bill, total_mrp, loyalty_points_earned), invoice_row in zip(sale_details, invoice_rows):
+                sale = batch.sales[index]
+                invoice_id = invoice_ids[invoice_row['invoice_number']]
+                invoice_item_rows.extend(build_invoice_item_rows(invoice_id, cart_lines, bill))
+                stock_movements.extend(
+                    {"inventory_item_id": item_data['inventory_item'].id, "quantity": -item_data['quantity'], "reference_id": invoice_id}
+                    for item_data in cart_lines
+                )
+                
+                if customer is not None and loyalty_points_earned > 0:
+                    loyalty_rows.append({
+                        'customer_id': customer.id,
+                        'invoice_id': invoice_id,
+                        'transaction_type': "EARNED",
+                        'points': loyalty_points_earned,
+                        'amount_spent': total_mrp,
+                        'description': f"Earned {loyalty_points_earned} points for purchase of Rs. {total_mrp:.2f}"
+                    })
+                
+                if sale.idempotency_key:
+                    idempotency_rows.append({
+                        'key': sale.idempotency_key,
+                        'request_hash': request_hashes[index],
+                        'invoice_id': invoice_id
+                    })
+                
+                if sale.customer_phone and whatsapp_service.validate_phone_number(sale.customer_phone):
+                    enqueue_whatsapp_message(
+                        db,
+                        phone_number=sale.customer_phone,
+                        message=build_thank_you_message(
+                            invoice_row['invoice_number'], bill['total_final_price'], loyalty_points_earned, total_mrp
+                        ),
+                        message_type="THANK_YOU",
+                        customer_id=customer.id if customer else None,
+                        invoice_id=invoice_id
+                    )
+                
+                results[index] = schemas.CheckoutBatchResult(
+                    index=index, client_reference=sale.client_reference, success=True, status_code=200,
+                    invoice_id=invoice_id, invoice_number=invoice_row['invoice_number'],
+                    total_final_price=bill['total_final_price']
+                )
+            
+            # One stock move for the whole batch; the rows are locked, so it cannot fall short
+            stock_service.move(db, "SALE", stock_movements, reference_type="INVOICE", created_by=current_user.id)
+            db.bulk_insert_mappings(models.InvoiceItem, invoice_item_rows)
+            if loyalty_rows:
+                db.bulk_insert_mappings(models.LoyaltyTransaction, loyalty_rows)
+            if idempotency_rows:
+                db.bulk_insert_mappings(models.CheckoutIdempotencyKey, idempotency_rows)
+            sales_rollup.record_product_sales(db, invoice_item_rows)
+            sales_rollup.record_sales(db, invoice_rows)
+        
+        # Commit every accepted sale at once
+        touched_products = {inventory_item.product_id for inventory_item, _ in inventory_by_barcode.values()}
+        db.commit()
+        invalidate_stock_caches(inventory_by_barcode.keys(), touched_products, sales=True)
+        
+    except IntegrityError:
+        # Another request recorded one of these idempotency keys concurrently; a retry will replay it
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Some sales in this batch are being recorded concurrently. Retry the batch.")
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error recording checkout batch: {str(e)}")
+    
+    ordered_results = [results[index] for index in range(len(batch.sales))]
+    succeeded = sum(1 for result in ordered_results if result.success)
+    return schemas.CheckoutBatchResponse(
+        results=ordered_results,
+        succeeded=succeeded,
+        failed=len(ordered_results) - succeeded
+    )
+
 @app.get("/invoices/", response_model=List[schemas.Invoice])
 def get_invoices(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_cashier_or_admin)
 ):
-    """Get all invoices"""
-    invoices = db.query(models.Invoice).offset(skip).limit(limit).all()
-    return invoices
+    """Get all invoices, newest first (pass X-Next-Cursor back as `cursor` for the next page)"""
+    return paginate(
+        db.query(models.Invoice).options(selectinload(models.Invoice.items)),
+        [models.Invoice.created_at, models.Invoice.id],
+        limit, response, cursor=cursor, skip=skip, descending=True
+    )
 
 @app.get("/invoices/{invoice_id}", response_model=schemas.Invoice)
 def get_invoice(
@@ -644,7 +1075,19 @@ def get_invoice(
         raise HTTPException(status_code=404, detail="Invoice not found")
     return invoice
 
-@app.get("/invoices/number/{invoice_number}", response_model=schemas.Invoice)
+@app.get("/invoices/number/{invoice_number:path}/pdf")
+def export_invoice_by_number_pdf(invoice_number: str, db: Session = Depends(database.get_db)):
+    """Export invoice by invoice number as PDF"""
+    invoice = db.query(models.Invoice).filter(models.Invoice.invoice_number == invoice_number).first()
+    if invoice is None:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    try:
+        return pdf_generator.generate_invoice_pdf(invoice)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+
+@app.get("/invoices/number/{invoice_number:path}", response_model=schemas.Invoice)
 def get_invoice_by_number(
     invoice_number: str, 
     db: Session = Depends(database.get_db),
@@ -668,20 +1111,6 @@ def export_invoice_pdf(invoice_id: int, db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
-
-
-@app.get("/invoices/number/{invoice_number}/pdf")
-def export_invoice_by_number_pdf(invoice_number: str, db: Session = Depends(database.get_db)):
-    """Export invoice by invoice number as PDF"""
-    invoice = db.query(models.Invoice).filter(models.Invoice.invoice_number == invoice_number).first()
-    if invoice is None:
-        raise HTTPException(status_code=404, detail="Invoice not found")
-    
-    try:
-        return pdf_generator.generate_invoice_pdf(invoice)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
-
 # ==================== DEALER ENDPOINTS ====================
 @app.post("/dealers/", response_model=schemas.Dealer, status_code=status.HTTP_201_CREATED)
 def create_dealer(
@@ -697,13 +1126,14 @@ def create_dealer(
 
 @app.get("/dealers/", response_model=List[schemas.Dealer])
 def get_dealers(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
-    dealers = db.query(models.Dealer).offset(skip).limit(limit).all()
-    return dealers
+    return paginate(db.query(models.Dealer), [models.Dealer.id], limit, response, cursor=cursor, skip=skip)
 
 @app.get("/dealers/{dealer_id}", response_model=schemas.Dealer)
 def get_dealer(
@@ -731,15 +1161,18 @@ def create_brand(
 
 @app.get("/brands/", response_model=List[schemas.Brand])
 def get_brands(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
     try:
         # Query brands without loading relationships to avoid potential issues
-        brands = db.query(models.Brand).offset(skip).limit(limit).all()
-        return brands
+        return paginate(db.query(models.Brand), [models.Brand.id], limit, response, cursor=cursor, skip=skip)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching brands: {e}")
         # Return empty list instead of crashing
@@ -850,14 +1283,16 @@ def create_product(
 
 @app.get("/products/")
 def get_products(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
     try:
         # Query products with specific columns to avoid relationship issues
-        products = db.query(
+        products = paginate(db.query(
             models.Product.id,
             models.Product.brand_id,
             models.Product.type,
@@ -866,7 +1301,7 @@ def get_products(
             models.Product.name,
             models.Product.created_at,
             models.Product.updated_at
-        ).offset(skip).limit(limit).all()
+        ), [models.Product.id], limit, response, cursor=cursor, skip=skip)
         
         # Convert to simple dict format
         result = []
@@ -883,6 +1318,8 @@ def get_products(
             })
         
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         # Return empty list instead of crashing
@@ -924,41 +1361,217 @@ def add_inventory_item(
 
     db_item = models.InventoryItem(**item.dict())
     db.add(db_item)
+    db.flush()
+    stock_service.record_receipts(db, [db_item.barcode], created_by=current_user.id)
     db.commit()
+    invalidate_stock_caches([db_item.barcode], [item.product_id])
     db.refresh(db_item)
     return db_item
 
+INVENTORY_IMPORT_CHUNK_SIZE = 1000
+
+def import_inventory_chunk(db: Session, chunk: list, products_by_id: dict, seen_barcodes: set, errors: list,
+                           created_by: Optional[int] = None) -> List[str]:
+    """Validate a chunk of parsed CSV rows and bulk-insert the valid ones; returns the inserted barcodes"""
+    # Load any products not seen in earlier chunks with one query
+    new_product_ids = {item.product_id for _, item in chunk} - products_by_id.keys()
+    if new_product_ids:
+        for product in db.query(models.Product).filter(models.Product.id.in_(new_product_ids)).all():
+            products_by_id[product.id] = product
+        for product_id in new_product_ids:
+            products_by_id.setdefault(product_id, None)
+    
+    # One set query for barcodes that already exist
+    existing_barcodes = {
+        barcode for (barcode,) in db.query(models.InventoryItem.barcode).filter(
+            models.InventoryItem.barcode.in_([item.barcode for _, item in chunk])
+        )
+    }
+    
+    rows = []
+    for row_number, item in chunk:
+        product = products_by_id[item.product_id]
+        if product is None:
+            error = "Product not found"
+        elif item.barcode in seen_barcodes:
+            error = "Duplicate barcode in file"
+        elif item.barcode in existing_barcodes:
+            error = "Barcode already exists"
+        elif product.size_type != "CUSTOM" and item.size not in SIZE_SCALES.get(product.size_type, []):
+            error = (f"Invalid size '{item.size}' for product with size_type '{product.size_type}'. "
+                     f"Valid sizes: {SIZE_SCALES.get(product.size_type, [])}")
+        else:
+            error = None
+        
+        seen_barcodes.add(item.barcode)
+        if error:
+            errors.append(schemas.InventoryImportError(row=row_number, barcode=item.barcode, error=error))
+        else:
+            rows.append(item.dict())
+    
+    # Chunked executemany (psycopg2 batches it into multi-row INSERTs)
+    barcodes = [row['barcode'] for row in rows]
+    if rows:
+        db.bulk_insert_mappings(models.InventoryItem, rows)
+        stock_service.record_receipts(db, barcodes, reference_type="IMPORT", created_by=created_by)
+    return barcodes
+
+@app.post("/inventory/import", response_model=schemas.InventoryImportResponse)
+def import_inventory(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Bulk goods receipt from a CSV with columns product_id, barcode, design_number, size, color,
+    cost_price, mrp and optional quantity. Valid rows are imported in one transaction; every
+    rejected row is reported. With dry_run=true nothing is written."""
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    required_columns = {"product_id", "barcode", "design_number", "size", "color", "cost_price", "mrp"}
+    missing_columns = required_columns - set(reader.fieldnames or [])
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Missing CSV columns: {', '.join(sorted(missing_columns))}")
+    
+    errors = []
+    imported_barcodes = []
+    products_by_id = {}
+    seen_barcodes = set()
+    total_rows = 0
+    chunk = []
+    
+    try:
+        # Row 1 is the header, so data rows start at 2 (matches spreadsheet row numbers)
+        for row_number, row in enumerate(reader, start=2):
+            total_rows += 1
+            values = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            if not values.get("quantity"):
+                values.pop("quantity", None)
+            try:
+                chunk.append((row_number, schemas.InventoryItemCreate(**values)))
+            except ValidationError as e:
+                errors.append(schemas.InventoryImportError(
+                    row=row_number,
+                    barcode=values.get("barcode") or None,
+                    error="; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+                ))
+            
+            if len(chunk) >= INVENTORY_IMPORT_CHUNK_SIZE:
+                imported_barcodes.extend(import_inventory_chunk(db, chunk, products_by_id, seen_barcodes, errors, current_user.id))
+                chunk = []
+        
+        if chunk:
+            imported_barcodes.extend(import_inventory_chunk(db, chunk, products_by_id, seen_barcodes, errors, current_user.id))
+        
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            invalidate_stock_caches(imported_barcodes, products_by_id.keys())
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="File must be a UTF-8 encoded CSV")
+    except IntegrityError:
+        # Another intake added one of these barcodes while the file was being imported
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Some barcodes were added concurrently. Retry the import.")
+    
+    errors.sort(key=lambda error: error.row)
+    return schemas.InventoryImportResponse(
+        total_rows=total_rows,
+        imported=len(imported_barcodes),
+        failed=len(errors),
+        dry_run=dry_run,
+        errors=errors
+    )
+
 @app.get("/inventory/", response_model=List[schemas.InventoryItem])
 def get_inventory_items(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
 ):
-    items = db.query(models.InventoryItem).offset(skip).limit(limit).all()
-    return items
+    return paginate(
+        db.query(models.InventoryItem).options(joinedload(models.InventoryItem.product)),
+        [models.InventoryItem.id], limit, response, cursor=cursor, skip=skip
+    )
 
 @app.get("/inventory/product/{product_id}", response_model=List[schemas.InventoryItem])
 def get_inventory_by_product(product_id: int, db: Session = Depends(database.get_db)):
     items = db.query(models.InventoryItem).filter(models.InventoryItem.product_id == product_id).all()
     return items
 
-@app.get("/inventory/barcode/{barcode}", response_model=schemas.InventoryItem)
-def get_inventory_by_barcode(barcode: str, db: Session = Depends(database.get_db)):
-    item = db.query(models.InventoryItem).filter(models.InventoryItem.barcode == barcode).first()
+@app.get("/inventory/product/{product_id}/matrix", response_model=schemas.VariantMatrix)
+def get_variant_matrix(
+    product_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Size x colour stock grid for each design of a product (cached until its stock moves)"""
+    cached = variant_matrix_cache.get(product_id)
+    if cached is not None:
+        return cached
+    
+    epoch = variant_matrix_cache.epoch()
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    matrix = schemas.VariantMatrix(**variant_matrix_service.build(db, product, SIZE_SCALES.get(product.size_type, [])))
+    variant_matrix_cache.set(product_id, matrix, epoch)
+    return matrix
+
+def lookup_inventory_by_barcode(db: Session, barcode: str) -> schemas.InventoryItem:
+    """Scanner lookup of an inventory item with its product, served from the barcode cache when possible"""
+    cached = barcode_cache.get(barcode)
+    if cached is not None:
+        return cached
+    
+    epoch = barcode_cache.epoch()
+    item = db.query(models.InventoryItem).options(
+        joinedload(models.InventoryItem.product)
+    ).filter(models.InventoryItem.barcode == barcode).first()
     if item is None:
         raise HTTPException(status_code=404, detail="Inventory item not found")
-    return item
+    
+    result = schemas.InventoryItem.from_orm(item)
+    barcode_cache.set(barcode, result, epoch)
+    return result
+
+@app.get("/inventory/barcode/{barcode}", response_model=schemas.InventoryItem)
+def get_inventory_by_barcode(barcode: str, db: Session = Depends(database.get_db)):
+    return lookup_inventory_by_barcode(db, barcode)
+
+@app.get("/inventory/search", response_model=List[schemas.InventorySearchResult])
+def search_inventory(
+    q: str,
+    limit: int = 20,
+    in_stock: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Typeahead search by barcode, design number, colour or product name (prefix and fuzzy matches)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search text is required")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    return inventory_search.search(db, q, limit=limit, in_stock=in_stock)
 
 @app.get("/inventory/search/{barcode}", response_model=schemas.InventoryItem)
 def search_inventory_by_barcode(barcode: str, db: Session = Depends(database.get_db)):
-    item = db.query(models.InventoryItem).filter(models.InventoryItem.barcode == barcode).first()
-    if item is None:
-        raise HTTPException(status_code=404, detail="Inventory item not found")
-    
-    # Load the product relationship
-    db.refresh(item)
-    return item
+    return lookup_inventory_by_barcode(db, barcode)
+
+@app.get("/inventory/cache/stats")
+def get_barcode_cache_stats(current_user: models.User = Depends(auth.require_admin)):
+    """Hit/miss counters of the barcode lookup cache (this worker only)"""
+    return barcode_cache.stats()
+
+@app.get("/inventory/cache/variant-matrix/stats")
+def get_variant_matrix_cache_stats(current_user: models.User = Depends(auth.require_admin)):
+    """Hit/miss counters of the variant matrix cache (this worker only)"""
+    return variant_matrix_cache.stats()
 
 @app.post("/inventory/subtract")
 def subtract_inventory(
@@ -970,18 +1583,273 @@ def subtract_inventory(
     if item is None:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
-    if item.quantity < subtract_data.quantity:
+    # Conditional decrement in the database so parallel requests can't oversell
+    shortfalls = stock_service.decrement(
+        db, {item.id: subtract_data.quantity}, movement_type="ADJUSTMENT", created_by=current_user.id
+    )
+    if shortfalls:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Insufficient stock")
     
-    item.quantity -= subtract_data.quantity
     db.commit()
+    db.refresh(item)
+    invalidate_stock_caches([item.barcode], [item.product_id])
     
     return {"message": f"Subtracted {subtract_data.quantity} from inventory", "remaining_quantity": item.quantity}
 
-@app.get("/inventory/summary", response_model=List[schemas.InventorySummary])
-def get_inventory_summary(db: Session = Depends(database.get_db)):
-    # Get inventory summary grouped by product
-    summary = db.query(
+# ==================== STOCK LEDGER ENDPOINTS ====================
+MANUAL_MOVEMENT_TYPES = ["RECEIPT", "ADJUSTMENT", "TRANSFER"]
+
+@app.post("/inventory/stock/movements", response_model=schemas.StockMovement, status_code=status.HTTP_201_CREATED)
+def create_stock_movement(
+    movement: schemas.StockMovementCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Record a manual stock change (goods receipt, count adjustment or transfer in/out)"""
+    if movement.movement_type not in MANUAL_MOVEMENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid movement_type '{movement.movement_type}'. Valid types: {MANUAL_MOVEMENT_TYPES}"
+        )
+    if movement.quantity == 0:
+        raise HTTPException(status_code=400, detail="Quantity must not be zero")
+    
+    item = db.query(models.InventoryItem).filter(models.InventoryItem.barcode == movement.barcode).first()
+    if item is None:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+    
+    shortfalls = stock_service.move(
+        db,
+        movement.movement_type,
+        [{"inventory_item_id": item.id, "quantity": movement.quantity, "reference_id": movement.reference_id}],
+        reference_type=movement.reference_type,
+        notes=movement.notes,
+        created_by=current_user.id
+    )
+    if shortfalls:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient stock for barcode {item.barcode}. Available: {shortfalls[0]['available']}, Requested: {shortfalls[0]['requested']}"
+        )
+    
+    db_movement = db.query(models.StockMovement).filter(
+        models.StockMovement.inventory_item_id == item.id
+    ).order_by(models.StockMovement.id.desc()).first()
+    product_id = item.product_id
+    db.commit()
+    invalidate_stock_caches([movement.barcode], [product_id])
+    return db_movement
+
+@app.get("/inventory/stock/movements", response_model=List[schemas.StockMovement])
+def get_stock_movements(
+    response: Response,
+    barcode: Optional[str] = None,
+    movement_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Stock movement ledger, newest first, optionally for one barcode and/or movement type"""
+    query = db.query(models.StockMovement)
+    if barcode:
+        item = db.query(models.InventoryItem).filter(models.InventoryItem.barcode == barcode).first()
+        if item is None:
+            raise HTTPException(status_code=404, detail="Inventory item not found")
+        query = query.filter(models.StockMovement.inventory_item_id == item.id)
+    if movement_type:
+        query = query.filter(models.StockMovement.movement_type == movement_type)
+    return paginate(query, [models.StockMovement.id], limit, response, cursor=cursor, skip=skip, descending=True)
+
+@app.get("/inventory/stock/as-of", response_model=schemas.StockAsOfResponse)
+def get_stock_as_of(
+    at: datetime,
+    product_id: Optional[int] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Per-item stock at a past point in time (naive times are store-local), with totals at cost and MRP"""
+    at = as_store_time(at)
+    rows = stock_service.stock_as_of(db, at, product_id)
+    return schemas.StockAsOfResponse(
+        as_of=at,
+        total_quantity=sum(row.quantity for row in rows),
+        total_cost_value=round(sum(row.quantity * row.cost_price for row in rows), 2),
+        total_mrp_value=round(sum(row.quantity * row.mrp for row in rows), 2),
+        items=rows
+    )
+
+@app.post("/inventory/stock/snapshots", response_model=schemas.StockSnapshotResponse)
+def create_stock_snapshot(
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_admin)
+):
+    """Snapshot every item's stock at a cutoff (default: start of today, store time) to speed up as-of queries"""
+    as_of = as_store_time(as_of) if as_of else store_day_start()
+    if as_of > store_now():
+        raise HTTPException(status_code=400, detail="Snapshot time cannot be in the future")
+    items = stock_service.take_snapshot(db, as_of)
+    db.commit()
+    return schemas.StockSnapshotResponse(snapshot_at=as_of, items=items)
+
+# ==================== STOCK TAKE ENDPOINTS ====================
+STOCK_TAKE_LINE_STATUSES = ["SHRINKAGE", "EXCESS", "MATCHED", "UNKNOWN", "OUT_OF_SCOPE"]
+
+def get_stock_take_session(db: Session, session_id: int, lock: bool = False) -> models.StockTakeSession:
+    query = db.query(models.StockTakeSession).filter(models.StockTakeSession.id == session_id)
+    if lock:
+        query = query.with_for_update()
+    session = query.first()
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stock take not found")
+    return session
+
+def require_open_stock_take(session: models.StockTakeSession):
+    if session.status != "OPEN":
+        raise HTTPException(status_code=409, detail=f"Stock take is {session.status}")
+
+@app.post("/stock-takes", response_model=schemas.StockTakeSession, status_code=status.HTTP_201_CREATED)
+def create_stock_take(
+    stock_take: schemas.StockTakeCreate,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Start a stock take; counts are compared with book stock at this moment"""
+    if stock_take.brand_id and not db.query(models.Brand).filter(models.Brand.id == stock_take.brand_id).first():
+        raise HTTPException(status_code=404, detail="Brand not found")
+    if stock_take.product_id and not db.query(models.Product).filter(models.Product.id == stock_take.product_id).first():
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    db_session = models.StockTakeSession(**stock_take.dict(), created_by=current_user.id)
+    db.add(db_session)
+    db.commit()
+    db.refresh(db_session)
+    return db_session
+
+@app.get("/stock-takes", response_model=List[schemas.StockTakeSession])
+def get_stock_takes(
+    response: Response,
+    session_status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Stock takes, newest first"""
+    query = db.query(models.StockTakeSession)
+    if session_status:
+        query = query.filter(models.StockTakeSession.status == session_status)
+    return paginate(query, [models.StockTakeSession.id], limit, response, cursor=cursor, skip=skip, descending=True)
+
+@app.get("/stock-takes/{session_id}", response_model=schemas.StockTakeSession)
+def get_stock_take(
+    session_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    return get_stock_take_session(db, session_id)
+
+@app.post("/stock-takes/{session_id}/scans", response_model=schemas.StockTakeScanResponse)
+def add_stock_take_scans(
+    session_id: int,
+    batch: schemas.StockTakeScanBatch,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Add a batch of scans from a scanner (one statement per batch, whatever its size)"""
+    if len(batch.barcodes) > settings.STOCK_TAKE_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.STOCK_TAKE_MAX_BATCH_SIZE} scans per batch"
+        )
+    # Batches for one session are applied one at a time, so parallel scanners never
+    # deadlock on the same barcodes and posting waits for in-flight batches
+    session = get_stock_take_session(db, session_id, lock=True)
+    require_open_stock_take(session)
+
+    result = stock_take_service.record_scans(db, session, batch.barcodes, batch.batch_id)
+    db.commit()
+    return schemas.StockTakeScanResponse(session_id=session.id, total_scans=session.total_scans, **result)
+
+@app.get("/stock-takes/{session_id}/variance", response_model=schemas.StockTakeVarianceReport)
+def get_stock_take_variance(
+    session_id: int,
+    line_status: Optional[str] = None,
+    include_matched: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """
+    Counted vs expected stock. Filter by line_status (SHRINKAGE, EXCESS, UNKNOWN, ...) for the
+    shrinkage or excess report; the summary always covers the whole count.
+    """
+    if line_status and line_status not in STOCK_TAKE_LINE_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid line_status '{line_status}'. Valid statuses: {STOCK_TAKE_LINE_STATUSES}"
+        )
+    session = get_stock_take_session(db, session_id)
+    lines = stock_take_service.variance(db, session)
+
+    if line_status:
+        report_lines = [line for line in lines if line["status"] == line_status]
+    else:
+        report_lines = [line for line in lines if include_matched or line["status"] != "MATCHED"]
+    return schemas.StockTakeVarianceReport(
+        session=session,
+        summary=stock_take_service.summarize(lines),
+        lines=report_lines
+    )
+
+@app.post("/stock-takes/{session_id}/post", response_model=schemas.StockTakePostResponse)
+def post_stock_take(
+    session_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Close the count and adjust book stock to the counted quantities"""
+    session = get_stock_take_session(db, session_id, lock=True)
+    require_open_stock_take(session)
+
+    lines = stock_take_service.variance(db, session)
+    adjustments = stock_take_service.post(db, session, lines, created_by=current_user.id)
+    session.status = "POSTED"
+    session.posted_at = func.now()
+    session.posted_by = current_user.id
+    db.commit()
+    db.refresh(session)
+    adjusted = [line for line in lines if line["status"] in ("SHRINKAGE", "EXCESS")]
+    invalidate_stock_caches([line["barcode"] for line in adjusted], {line["product_id"] for line in adjusted})
+
+    return schemas.StockTakePostResponse(
+        session=session,
+        summary=stock_take_service.summarize(lines),
+        adjustments=adjustments
+    )
+
+@app.post("/stock-takes/{session_id}/cancel", response_model=schemas.StockTakeSession)
+def cancel_stock_take(
+    session_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Abandon an open count without touching stock"""
+    session = get_stock_take_session(db, session_id, lock=True)
+    require_open_stock_take(session)
+    session.status = "CANCELLED"
+    db.commit()
+    db.refresh(session)
+    return session
+
+def iter_inventory_summary(db: Session, skip: int = 0, limit: Optional[int] = None):
+    """Yield InventorySummary per product (ordered by product id) using two queries in total"""
+    # Query 1: per-product totals for the requested page
+    summary_query = db.query(
         models.Product.id.label('product_id'),
         models.Product.name.label('product_name'),
         models.Brand.name.label('brand_name'),
@@ -992,24 +1860,156 @@ def get_inventory_summary(db: Session = Depends(database.get_db)):
         models.InventoryItem, models.Product.id == models.InventoryItem.product_id
     ).group_by(
         models.Product.id, models.Product.name, models.Brand.name
-    ).all()
+    ).order_by(models.Product.id).offset(skip)
+    if limit is not None:
+        summary_query = summary_query.limit(limit)
+    summary = summary_query.all()
+    if not summary:
+        return
     
-    result = []
-    for row in summary:
-        # Get inventory items for this product
-        items = db.query(models.InventoryItem).filter(
-            models.InventoryItem.product_id == row.product_id
-        ).all()
-        
-        result.append(schemas.InventorySummary(
-            product_id=row.product_id,
-            product_name=row.product_name,
-            brand_name=row.brand_name,
-            total_quantity=row.total_quantity,
-            inventory_items=items
-        ))
+    # Query 2: every item of those products (with its product), streamed in product order
+    items = db.query(models.InventoryItem).join(
+        models.Product, models.InventoryItem.product_id == models.Product.id
+    ).options(
+        contains_eager(models.InventoryItem.product)
+    ).filter(
+        models.InventoryItem.product_id.in_([row.product_id for row in summary])
+    ).order_by(models.InventoryItem.product_id, models.InventoryItem.id).yield_per(1000)
     
-    return result
+    # Merge the two ordered streams, emitting each product once all its items are read
+    rows = iter(summary)
+    row = next(rows)
+    product_items = []
+    for item in items:
+        while item.product_id != row.product_id:
+            yield schemas.InventorySummary(
+                product_id=row.product_id,
+                product_name=row.product_name,
+                brand_name=row.brand_name,
+                total_quantity=row.total_quantity,
+                inventory_items=product_items
+            )
+            product_items = []
+            row = next(rows)
+        product_items.append(item)
+    yield schemas.InventorySummary(
+        product_id=row.product_id,
+        product_name=row.product_name,
+        brand_name=row.brand_name,
+        total_quantity=row.total_quantity,
+        inventory_items=product_items
+    )
+
+@app.get("/inventory/summary", response_model=List[schemas.InventorySummary])
+def get_inventory_summary(
+    skip: int = 0,
+    limit: Optional[int] = None,
+    stream: bool = False,
+    db: Session = Depends(database.get_db)
+):
+    """Inventory grouped by product. Paginate with skip/limit; stream=true returns NDJSON
+    (one product per line) so clients can render while the catalogue is still being sent."""
+    if stream:
+        return StreamingResponse(
+            (summary.json() + "\n" for summary in iter_inventory_summary(db, skip, limit)),
+            media_type="application/x-ndjson"
+        )
+    return list(iter_inventory_summary(db, skip, limit))
+
+# ==================== LABEL ENDPOINTS ====================
+def label_for_item(inventory_item: models.InventoryItem) -> dict:
+    """Printable tag fields for an inventory item"""
+    return {
+        "barcode": inventory_item.barcode,
+        "product_name": inventory_item.product.name if inventory_item.product else None,
+        "design_number": inventory_item.design_number,
+        "size": inventory_item.size,
+        "color": inventory_item.color,
+        "mrp": inventory_item.mrp
+    }
+
+def label_sheet_response(labels: list, filename: str) -> StreamingResponse:
+    """Stream a label sheet PDF"""
+    return StreamingResponse(
+        label_generator.stream(labels),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.post("/labels/barcodes/allocate", response_model=schemas.BarcodeAllocationResponse)
+def allocate_barcodes(
+    allocation: schemas.BarcodeAllocationRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Reserve a contiguous range of new barcodes for tagging a consignment"""
+    if allocation.count < 1 or allocation.count > settings.BARCODE_ALLOCATION_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Count must be between 1 and {settings.BARCODE_ALLOCATION_MAX}"
+        )
+    
+    first = document_number_allocator.reserve_block(db, "BARCODE", allocation.count)
+    db.commit()
+    
+    barcodes = [format_barcode(number) for number in range(first, first + allocation.count)]
+    return schemas.BarcodeAllocationResponse(
+        first_barcode=barcodes[0],
+        last_barcode=barcodes[-1],
+        barcodes=barcodes
+    )
+
+@app.post("/labels/sheet")
+def print_label_sheet(
+    sheet: schemas.LabelSheetRequest,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Stream a PDF label sheet for the given barcodes (copies default to the stock quantity)"""
+    items_by_barcode = {
+        inventory_item.barcode: inventory_item
+        for inventory_item in db.query(models.InventoryItem).options(
+            joinedload(models.InventoryItem.product)
+        ).filter(models.InventoryItem.barcode.in_({item.barcode for item in sheet.items})).all()
+    }
+    
+    missing = [item.barcode for item in sheet.items if item.barcode not in items_by_barcode]
+    if missing and not sheet.allow_unregistered:
+        raise HTTPException(status_code=404, detail=f"Inventory items not found for barcodes: {', '.join(missing)}")
+    
+    labels = []
+    for item in sheet.items:
+        inventory_item = items_by_barcode.get(item.barcode)
+        # Unregistered barcodes (e.g. a freshly allocated range) print as barcode-only tags
+        label = label_for_item(inventory_item) if inventory_item else {"barcode": item.barcode}
+        copies = item.copies if item.copies is not None else (inventory_item.quantity if inventory_item else 1)
+        labels.extend([label] * copies)
+    
+    if not labels:
+        raise HTTPException(status_code=400, detail="No labels to print")
+    
+    return label_sheet_response(labels, "labels.pdf")
+
+@app.get("/inventory/product/{product_id}/labels")
+def print_product_labels(
+    product_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_inventory_manager_or_admin)
+):
+    """Stream tags for every piece in stock of a product (one label per unit)"""
+    inventory_items = db.query(models.InventoryItem).options(
+        joinedload(models.InventoryItem.product)
+    ).filter(
+        models.InventoryItem.product_id == product_id,
+        models.InventoryItem.quantity > 0
+    ).order_by(models.InventoryItem.id).all()
+    if not inventory_items:
+        raise HTTPException(status_code=404, detail="No inventory in stock for this product")
+    
+    labels = []
+    for inventory_item in inventory_items:
+        labels.extend([label_for_item(inventory_item)] * inventory_item.quantity)
+    return label_sheet_response(labels, f"labels_product_{product_id}.pdf")
 
 # ==================== UTILITY ENDPOINTS ====================
 @app.get("/size-scales")
@@ -1024,242 +2024,125 @@ def get_product_types():
 
 # ==================== DASHBOARD ENDPOINTS ====================
 
+@app.get("/dashboard/cache/stats")
+def get_response_cache_stats(current_user: models.User = Depends(auth.require_admin)):
+    """Hit ratios of the dashboard, CRM analytics and ML response cache (counters are per worker)"""
+    return response_cache.stats()
+
 @app.get("/dashboard/sales")
+@response_cache.cached("dashboard:sales", settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS, tags=("sales",))
 def get_sales_analytics(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
     """Get sales analytics for dashboard"""
     try:
-        # Get current date and calculate date ranges
-        today = datetime.now().date()
+        # Get current store-local date and calculate date ranges
+        today = store_now().date()
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
         
-        # Daily sales (today) - accounting for returns
-        daily_sales = db.query(
-            func.sum(models.Invoice.total_final_price).label('total_sales'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst_amount'),
-            func.count(models.Invoice.id).label('invoice_count')
-        ).filter(
-            func.date(models.Invoice.created_at) == today
-        ).first()
-        
-        # Daily returns (today)
-        daily_returns = db.query(
-            func.sum(models.Return.total_return_amount).label('total_returns'),
-            func.sum(models.Return.total_return_gst).label('total_return_gst')
-        ).filter(
-            func.date(models.Return.created_at) == today
-        ).first()
-        
-        # Calculate net sales
-        net_sales = (daily_sales.total_sales or 0) + (daily_returns.total_returns or 0)
-        net_gst = (daily_sales.total_gst_amount or 0) + (daily_returns.total_return_gst or 0)
-        
-        # Weekly sales (last 7 days) - accounting for returns
-        weekly_sales = db.query(
-            func.sum(models.Invoice.total_final_price).label('total_sales'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst_amount'),
-            func.count(models.Invoice.id).label('invoice_count')
-        ).filter(
-            func.date(models.Invoice.created_at) >= week_ago
-        ).first()
-        
-        # Weekly returns (last 7 days)
-        weekly_returns = db.query(
-            func.sum(models.Return.total_return_amount).label('total_returns'),
-            func.sum(models.Return.total_return_gst).label('total_return_gst')
-        ).filter(
-            func.date(models.Return.created_at) >= week_ago
-        ).first()
-        
-        # Calculate net weekly sales
-        net_weekly_sales = (weekly_sales.total_sales or 0) + (weekly_returns.total_returns or 0)
-        net_weekly_gst = (weekly_sales.total_gst_amount or 0) + (weekly_returns.total_return_gst or 0)
-        
-        # Monthly sales (last 30 days) - accounting for returns
-        monthly_sales = db.query(
-            func.sum(models.Invoice.total_final_price).label('total_sales'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst_amount'),
-            func.count(models.Invoice.id).label('invoice_count')
-        ).filter(
-            func.date(models.Invoice.created_at) >= month_ago
-        ).first()
-        
-        # Monthly returns (last 30 days)
-        monthly_returns = db.query(
-            func.sum(models.Return.total_return_amount).label('total_returns'),
-            func.sum(models.Return.total_return_gst).label('total_return_gst')
-        ).filter(
-            func.date(models.Return.created_at) >= month_ago
-        ).first()
-        
-        # Calculate net monthly sales
-        net_monthly_sales = (monthly_sales.total_sales or 0) + (monthly_returns.total_returns or 0)
-        net_monthly_gst = (monthly_sales.total_gst_amount or 0) + (monthly_returns.total_return_gst or 0)
-        
-        # Sales trend (last 7 days daily breakdown) - accounting for returns
-        sales_trend = db.query(
-            func.date(models.Invoice.created_at).label('date'),
-            func.sum(models.Invoice.total_final_price).label('sales'),
-            func.sum(models.Invoice.total_gst_amount).label('gst'),
-            func.count(models.Invoice.id).label('invoices')
-        ).filter(
-            func.date(models.Invoice.created_at) >= week_ago
-        ).group_by(
-            func.date(models.Invoice.created_at)
-        ).order_by(
-            func.date(models.Invoice.created_at)
-        ).all()
-        
-        # Returns trend (last 7 days daily breakdown)
-        returns_trend = db.query(
-            func.date(models.Return.created_at).label('date'),
-            func.sum(models.Return.total_return_amount).label('returns'),
-            func.sum(models.Return.total_return_gst).label('return_gst')
-        ).filter(
-            func.date(models.Return.created_at) >= week_ago
-        ).group_by(
-            func.date(models.Return.created_at)
-        ).order_by(
-            func.date(models.Return.created_at)
-        ).all()
-        
-        # Combine sales and returns for net trend
-        trend_dict = {}
-        
-        # Add sales data
-        for item in sales_trend:
-            trend_dict[item.date] = {
-                'sales': float(item.sales or 0),
-                'gst': float(item.gst or 0),
-                'invoices': item.invoices or 0,
-                'returns': 0,
-                'return_gst': 0
+        # Every period and the trend in one pass over the daily rollup, net of returns
+        totals = sales_rollup.period_totals(db, today, week_ago, month_ago)
+        analytics = {
+            period: {
+                "sales": float(getattr(totals, f"{period}_sales")),
+                "gst": float(getattr(totals, f"{period}_gst")),
+                "invoices": int(getattr(totals, f"{period}_invoices"))
             }
-        
-        # Add returns data
-        for item in returns_trend:
-            if item.date in trend_dict:
-                trend_dict[item.date]['returns'] = float(item.returns or 0)
-                trend_dict[item.date]['return_gst'] = float(item.return_gst or 0)
-            else:
-                trend_dict[item.date] = {
-                    'sales': 0,
-                    'gst': 0,
-                    'invoices': 0,
-                    'returns': float(item.returns or 0),
-                    'return_gst': float(item.return_gst or 0)
-                }
-        
-        # Calculate net values
-        net_trend = []
-        for date, data in trend_dict.items():
-            net_sales = data['sales'] + data['returns']
-            net_gst = data['gst'] + data['return_gst']
-            net_trend.append({
-                'date': str(date),
-                'sales': net_sales,
-                'gst': net_gst,
-                'invoices': data['invoices']
-            })
-        
-        return {
-            "daily": {
-                "sales": float(net_sales),
-                "gst": float(net_gst),
-                "invoices": daily_sales.invoice_count or 0
-            },
-            "weekly": {
-                "sales": float(net_weekly_sales),
-                "gst": float(net_weekly_gst),
-                "invoices": weekly_sales.invoice_count or 0
-            },
-            "monthly": {
-                "sales": float(net_monthly_sales),
-                "gst": float(net_monthly_gst),
-                "invoices": monthly_sales.invoice_count or 0
-            },
-            "trend": net_trend
+            for period in ("daily", "weekly", "monthly")
         }
+        
+        # Sales trend (last 7 days daily breakdown) - net of returns
+        analytics["trend"] = totals.trend
+        return analytics
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting sales analytics: {str(e)}")
 
 @app.get("/dashboard/top-products")
+@response_cache.cached("dashboard:top-products", settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS, tags=("sales",))
 def get_top_products(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    metric: str = "quantity",
+    group_by: str = "product",
+    limit: int = 10,
+    brand_id: Optional[int] = None,
+    product_type: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
-    """Get top 10 selling products"""
+    """
+    Top sellers over a date range (YYYY-MM-DD, store-local, default: last 30 days), net of
+    returns, by quantity, revenue or margin. group_by=brand/type and the brand_id and
+    product_type filters drill down from brands and types to their products.
+    """
+    if metric not in TOP_PRODUCT_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(TOP_PRODUCT_METRICS)}")
+    if group_by not in TOP_PRODUCT_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(TOP_PRODUCT_GROUPS)}")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     try:
-        # Get top products by quantity sold
-        top_products = db.query(
-            models.Product.name.label('product_name'),
-            models.Product.id.label('product_id'),
-            func.sum(models.InvoiceItem.quantity).label('total_quantity'),
-            func.sum(models.InvoiceItem.final_price).label('total_revenue'),
-            func.count(models.InvoiceItem.id).label('times_sold')
-        ).join(
-            models.InvoiceItem, models.Product.id == models.InvoiceItem.inventory_item_id
-        ).join(
-            models.InventoryItem, models.InvoiceItem.inventory_item_id == models.InventoryItem.id
-        ).filter(
-            models.InventoryItem.product_id == models.Product.id
-        ).group_by(
-            models.Product.id, models.Product.name
-        ).order_by(
-            desc(func.sum(models.InvoiceItem.quantity))
-        ).limit(10).all()
-        
-        return [
-            {
-                "product_name": item.product_name,
-                "product_id": item.product_id,
-                "total_quantity": int(item.total_quantity or 0),
-                "total_revenue": float(item.total_revenue or 0),
-                "times_sold": item.times_sold or 0
-            }
-            for item in top_products
-        ]
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else store_now().date()
+        start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else end - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    
+    try:
+        # Read from the per-product daily rollup, never the invoice items themselves
+        return sales_rollup.top_sellers(
+            db, start, end, metric=metric, group_by=group_by, limit=limit,
+            brand_id=brand_id, product_type=product_type
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting top products: {str(e)}")
 
+# Age of stock: time since the item last sold, or since it was received if it never sold
+AGING_BUCKETS = [("0-30", 0, 30), ("31-60", 31, 60), ("61-90", 61, 90), ("90+", 91, None)]
+
+def inventory_aged_since():
+    """Matches the ix_inventory_items_aging expression index"""
+    return func.coalesce(models.InventoryItem.last_sold_at, models.InventoryItem.created_at)
+
 @app.get("/dashboard/inventory-aging")
+@response_cache.cached("dashboard:inventory-aging", settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS, tags=("stock",))
 def get_inventory_aging(
     days: int = 30, 
+    limit: Optional[int] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
-    """Get inventory items not sold in the past X days"""
+    """Get in-stock inventory items not sold in the past X days (including items never sold), oldest first"""
     try:
-        # Calculate the cutoff date
-        cutoff_date = datetime.now() - timedelta(days=days)
+        now = store_now()
+        cutoff_date = now - timedelta(days=days)
+        aged_since = inventory_aged_since()
         
-        # Get inventory items that haven't been sold recently
-        aging_items = db.query(
+        # Index range scan on ix_inventory_items_aging; no invoice_items aggregation
+        query = db.query(
             models.InventoryItem.id,
             models.InventoryItem.barcode,
             models.InventoryItem.design_number,
             models.InventoryItem.size,
             models.InventoryItem.color,
+            models.InventoryItem.cost_price,
             models.InventoryItem.mrp,
             models.InventoryItem.quantity,
             models.InventoryItem.created_at,
+            models.InventoryItem.last_sold_at,
+            aged_since.label('aged_since'),
             models.Product.name.label('product_name')
         ).join(
             models.Product, models.InventoryItem.product_id == models.Product.id
-        ).outerjoin(
-            models.InvoiceItem, models.InventoryItem.id == models.InvoiceItem.inventory_item_id
         ).filter(
-            models.InventoryItem.quantity > 0
-        ).group_by(
-            models.InventoryItem.id, models.Product.name
-        ).having(
-            func.max(models.InvoiceItem.created_at) < cutoff_date
-        ).order_by(
-            models.InventoryItem.created_at
-        ).all()
+            models.InventoryItem.quantity > 0,
+            aged_since < cutoff_date
+        ).order_by(aged_since)
+        if limit:
+            query = query.limit(limit)
         
         return [
             {
@@ -1269,126 +2152,107 @@ def get_inventory_aging(
                 "design_number": item.design_number,
                 "size": item.size,
                 "color": item.color,
+                "cost_price": float(item.cost_price),
                 "mrp": float(item.mrp),
                 "quantity": item.quantity,
                 "created_at": item.created_at.isoformat(),
-                "days_old": (datetime.now() - item.created_at).days
+                "last_sold_at": item.last_sold_at.isoformat() if item.last_sold_at else None,
+                "never_sold": item.last_sold_at is None,
+                "days_old": (now - item.aged_since).days
             }
-            for item in aging_items
+            for item in query.all()
         ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting inventory aging: {str(e)}")
 
+@app.get("/dashboard/inventory-aging/buckets")
+@response_cache.cached("dashboard:inventory-aging-buckets", settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS, tags=("stock",))
+def get_inventory_aging_buckets(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_admin)
+):
+    """In-stock inventory grouped into 0-30, 31-60, 61-90 and 90+ days since last sale, valued at cost and MRP"""
+    try:
+        now = store_now()
+        aged_since = inventory_aged_since()
+        bucket = case(
+            *[
+                (aged_since > now - timedelta(days=high + 1), name)
+                for name, _, high in AGING_BUCKETS if high is not None
+            ],
+            else_=AGING_BUCKETS[-1][0]
+        ).label('bucket')
+        
+        # One grouped pass over in-stock items
+        rows = db.query(
+            bucket,
+            func.count(models.InventoryItem.id).label('sku_count'),
+            func.sum(case((models.InventoryItem.last_sold_at.is_(None), 1), else_=0)).label('never_sold_skus'),
+            func.sum(models.InventoryItem.quantity).label('quantity'),
+            func.sum(models.InventoryItem.quantity * models.InventoryItem.cost_price).label('cost_value'),
+            func.sum(models.InventoryItem.quantity * models.InventoryItem.mrp).label('mrp_value')
+        ).filter(
+            models.InventoryItem.quantity > 0
+        ).group_by(bucket).all()
+        rows_by_bucket = {row.bucket: row for row in rows}
+        
+        buckets = []
+        for name, low, high in AGING_BUCKETS:
+            row = rows_by_bucket.get(name)
+            buckets.append({
+                "bucket": name,
+                "min_days": low,
+                "max_days": high,
+                "sku_count": row.sku_count if row else 0,
+                "never_sold_skus": int(row.never_sold_skus) if row else 0,
+                "quantity": int(row.quantity) if row else 0,
+                "cost_value": round(float(row.cost_value), 2) if row else 0.0,
+                "mrp_value": round(float(row.mrp_value), 2) if row else 0.0
+            })
+        
+        return {
+            "as_of": now.isoformat(),
+            "buckets": buckets,
+            "total_quantity": sum(b["quantity"] for b in buckets),
+            "total_cost_value": round(sum(b["cost_value"] for b in buckets), 2),
+            "total_mrp_value": round(sum(b["mrp_value"] for b in buckets), 2)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting inventory aging buckets: {str(e)}")
+
 @app.get("/dashboard/gst-summary")
+@response_cache.cached("dashboard:gst-summary", settings.RESPONSE_CACHE_DASHBOARD_TTL_SECONDS, tags=("sales",))
 def get_gst_summary(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
 ):
     """Get GST collection summary"""
     try:
-        # Get GST summary for different periods
-        today = datetime.now().date()
+        # Get GST summary for different periods (store-local days)
+        today = store_now().date()
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
         
-        # Daily GST - accounting for returns
-        daily_gst = db.query(
-            func.sum(models.Invoice.total_cgst_amount).label('cgst'),
-            func.sum(models.Invoice.total_sgst_amount).label('sgst'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst')
-        ).filter(
-            func.date(models.Invoice.created_at) == today
-        ).first()
-        
-        # Daily return GST
-        daily_return_gst = db.query(
-            func.sum(models.Return.total_return_cgst).label('return_cgst'),
-            func.sum(models.Return.total_return_sgst).label('return_sgst'),
-            func.sum(models.Return.total_return_gst).label('return_total_gst')
-        ).filter(
-            func.date(models.Return.created_at) == today
-        ).first()
-        
-        # Calculate net GST
-        net_daily_cgst = (daily_gst.cgst or 0) + (daily_return_gst.return_cgst or 0)
-        net_daily_sgst = (daily_gst.sgst or 0) + (daily_return_gst.return_sgst or 0)
-        net_daily_total_gst = (daily_gst.total_gst or 0) + (daily_return_gst.return_total_gst or 0)
-        
-        # Weekly GST - accounting for returns
-        weekly_gst = db.query(
-            func.sum(models.Invoice.total_cgst_amount).label('cgst'),
-            func.sum(models.Invoice.total_sgst_amount).label('sgst'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst')
-        ).filter(
-            func.date(models.Invoice.created_at) >= week_ago
-        ).first()
-        
-        # Weekly return GST
-        weekly_return_gst = db.query(
-            func.sum(models.Return.total_return_cgst).label('return_cgst'),
-            func.sum(models.Return.total_return_sgst).label('return_sgst'),
-            func.sum(models.Return.total_return_gst).label('return_total_gst')
-        ).filter(
-            func.date(models.Return.created_at) >= week_ago
-        ).first()
-        
-        # Calculate net weekly GST
-        net_weekly_cgst = (weekly_gst.cgst or 0) + (weekly_return_gst.return_cgst or 0)
-        net_weekly_sgst = (weekly_gst.sgst or 0) + (weekly_return_gst.return_sgst or 0)
-        net_weekly_total_gst = (weekly_gst.total_gst or 0) + (weekly_return_gst.return_total_gst or 0)
-        
-        # Monthly GST - accounting for returns
-        monthly_gst = db.query(
-            func.sum(models.Invoice.total_cgst_amount).label('cgst'),
-            func.sum(models.Invoice.total_sgst_amount).label('sgst'),
-            func.sum(models.Invoice.total_gst_amount).label('total_gst')
-        ).filter(
-            func.date(models.Invoice.created_at) >= month_ago
-        ).first()
-        
-        # Monthly return GST
-        monthly_return_gst = db.query(
-            func.sum(models.Return.total_return_cgst).label('return_cgst'),
-            func.sum(models.Return.total_return_sgst).label('return_sgst'),
-            func.sum(models.Return.total_return_gst).label('return_total_gst')
-        ).filter(
-            func.date(models.Return.created_at) >= month_ago
-        ).first()
-        
-        # Calculate net monthly GST
-        net_monthly_cgst = (monthly_gst.cgst or 0) + (monthly_return_gst.return_cgst or 0)
-        net_monthly_sgst = (monthly_gst.sgst or 0) + (monthly_return_gst.return_sgst or 0)
-        net_monthly_total_gst = (monthly_gst.total_gst or 0) + (monthly_return_gst.return_total_gst or 0)
-        
+        # Net GST for every period in one pass over the daily rollup (return GST is negative)
+        totals = sales_rollup.period_totals(db, today, week_ago, month_ago)
         return {
-            "daily": {
-                "cgst": float(net_daily_cgst),
-                "sgst": float(net_daily_sgst),
-                "total": float(net_daily_total_gst)
-            },
-            "weekly": {
-                "cgst": float(net_weekly_cgst),
-                "sgst": float(net_weekly_sgst),
-                "total": float(net_weekly_total_gst)
-            },
-            "monthly": {
-                "cgst": float(net_monthly_cgst),
-                "sgst": float(net_monthly_sgst),
-                "total": float(net_monthly_total_gst)
+            period: {
+                "cgst": float(getattr(totals, f"{period}_cgst")),
+                "sgst": float(getattr(totals, f"{period}_sgst")),
+                "total": float(getattr(totals, f"{period}_gst"))
             }
+            for period in ("daily", "weekly", "monthly")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting GST summary: {str(e)}") 
 
-def generate_return_number():
-    """Generate a unique return number"""
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_suffix = str(uuid.uuid4())[:8].upper()
-    return f"RET-{timestamp}-{random_suffix}"
+def generate_return_number(db: Session):
+    """Allocate the next sequential return number for this store and financial year"""
+    return document_number_allocator.next_number(db, "RET")
 
 # ==================== RETURN ENDPOINTS ====================
 
-@app.get("/returns/invoice/{invoice_number}")
+@app.get("/returns/invoice/{invoice_number:path}")
 def get_invoice_for_return(
     invoice_number: str, 
     db: Session = Depends(database.get_db),
@@ -1427,19 +2291,18 @@ def create_return(
         if existing_returns:
             raise HTTPException(status_code=400, detail="Invoice has already been returned")
         
-        # Validate return items
-        total_return_amount = 0
-        total_return_gst = 0
-        total_return_cgst = 0
-        total_return_sgst = 0
+        # Validate return items (all invoice lines loaded in one query)
+        invoice_items_by_id = {
+            invoice_item.id: invoice_item
+            for invoice_item in db.query(models.InvoiceItem).filter(
+                models.InvoiceItem.id.in_([item_request.invoice_item_id for item_request in return_data.items]),
+                models.InvoiceItem.invoice_id == invoice.id
+            ).all()
+        }
         return_items = []
         
         for item_request in return_data.items:
-            # Find the invoice item
-            invoice_item = db.query(models.InvoiceItem).filter(
-                models.InvoiceItem.id == item_request.invoice_item_id,
-                models.InvoiceItem.invoice_id == invoice.id
-            ).first()
+            invoice_item = invoice_items_by_id.get(item_request.invoice_item_id)
             
             if invoice_item is None:
                 raise HTTPException(status_code=404, detail=f"Invoice item {item_request.invoice_item_id} not found")
@@ -1450,26 +2313,23 @@ def create_return(
                     detail=f"Return quantity ({item_request.return_quantity}) cannot exceed original quantity ({invoice_item.quantity})"
                 )
             
-            # Calculate return amounts (negative values)
-            item_return_amount = -(invoice_item.final_price / invoice_item.quantity) * item_request.return_quantity
-            item_return_gst = -(invoice_item.gst_amount / invoice_item.quantity) * item_request.return_quantity
-            item_return_cgst = -(invoice_item.cgst_amount / invoice_item.quantity) * item_request.return_quantity
-            item_return_sgst = -(invoice_item.sgst_amount / invoice_item.quantity) * item_request.return_quantity
-            
-            total_return_amount += item_return_amount
-            total_return_gst += item_return_gst
-            total_return_cgst += item_return_cgst
-            total_return_sgst += item_return_sgst
-            
             return_items.append({
                 'invoice_item': invoice_item,
-                'return_quantity': item_request.return_quantity,
-                'return_amount': item_return_amount,
-                'return_gst': item_return_gst,
-                'return_cgst': item_return_cgst,
-                'return_sgst': item_return_sgst
+                'return_quantity': item_request.return_quantity
             })
         
+        # Calculate return amounts (negative values) pro rata from the original lines
+        refund = price_return(
+            final_prices=[item_data['invoice_item'].final_price for item_data in return_items],
+            gst_amounts=[item_data['invoice_item'].gst_amount for item_data in return_items],
+            original_quantities=[item_data['invoice_item'].quantity for item_data in return_items],
+            return_quantities=[item_data['return_quantity'] for item_data in return_items]
+        )
+        total_return_amount = refund['total_return_amount']
+        total_return_gst = refund['total_return_gst']
+        total_return_cgst = refund['total_return_cgst']
+        total_return_sgst = refund['total_return_sgst']
+        
         # Auto-calculate return amounts based on original invoice amounts
         auto_calculated_amount = abs(total_return_amount)
         
@@ -1490,7 +2350,7 @@ def create_return(
         
         # Create return record
         db_return = models.Return(
-            return_number=generate_return_number(),
+            return_number=generate_return_number(db),
             invoice_id=invoice.id,
             invoice_number=invoice.invoice_number,
             customer_name=invoice.customer_name,
@@ -1508,11 +2368,10 @@ def create_return(
         )
         
         db.add(db_return)
-        db.commit()
-        db.refresh(db_return)
+        db.flush()
         
         # Create return items and update inventory
-        for item_data in return_items:
+        for item_data, line in zip(return_items, refund['lines']):
             invoice_item = item_data['invoice_item']
             
             # Create return item
@@ -1528,23 +2387,43 @@ def create_return(
                 original_quantity=invoice_item.quantity,
                 return_quantity=item_data['return_quantity'],
                 unit_price=invoice_item.unit_price,
-                total_return_price=item_data['return_amount'],
-                return_gst_amount=item_data['return_gst'],
-                return_cgst_amount=item_data['return_cgst'],
-                return_sgst_amount=item_data['return_sgst'],
+                total_return_price=line['total_return_price'],
+                return_gst_amount=line['return_gst_amount'],
+                return_cgst_amount=line['return_cgst_amount'],
+                return_sgst_amount=line['return_sgst_amount'],
                 gst_rate=invoice_item.gst_rate
             )
             db.add(db_return_item)
-            
-            # Update inventory (add back to stock)
-            inventory_item = db.query(models.InventoryItem).filter(
-                models.InventoryItem.id == invoice_item.inventory_item_id
-            ).first()
-            
-            if inventory_item:
-                inventory_item.quantity += item_data['return_quantity']
+        
+        # Add the returned pieces back to stock, logged against the return, in the same transaction
+        stock_service.move(
+            db,
+            "RETURN",
+            [
+                {
+                    "inventory_item_id": item_data['invoice_item'].inventory_item_id,
+                    "quantity": item_data['return_quantity'],
+                    "reference_id": db_return.id
+                }
+                for item_data in return_items
+                if item_data['invoice_item'].inventory_item_id is not None
+            ],
+            reference_type="RETURN",
+            created_by=current_user.id
+        )
+        touched_products = [
+            product_id for (product_id,) in db.query(models.InventoryItem.product_id).filter(
+                models.InventoryItem.id.in_([item_data['invoice_item'].inventory_item_id for item_data in return_items])
+            ).distinct()
+        ]
+        sales_rollup.record_product_returns(db, [
+            dict(line, inventory_item_id=item_data['invoice_item'].inventory_item_id, return_quantity=item_data['return_quantity'])
+            for item_data, line in zip(return_items, refund['lines'])
+        ])
+        sales_rollup.record_return(db, return_data.return_method, refund)
         
         db.commit()
+        invalidate_stock_caches((item_data['invoice_item'].barcode for item_data in return_items), touched_products, sales=True)
         db.refresh(db_return)
         
         return schemas.ReturnResponse(
@@ -1559,10 +2438,19 @@ def create_return(
         raise HTTPException(status_code=500, detail=f"Error creating return: {str(e)}")
 
 @app.get("/returns/", response_model=List[schemas.Return])
-def get_returns(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    """Get all returns"""
-    returns = db.query(models.Return).offset(skip).limit(limit).all()
-    return returns
+def get_returns(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """Get all returns, newest first"""
+    return paginate(
+        db.query(models.Return).options(selectinload(models.Return.items)),
+        [models.Return.created_at, models.Return.id],
+        limit, response, cursor=cursor, skip=skip, descending=True
+    )
 
 @app.get("/returns/{return_id}", response_model=schemas.Return)
 def get_return(return_id: int, db: Session = Depends(database.get_db)):
@@ -1572,7 +2460,19 @@ def get_return(return_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Return not found")
     return return_record
 
-@app.get("/returns/number/{return_number}", response_model=schemas.Return)
+@app.get("/returns/number/{return_number:path}/pdf")
+def export_return_by_number_pdf(return_number: str, db: Session = Depends(database.get_db)):
+    """Export return by return number as PDF"""
+    return_record = db.query(models.Return).filter(models.Return.return_number == return_number).first()
+    if return_record is None:
+        raise HTTPException(status_code=404, detail="Return not found")
+    
+    try:
+        return pdf_generator.generate_return_pdf(return_record)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+
+@app.get("/returns/number/{return_number:path}", response_model=schemas.Return)
 def get_return_by_number(return_number: str, db: Session = Depends(database.get_db)):
     """Get a specific return by return number"""
     return_record = db.query(models.Return).filter(models.Return.return_number == return_number).first()
@@ -1592,20 +2492,9 @@ def export_return_pdf(return_id: int, db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
-@app.get("/returns/number/{return_number}/pdf")
-def export_return_by_number_pdf(return_number: str, db: Session = Depends(database.get_db)):
-    """Export return by return number as PDF"""
-    return_record = db.query(models.Return).filter(models.Return.return_number == return_number).first()
-    if return_record is None:
-        raise HTTPException(status_code=404, detail="Return not found")
-    
-    try:
-        return pdf_generator.generate_return_pdf(return_record)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
-
 # ==================== ML FORECASTING ENDPOINTS ====================
 @app.get("/ml/inventory-analysis")
+@response_cache.cached("ml:inventory-analysis", settings.RESPONSE_CACHE_ML_TTL_SECONDS, tags=("sales", "stock"))
 def get_inventory_analysis(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
@@ -1619,6 +2508,7 @@ def get_inventory_analysis(
         raise HTTPException(status_code=500, detail=f"Error in inventory analysis: {str(e)}")
 
 @app.get("/ml/product-analysis/{product_id}")
+@response_cache.cached("ml:product-analysis", settings.RESPONSE_CACHE_ML_TTL_SECONDS, tags=("sales", "stock"))
 def get_product_analysis(
     product_id: int,
     db: Session = Depends(database.get_db),
@@ -1635,6 +2525,7 @@ def get_product_analysis(
         raise HTTPException(status_code=500, detail=f"Error in product analysis: {str(e)}")
 
 @app.get("/ml/reorder-suggestions")
+@response_cache.cached("ml:reorder-suggestions", settings.RESPONSE_CACHE_ML_TTL_SECONDS, tags=("sales", "stock"))
 def get_reorder_suggestions(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
@@ -1651,6 +2542,7 @@ def get_reorder_suggestions(
         raise HTTPException(status_code=500, detail=f"Error getting reorder suggestions: {str(e)}")
 
 @app.get("/ml/stock-alerts")
+@response_cache.cached("ml:stock-alerts", settings.RESPONSE_CACHE_ML_TTL_SECONDS, tags=("sales", "stock"))
 def get_stock_alerts(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
@@ -1679,6 +2571,42 @@ def get_stock_alerts(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stock alerts: {str(e)}")
 
+# ==================== DATA EXPORT ENDPOINTS ====================
+@app.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = "parquet",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.require_admin)
+):
+    """
+    Download a table as Parquet or Arrow IPC (stream format) for offline analysis.
+    invoices, invoice_items, returns and return_items can be limited to store-local
+    days (YYYY-MM-DD, both inclusive); inventory and products are exported whole.
+    """
+    if not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Data export is unavailable: pyarrow is not installed")
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{table}'. Available: {list(EXPORT_TABLES)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Valid formats: {list(EXPORT_FORMATS)}")
+
+    try:
+        start = store_day_start(datetime.strptime(start_date, "%Y-%m-%d")) if start_date else None
+        end = store_day_start(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = "_".join(filter(None, [table, start_date, end_date])) + f".{extension}"
+    return StreamingResponse(
+        data_export.stream(db, table, format, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 # ==================== CASH REGISTER ENDPOINTS ====================
 @app.post("/cash-register/open", response_model=schemas.CashRegister, status_code=status.HTTP_201_CREATED)
 def open_cash_register(
@@ -1689,9 +2617,8 @@ def open_cash_register(
     """Open cash register for the day"""
     try:
         # Check if cash register is already open for today
-        today = datetime.now().date()
         existing_register = db.query(models.CashRegister).filter(
-            func.date(models.CashRegister.date) == today
+            on_store_days(models.CashRegister.date)
         ).first()
         
         if existing_register:
@@ -1699,7 +2626,7 @@ def open_cash_register(
         
         # Create new cash register entry
         db_cash_register = models.CashRegister(
-            date=datetime.now(),
+            date=store_now(),
             opening_balance=cash_register.opening_balance,
             notes=cash_register.notes
         )
@@ -1721,9 +2648,9 @@ def close_cash_register(
 ):
     """Close cash register for the day"""
     try:
-        today = datetime.now().date()
+        today = store_now().date()
         cash_register = db.query(models.CashRegister).filter(
-            func.date(models.CashRegister.date) == today
+            on_store_days(models.CashRegister.date, today)
         ).first()
         
         if not cash_register:
@@ -1732,14 +2659,14 @@ def close_cash_register(
         # Calculate totals from sales and returns
         today_sales = db.query(func.sum(models.Invoice.total_final_price)).filter(
             and_(
-                func.date(models.Invoice.created_at) == today,
+                on_store_days(models.Invoice.created_at, today),
                 models.Invoice.payment_method == "CASH"
             )
         ).scalar() or 0.0
         
         today_returns = db.query(func.sum(models.Return.cash_refund)).filter(
             and_(
-                func.date(models.Return.created_at) == today,
+                on_store_days(models.Return.created_at, today),
                 models.Return.return_method == "CASH"
             )
         ).scalar() or 0.0
@@ -1776,9 +2703,9 @@ def get_cash_register_status(
 ):
     """Get current cash register status"""
     try:
-        today = datetime.now().date()
+        today = store_now().date()
         cash_register = db.query(models.CashRegister).filter(
-            func.date(models.CashRegister.date) == today
+            on_store_days(models.CashRegister.date, today)
         ).first()
         
         if not cash_register:
@@ -1787,14 +2714,14 @@ def get_cash_register_status(
         # Get today's sales and returns
         today_sales = db.query(func.sum(models.Invoice.total_final_price)).filter(
             and_(
-                func.date(models.Invoice.created_at) == today,
+                on_store_days(models.Invoice.created_at, today),
                 models.Invoice.payment_method == "CASH"
             )
         ).scalar() or 0.0
         
         today_returns = db.query(func.sum(models.Return.cash_refund)).filter(
             and_(
-                func.date(models.Return.created_at) == today,
+                on_store_days(models.Return.created_at, today),
                 models.Return.return_method == "CASH"
             )
         ).scalar() or 0.0
@@ -1830,9 +2757,9 @@ def add_expense(
 ):
     """Add an expense to the cash register"""
     try:
-        today = datetime.now().date()
+        today = store_now().date()
         cash_register = db.query(models.CashRegister).filter(
-            func.date(models.CashRegister.date) == today
+            on_store_days(models.CashRegister.date, today)
         ).first()
         
         if not cash_register:
@@ -1840,7 +2767,7 @@ def add_expense(
         
         db_expense = models.CashExpense(
             cash_register_id=cash_register.id,
-            date=datetime.now(),
+            date=store_now(),
             category=expense.category,
             description=expense.description,
             amount=expense.amount
@@ -1869,11 +2796,11 @@ def get_cash_register_history(
         
         if start_date:
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
-            query = query.filter(func.date(models.CashRegister.date) >= start)
+            query = query.filter(models.CashRegister.date >= store_day_bounds(start)[0])
         
         if end_date:
             end = datetime.strptime(end_date, "%Y-%m-%d").date()
-            query = query.filter(func.date(models.CashRegister.date) <= end)
+            query = query.filter(models.CashRegister.date < store_day_bounds(end)[1])
         
         cash_registers = query.order_by(models.CashRegister.date.desc()).all()
         return cash_registers
@@ -1890,7 +2817,7 @@ def export_cash_register(
     try:
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
         cash_register = db.query(models.CashRegister).filter(
-            func.date(models.CashRegister.date) == target_date
+            on_store_days(models.CashRegister.date, target_date)
         ).first()
         
         if not cash_register:
@@ -1899,14 +2826,14 @@ def export_cash_register(
         # Get sales and returns for the date
         sales = db.query(models.Invoice).filter(
             and_(
-                func.date(models.Invoice.created_at) == target_date,
+                on_store_days(models.Invoice.created_at, target_date),
                 models.Invoice.payment_method == "CASH"
             )
         ).all()
         
         returns = db.query(models.Return).filter(
             and_(
-                func.date(models.Return.created_at) == target_date,
+                on_store_days(models.Return.created_at, target_date),
                 models.Return.return_method == "CASH"
             )
         ).all()
@@ -1988,14 +2915,15 @@ def create_customer(
 
 @app.get("/customers/", response_model=List[schemas.Customer])
 def get_customers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_cashier_or_admin)
 ):
     """Get all customers"""
-    customers = db.query(models.Customer).offset(skip).limit(limit).all()
-    return customers
+    return paginate(db.query(models.Customer), [models.Customer.id], limit, response, cursor=cursor, skip=skip)
 
 @app.get("/customers/{customer_id}", response_model=schemas.Customer)
 def get_customer(
@@ -2245,6 +3173,7 @@ def export_customers_csv(
         raise HTTPException(status_code=500, detail=f"Error exporting customers: {str(e)}")
 
 @app.get("/crm/analytics")
+@response_cache.cached("crm:analytics", settings.RESPONSE_CACHE_CRM_TTL_SECONDS, tags=("sales",))
 def get_crm_analytics(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.require_admin)
@@ -2560,8 +3489,10 @@ def send_broadcast_message(
 
 @app.get("/whatsapp/logs/", response_model=List[schemas.WhatsAppLog])
 def get_whatsapp_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     customer_id: Optional[int] = None,
     message_type: Optional[str] = None,
     db: Session = Depends(database.get_db),
@@ -2577,8 +3508,10 @@ def get_whatsapp_logs(
         if message_type:
             query = query.filter(models.WhatsAppLog.message_type == message_type)
         
-        logs = query.order_by(models.WhatsAppLog.sent_at.desc()).offset(skip).limit(limit).all()
-        return logs
+        # Newest first; keyed on id because sent_at changes when a queued message is delivered
+        return paginate(query, [models.WhatsAppLog.id], limit, response, cursor=cursor, skip=skip, descending=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching WhatsApp logs: {str(e)}")
 
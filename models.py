@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, Enum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index
 import enum
 
 Base = declarative_base()
@@ -72,7 +72,7 @@ class InventoryItem(Base):
     __tablename__ = "inventory_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     barcode = Column(String, unique=True, nullable=False, index=True)
     design_number = Column(String, nullable=False)  # Moved from Product
     size = Column(String, nullable=False)  # Actual size value (XS, S, M, L, XL, etc.)
@@ -80,6 +80,7 @@ class InventoryItem(Base):
     cost_price = Column(Float, nullable=False)  # Moved from Product
     mrp = Column(Float, nullable=False)  # Moved from Product
     quantity = Column(Integer, nullable=False, default=0) # This is now always 1 for individual items
+    last_sold_at = Column(DateTime(timezone=True), nullable=True)  # Set by every SALE stock movement
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     product = relationship("Product", back_populates="inventory_items")
@@ -113,6 +114,50 @@ class Invoice(Base):
     returns = relationship("Return", back_populates="invoice")
     customer = relationship("Customer", back_populates="invoices")
     loyalty_transactions = relationship("LoyaltyTransaction", back_populates="invoice")
+    
+    __table_args__ = (
+        # Keyset pagination, newest first
+        Index('ix_invoices_created_at_id', 'created_at', 'id'),
+    )
+
+class CheckoutIdempotencyKey(Base):
+    __tablename__ = "checkout_idempotency_keys"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, nullable=False, index=True)  # Client-supplied Idempotency-Key header
+    request_hash = Column(String, nullable=False)  # SHA-256 of the checkout payload
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    invoice = relationship("Invoice")
+
+class DocumentCounter(Base):
+    __tablename__ = "document_counters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    series = Column(String, nullable=False)  # INV, RET
+    store_code = Column(String, nullable=False, default="")
+    financial_year = Column(String, nullable=False)  # e.g. 2026-27
+    next_number = Column(Integer, nullable=False, default=1)  # First number of the next block to hand out
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('series', 'store_code', 'financial_year', name='uq_document_counter_series'),
+    )
+
+class DocumentNumberPool(Base):
+    __tablename__ = "document_number_pool"
+    
+    # Allocated but not yet used numbers; a number is removed in the transaction that uses it
+    id = Column(Integer, primary_key=True, index=True)
+    series = Column(String, nullable=False)
+    store_code = Column(String, nullable=False, default="")
+    financial_year = Column(String, nullable=False)
+    number = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('series', 'store_code', 'financial_year', 'number', name='uq_document_number_pool_number'),
+    )
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
@@ -161,6 +206,11 @@ class Return(Base):
     
     invoice = relationship("Invoice", back_populates="returns")
     items = relationship("ReturnItem", back_populates="return_record")
+    
+    __table_args__ = (
+        # Keyset pagination, newest first
+        Index('ix_returns_created_at_id', 'created_at', 'id'),
+    )
 
 class ReturnItem(Base):
     __tablename__ = "return_items"
@@ -187,6 +237,55 @@ class ReturnItem(Base):
     invoice_item = relationship("InvoiceItem")
     inventory_item = relationship("InventoryItem")
 
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"
+
+    # Running totals per store-local day and payment method, kept up to date by checkout
+    # and returns in the same transaction (rebuild with `python sales_rollup.py`)
+    id = Column(Integer, primary_key=True, index=True)
+    store_code = Column(String, nullable=False, default="")
+    sales_date = Column(Date, nullable=False)  # Store-local day
+    payment_method = Column(String, nullable=False)  # Invoice payment method / return refund method
+    gross_sales = Column(Float, nullable=False, default=0)  # Sum of invoice final prices
+    gst_amount = Column(Float, nullable=False, default=0)
+    cgst_amount = Column(Float, nullable=False, default=0)
+    sgst_amount = Column(Float, nullable=False, default=0)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    returns_amount = Column(Float, nullable=False, default=0)  # Negative, like Return.total_return_amount
+    return_gst = Column(Float, nullable=False, default=0)  # Negative
+    return_cgst = Column(Float, nullable=False, default=0)  # Negative
+    return_sgst = Column(Float, nullable=False, default=0)  # Negative
+    return_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('store_code', 'sales_date', 'payment_method', name='uq_daily_sales_rollup'),
+    )
+
+class ProductDailySales(Base):
+    __tablename__ = "product_daily_sales"
+
+    # Units, revenue and cost sold per store-local day and product, kept up to date by
+    # checkout and returns alongside daily_sales_rollup (top products, brand/type drill-down)
+    id = Column(Integer, primary_key=True, index=True)
+    store_code = Column(String, nullable=False, default="")
+    sales_date = Column(Date, nullable=False)  # Store-local day
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity_sold = Column(Integer, nullable=False, default=0)
+    times_sold = Column(Integer, nullable=False, default=0)  # Invoice lines
+    revenue = Column(Float, nullable=False, default=0)  # Final prices (GST-inclusive)
+    net_revenue = Column(Float, nullable=False, default=0)  # Excluding GST
+    cost = Column(Float, nullable=False, default=0)  # Cost price x units sold
+    returned_quantity = Column(Integer, nullable=False, default=0)
+    returns_amount = Column(Float, nullable=False, default=0)  # Negative, GST-inclusive
+    returns_net = Column(Float, nullable=False, default=0)  # Negative, excluding GST
+    return_cost = Column(Float, nullable=False, default=0)  # Cost price x units returned
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('store_code', 'sales_date', 'product_id', name='uq_product_daily_sales'),
+    )
+
 class CashRegister(Base):
     __tablename__ = "cash_register"
     
@@ -287,6 +386,106 @@ class WhatsAppLog(Base):
     invoice = relationship("Invoice")
     template = relationship("WhatsAppTemplate")
 
+class WhatsAppOutbox(Base):
+    __tablename__ = "whatsapp_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    whatsapp_log_id = Column(Integer, ForeignKey("whatsapp_logs.id"), nullable=False)
+    status = Column(String, nullable=False, default="PENDING")  # PENDING, SENDING, SENT, FAILED
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    whatsapp_log = relationship("WhatsAppLog")
+    
+    __table_args__ = (
+        Index('ix_whatsapp_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+class StockMovement(Base):
+    __tablename__ = "stock_movements"
+    
+    # Append-only ledger of every stock change; InventoryItem.quantity is the running balance
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False)
+    movement_type = Column(String, nullable=False)  # SALE, RETURN, RECEIPT, ADJUSTMENT, TRANSFER
+    quantity = Column(Integer, nullable=False)  # Signed change: negative = out, positive = in
+    balance_after = Column(Integer, nullable=False)  # Item quantity after this movement
+    reference_type = Column(String, nullable=True)  # INVOICE, RETURN, IMPORT, ...
+    reference_id = Column(Integer, nullable=True)
+    notes = Column(String, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    inventory_item = relationship("InventoryItem")
+    
+    __table_args__ = (
+        Index('ix_stock_movements_item_created_at', 'inventory_item_id', 'created_at'),
+        Index('ix_stock_movements_created_at', 'created_at'),
+    )
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+    
+    # Per-item balance at a cutoff, derived from the movement ledger; point-in-time
+    # stock = latest snapshot before the date + movements since
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_at = Column(DateTime(timezone=True), nullable=False)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('snapshot_at', 'inventory_item_id', name='uq_stock_snapshot_item'),
+    )
+
+class StockTakeSession(Base):
+    __tablename__ = "stock_take_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    notes = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="OPEN")  # OPEN, POSTED, CANCELLED
+    # Optional scope: only this brand's / product's items are expected to be counted
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
+    total_scans = Column(Integer, nullable=False, default=0)
+    # Counts are compared with stock as of this moment (sales during the count are allowed)
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_scan_at = Column(DateTime(timezone=True), nullable=True)
+    posted_at = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    posted_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class StockTakeCount(Base):
+    __tablename__ = "stock_take_counts"
+    
+    # Pieces counted per barcode in a session (scans are aggregated, not stored one by one)
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("stock_take_sessions.id"), nullable=False)
+    barcode = Column(String, nullable=False)
+    counted = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('session_id', 'barcode', name='uq_stock_take_count_barcode'),
+    )
+
+class StockTakeBatch(Base):
+    __tablename__ = "stock_take_batches"
+    
+    # Scanner batch ids already applied, so a retried upload is not counted twice
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("stock_take_sessions.id"), nullable=False)
+    batch_id = Column(String, nullable=False)
+    scans = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('session_id', 'batch_id', name='uq_stock_take_batch'),
+    )
+
 # ==================== RBAC MODELS ====================
 
 class Permission(Base):
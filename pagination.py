@@ -0,0 +1,74 @@
+"""
+Cursor Pagination
+Keyset pagination shared by the list endpoints. Pages are ordered by a unique key
+(e.g. id, or (created_at, id)); the next page starts after the last row of the
+previous one, so deep pages cost the same as the first. The cursor is an opaque
+token returned in the X-Next-Cursor response header, keeping list bodies unchanged.
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque, URL-safe token for the key values of the last row on a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """Key values from a cursor token, converted to the columns' Python types"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError("cursor does not match the page key")
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else column.type.python_type(value)
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(
+    query: Query,
+    columns: Sequence,
+    limit: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = False
+) -> List:
+    """
+    Return one page of a query ordered by `columns`, and set X-Next-Cursor on the
+    response when more rows follow.
+
+    Args:
+        columns: unique sort key, e.g. [Invoice.created_at, Invoice.id]
+        cursor: token from a previous page's X-Next-Cursor header
+        skip: legacy offset, only used when no cursor is given
+        descending: newest/highest first
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows
@@ -116,7 +116,7 @@ class PDFGenerator:
             doc.build(story)
             
             # Return file response
-            filename = f"invoice_{invoice.invoice_number}.pdf"
+            filename = f"invoice_{invoice.invoice_number.replace('/', '-')}.pdf"
             return FileResponse(
                 path=pdf_path,
                 filename=filename,
@@ -165,7 +165,7 @@ class PDFGenerator:
             doc.build(story)
             
             # Return file response
-            filename = f"return_{return_record.return_number}.pdf"
+            filename = f"return_{return_record.return_number.replace('/', '-')}.pdf"
             return FileResponse(
                 path=pdf_path,
                 filename=filename,
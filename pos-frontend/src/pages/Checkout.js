@@ -23,6 +23,9 @@ const Checkout = () => {
   const [paymentMethod, setPaymentMethod] = useState('CASH');
   const [notes, setNotes] = useState('');
 
+  // Idempotency key for the sale being submitted; kept across retries whose outcome is unknown
+  const [checkoutKey, setCheckoutKey] = useState(null);
+
   // Calculations
   const [totalMrp, setTotalMrp] = useState(0);
   const [totalDiscount, setTotalDiscount] = useState(0);
@@ -186,8 +189,16 @@ const Checkout = () => {
         notes: notes || null
       };
 
-      const response = await api.post('/checkout/', checkoutData);
+      const idempotencyKey = checkoutKey || (window.crypto?.randomUUID
+        ? window.crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+      setCheckoutKey(idempotencyKey);
+
+      const response = await api.post('/checkout/', checkoutData, {
+        headers: { 'Idempotency-Key': idempotencyKey }
+      });
       
+      setCheckoutKey(null);
       setMessage(response.data.message);
       setCart([]);
       setCustomerName('');
@@ -203,6 +214,10 @@ const Checkout = () => {
         fetchInvoices();
       }, 1000);
     } catch (error) {
+      // Keep the key only when the request never got an answer, so a retry can't double-bill
+      if (error.response) {
+        setCheckoutKey(null);
+      }
       setMessage(`Error: ${error.response?.data?.detail || error.message}`);
     } finally {
       setLoading(false);
@@ -210,6 +225,7 @@ const Checkout = () => {
   };
 
   const clearCart = () => {
+    setCheckoutKey(null);
     setCart([]);
     setCustomerName('');
     setCustomerPhone('');
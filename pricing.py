@@ -0,0 +1,161 @@
+"""
+Pricing Engine
+Vectorized GST/discount math for invoices and returns (Indian retail, GST-inclusive MRP).
+All amounts are computed in integer paise; line values always add up exactly to the
+header totals, and CGST + SGST always equals GST.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+def to_paise(amounts) -> np.ndarray:
+    """Rupee amounts -> int64 paise, rounded half away from zero"""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return (np.sign(amounts) * np.floor(np.abs(amounts) * 100 + 0.5)).astype(np.int64)
+
+def to_rupees(paise) -> List[float]:
+    """int64 paise -> list of rupee floats for the Float columns"""
+    return (np.asarray(paise, dtype=np.int64) / 100).tolist()
+
+def divide_round(numerator: np.ndarray, denominator) -> np.ndarray:
+    """Integer division rounded half up (numerator >= 0, denominator > 0)"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def allocate_largest_remainder(total: int, weights: np.ndarray) -> np.ndarray:
+    """
+    Split an integer total across lines in proportion to weights, so that the
+    parts add up to exactly the total (largest-remainder / Hamilton method).
+    """
+    weight_sum = int(weights.sum())
+    if total == 0 or weight_sum == 0:
+        return np.zeros(len(weights), dtype=np.int64)
+
+    products = weights * total
+    parts = products // weight_sum
+    remainders = products % weight_sum
+    leftover = total - int(parts.sum())
+    if leftover:
+        # Stable sort keeps ties in line order
+        order = np.argsort(-remainders, kind="stable")
+        parts[order[:leftover]] += 1
+    return parts
+
+def split_gst(gst: np.ndarray):
+    """Split GST into CGST and SGST; an odd paisa goes to CGST"""
+    cgst = (gst + 1) // 2
+    return cgst, gst - cgst
+
+def price_bill(
+    unit_mrps: Sequence[float],
+    quantities: Sequence[int],
+    gst_rates: Sequence[float],
+    discount_type: Optional[str] = None,
+    discount_value: float = 0,
+    extra_discount: float = 0
+) -> Dict:
+    """
+    Price a checkout bill in one vectorized pass.
+
+    Args:
+        unit_mrps: GST-inclusive MRP per unit for each line
+        quantities: quantity for each line
+        gst_rates: GST rate (percent) for each line
+        discount_type: "PERCENT" or "FIXED" bill-level discount
+        discount_value: percent or rupee value of the bill-level discount
+        extra_discount: further rupee discount on the bill (e.g. redeemed loyalty points)
+
+    Returns:
+        Header totals in rupees plus "lines", a list of per-line dicts with
+        total_price, discount_amount, final_price, base_price, gst_amount,
+        cgst_amount and sgst_amount.
+    """
+    line_mrp = to_paise(unit_mrps) * np.asarray(quantities, dtype=np.int64)
+    # GST rates in basis points so 2.5% etc. stay exact
+    rate_bp = to_paise(gst_rates)
+    total_mrp = int(line_mrp.sum())
+
+    # Bill-level discount, then extra discount, never more than the bill
+    bill_discount = 0
+    if discount_type == "PERCENT" and discount_value > 0:
+        bill_discount = int(divide_round(np.int64(total_mrp) * int(to_paise(discount_value)), 10000))
+    elif discount_type == "FIXED" and discount_value > 0:
+        bill_discount = int(to_paise(discount_value))
+    total_discount = min(bill_discount + int(to_paise(extra_discount)), total_mrp)
+
+    line_discount = allocate_largest_remainder(total_discount, line_mrp)
+    line_final = line_mrp - line_discount
+
+    # Reverse-calculate base amount from the GST-inclusive price at each line's own rate
+    line_base = divide_round(line_final * 10000, 10000 + rate_bp)
+    line_gst = line_final - line_base
+    line_cgst, line_sgst = split_gst(line_gst)
+
+    lines = [
+        {
+            "total_price": total_price,
+            "discount_amount": discount_amount,
+            "final_price": final_price,
+            "base_price": base_price,
+            "gst_amount": gst_amount,
+            "cgst_amount": cgst_amount,
+            "sgst_amount": sgst_amount
+        }
+        for total_price, discount_amount, final_price, base_price, gst_amount, cgst_amount, sgst_amount in zip(
+            to_rupees(line_mrp), to_rupees(line_discount), to_rupees(line_final), to_rupees(line_base),
+            to_rupees(line_gst), to_rupees(line_cgst), to_rupees(line_sgst)
+        )
+    ]
+
+    return {
+        "total_mrp": total_mrp / 100,
+        "total_discount": total_discount / 100,
+        "total_final_price": int(line_final.sum()) / 100,
+        "total_base_amount": int(line_base.sum()) / 100,
+        "total_gst_amount": int(line_gst.sum()) / 100,
+        "total_cgst_amount": int(line_cgst.sum()) / 100,
+        "total_sgst_amount": int(line_sgst.sum()) / 100,
+        "lines": lines
+    }
+
+def price_return(
+    final_prices: Sequence[float],
+    gst_amounts: Sequence[float],
+    original_quantities: Sequence[int],
+    return_quantities: Sequence[int]
+) -> Dict:
+    """
+    Price returned lines pro rata from the original invoice lines in one vectorized pass.
+    Returning the full quantity refunds exactly what was charged. Amounts are negative,
+    as stored on returns.
+
+    Returns:
+        Header totals (total_return_amount, total_return_gst, total_return_cgst,
+        total_return_sgst) plus "lines", a list of per-line dicts with
+        total_return_price, return_gst_amount, return_cgst_amount and return_sgst_amount.
+    """
+    original = np.asarray(original_quantities, dtype=np.int64)
+    returned = np.asarray(return_quantities, dtype=np.int64)
+
+    line_amount = divide_round(to_paise(final_prices) * returned, original)
+    line_gst = divide_round(to_paise(gst_amounts) * returned, original)
+    line_cgst, line_sgst = split_gst(line_gst)
+
+    lines = [
+        {
+            "total_return_price": -amount,
+            "return_gst_amount": -gst,
+            "return_cgst_amount": -cgst,
+            "return_sgst_amount": -sgst
+        }
+        for amount, gst, cgst, sgst in zip(
+            to_rupees(line_amount), to_rupees(line_gst), to_rupees(line_cgst), to_rupees(line_sgst)
+        )
+    ]
+
+    return {
+        "total_return_amount": -int(line_amount.sum()) / 100,
+        "total_return_gst": -int(line_gst.sum()) / 100,
+        "total_return_cgst": -int(line_cgst.sum()) / 100,
+        "total_return_sgst": -int(line_sgst.sum()) / 100,
+        "lines": lines
+    }
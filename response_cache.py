@@ -0,0 +1,241 @@
+"""
+Response Cache
+TTL cache for the report endpoints (/dashboard/*, /crm/analytics, /ml/*) that managers
+keep open on auto-refresh. Responses are keyed by endpoint and query parameters and
+tagged with what they depend on ("sales", "stock"); checkout, returns and stock
+changes bump the tag's generation, which retires every key built under the old one.
+Concurrent misses on the same key wait for one computation instead of each running it.
+
+The default backend is an in-process LRU (per worker, like the barcode cache). Set
+RESPONSE_CACHE_URL to share entries and invalidations between workers through a
+Redis-compatible server; any client with get/set/incr/mget (e.g. a local stand-in)
+can be passed to RedisCacheBackend instead.
+"""
+
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# redis is only needed when RESPONSE_CACHE_URL is set
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+class MemoryCacheBackend:
+    """LRU of key -> value with a TTL per entry, plus tag generation counters"""
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generations(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+class RedisCacheBackend:
+    """Entries as JSON with a server-side expiry; tag generations are shared counters"""
+    name = "redis"
+
+    def __init__(self, client, prefix: str):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self.client.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        self.client.set(self.prefix + key, json.dumps(jsonable_encoder(value)), px=int(ttl_seconds * 1000))
+
+    def generations(self, tags: List[str]) -> List[int]:
+        return [int(value or 0) for value in self.client.mget([f"{self.prefix}generation:{tag}" for tag in tags])]
+
+    def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            self.client.incr(f"{self.prefix}generation:{tag}")
+
+    def clear(self):
+        # Retiring every generation is enough; old entries expire on their own
+        self.bump(["all"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"prefix": self.prefix}
+
+class _Flight:
+    """One in-progress computation that concurrent misses on the same key wait for"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class ResponseCache:
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, counter: str):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0})
+            counters[counter] += 1
+
+    def key(self, namespace: str, tags: List[str], params: Dict[str, Any]) -> str:
+        """Endpoint, current generation of each tag and the sorted parameters"""
+        generations = self.backend.generations(["all"] + tags)
+        return f"{namespace}:{'.'.join(map(str, generations))}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get_or_compute(self, namespace: str, tags: List[str], params: Dict[str, Any],
+                       ttl_seconds: float, compute: Callable[[], Any]) -> Any:
+        """Cached value for the key, or compute it (once, however many requests are waiting)"""
+        if not self.enabled:
+            return compute()
+
+        # Generations and entries both live in the backend; if it is unreachable, serve uncached
+        try:
+            key = self.key(namespace, tags, params)
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed for {namespace}: {e}")
+            self._count(namespace, "errors")
+            return compute()
+        if value is not None:
+            self._count(namespace, "hits")
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            self._count(namespace, "coalesced")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        self._count(namespace, "misses")
+        try:
+            flight.value = compute()
+            try:
+                self.backend.set(key, flight.value, ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Response cache write failed for {namespace}: {e}")
+                self._count(namespace, "errors")
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def cached(self, namespace: str, ttl_seconds: float, tags: Tuple[str, ...] = ("sales",),
+               exclude: Tuple[str, ...] = ("db", "current_user")):
+        """
+        Decorator for a sync endpoint: its keyword arguments (minus the session and user)
+        form the key. Keeps the signature, so FastAPI still injects dependencies.
+        """
+        def decorator(endpoint):
+            @wraps(endpoint)
+            def wrapper(*args, **kwargs):
+                params = {name: value for name, value in kwargs.items() if name not in exclude}
+                return self.get_or_compute(
+                    namespace, list(tags), params, ttl_seconds, lambda: endpoint(*args, **kwargs)
+                )
+            return wrapper
+        return decorator
+
+    def invalidate(self, tags: Iterable[str]):
+        """Retire every entry that depends on one of the tags"""
+        try:
+            self.backend.bump(tags)
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalesced counters per endpoint (this worker) and backend details"""
+        with self._lock:
+            endpoints = {}
+            for namespace, counters in sorted(self._counters.items()):
+                lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+                endpoints[namespace] = dict(
+                    counters,
+                    hit_ratio=(counters["hits"] + counters["coalesced"]) / lookups if lookups else 0.0
+                )
+            hits = sum(counters["hits"] + counters["coalesced"] for counters in self._counters.values())
+            lookups = hits + sum(counters["misses"] for counters in self._counters.values())
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "endpoints": endpoints,
+            **self.backend.stats()
+        }
+
+def build_backend():
+    """Redis-compatible backend when RESPONSE_CACHE_URL is set (and redis is installed), else memory"""
+    if settings.RESPONSE_CACHE_URL:
+        if REDIS_AVAILABLE:
+            return RedisCacheBackend(
+                redis.Redis.from_url(settings.RESPONSE_CACHE_URL, socket_timeout=0.5),
+                prefix=f"pos:{settings.STORE_CODE}:responses:"
+            )
+        logger.warning("RESPONSE_CACHE_URL is set but redis is not installed; using the in-process response cache")
+    return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+# Global response cache instance
+response_cache = ResponseCache(build_backend(), enabled=settings.RESPONSE_CACHE_ENABLED)
@@ -0,0 +1,426 @@
+"""
+Daily Sales Rollup
+Per store, store-local day and payment method totals of sales, GST and returns in
+daily_sales_rollup, and units, revenue and cost per day and product in
+product_daily_sales. Checkout and returns add to the day's rows in their own
+transaction, so the dashboard, GST and top-product reports read a handful of rows
+instead of aggregating the whole invoice and return history.
+"""
+
+from datetime import date
+from typing import Iterable, Dict, List, Optional
+from sqlalchemy import text, func, desc
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from store_time import store_day_bounds
+
+# Store-local date of a timestamp, in SQL
+LOCAL_DATE_SQL = "CAST(timezone(make_interval(mins => :utc_offset), {column}) AS date)"
+
+ROLLUP_COLUMNS = [
+    "gross_sales", "gst_amount", "cgst_amount", "sgst_amount", "invoice_count",
+    "returns_amount", "return_gst", "return_cgst", "return_sgst", "return_count"
+]
+
+PRODUCT_ROLLUP_COLUMNS = [
+    "quantity_sold", "times_sold", "revenue", "net_revenue",
+    "returned_quantity", "returns_amount", "returns_net"
+]
+
+TOP_PRODUCT_METRICS = ["quantity", "revenue", "margin"]
+TOP_PRODUCT_GROUPS = ["product", "brand", "type"]
+
+class SalesRollupService:
+    # Add to today's rows (one per payment method); the rows stay locked until the sale
+    # commits, so callers run this as the last statement before commit
+    ADD_SQL = text("""
+        INSERT INTO daily_sales_rollup
+            (store_code, sales_date, payment_method, gross_sales, gst_amount, cgst_amount, sgst_amount,
+             invoice_count, returns_amount, return_gst, return_cgst, return_sgst, return_count, updated_at)
+        SELECT :store_code, """ + LOCAL_DATE_SQL.format(column="now()") + """, v.*, now()
+        FROM unnest(
+            CAST(:payment_methods AS varchar[]),
+            CAST(:gross_sales AS float8[]), CAST(:gst_amount AS float8[]),
+            CAST(:cgst_amount AS float8[]), CAST(:sgst_amount AS float8[]),
+            CAST(:invoice_count AS integer[]),
+            CAST(:returns_amount AS float8[]), CAST(:return_gst AS float8[]),
+            CAST(:return_cgst AS float8[]), CAST(:return_sgst AS float8[]),
+            CAST(:return_count AS integer[])
+        ) AS v
+        ORDER BY 3
+        ON CONFLICT ON CONSTRAINT uq_daily_sales_rollup DO UPDATE SET
+            gross_sales = daily_sales_rollup.gross_sales + EXCLUDED.gross_sales,
+            gst_amount = daily_sales_rollup.gst_amount + EXCLUDED.gst_amount,
+            cgst_amount = daily_sales_rollup.cgst_amount + EXCLUDED.cgst_amount,
+            sgst_amount = daily_sales_rollup.sgst_amount + EXCLUDED.sgst_amount,
+            invoice_count = daily_sales_rollup.invoice_count + EXCLUDED.invoice_count,
+            returns_amount = daily_sales_rollup.returns_amount + EXCLUDED.returns_amount,
+            return_gst = daily_sales_rollup.return_gst + EXCLUDED.return_gst,
+            return_cgst = daily_sales_rollup.return_cgst + EXCLUDED.return_cgst,
+            return_sgst = daily_sales_rollup.return_sgst + EXCLUDED.return_sgst,
+            return_count = daily_sales_rollup.return_count + EXCLUDED.return_count,
+            updated_at = now()
+    """)
+
+    DELETE_SQL = text("""
+        DELETE FROM daily_sales_rollup
+        WHERE store_code = :store_code
+          AND (CAST(:start_date AS date) IS NULL OR sales_date >= CAST(:start_date AS date))
+          AND (CAST(:end_date AS date) IS NULL OR sales_date <= CAST(:end_date AS date))
+    """)
+
+    # Recompute rows from invoices and returns, merged into one stream and aggregated in one pass
+    REBUILD_SQL = text("""
+        WITH activity AS (
+            SELECT created_at, COALESCE(payment_method, 'UNKNOWN') AS payment_method,
+                   total_final_price AS gross_sales, total_gst_amount AS gst_amount,
+                   total_cgst_amount AS cgst_amount, total_sgst_amount AS sgst_amount, 1 AS invoice_count,
+                   0 AS returns_amount, 0 AS return_gst, 0 AS return_cgst, 0 AS return_sgst, 0 AS return_count
+            FROM invoices
+            WHERE (CAST(:start_at AS timestamptz) IS NULL OR created_at >= CAST(:start_at AS timestamptz))
+              AND (CAST(:end_at AS timestamptz) IS NULL OR created_at < CAST(:end_at AS timestamptz))
+            UNION ALL
+            SELECT created_at, COALESCE(return_method, 'UNKNOWN'),
+                   0, 0, 0, 0, 0,
+                   total_return_amount, total_return_gst, total_return_cgst, total_return_sgst, 1
+            FROM returns
+            WHERE (CAST(:start_at AS timestamptz) IS NULL OR created_at >= CAST(:start_at AS timestamptz))
+              AND (CAST(:end_at AS timestamptz) IS NULL OR created_at < CAST(:end_at AS timestamptz))
+        )
+        INSERT INTO daily_sales_rollup
+            (store_code, sales_date, payment_method, gross_sales, gst_amount, cgst_amount, sgst_amount,
+             invoice_count, returns_amount, return_gst, return_cgst, return_sgst, return_count, updated_at)
+        SELECT :store_code, """ + LOCAL_DATE_SQL.format(column="created_at") + """, payment_method,
+               SUM(gross_sales), SUM(gst_amount), SUM(cgst_amount), SUM(sgst_amount), SUM(invoice_count),
+               SUM(returns_amount), SUM(return_gst), SUM(return_cgst), SUM(return_sgst), SUM(return_count),
+               now()
+        FROM activity
+        GROUP BY 2, 3
+    """)
+
+    # Add invoice/return lines to today's product rows; cost is taken at the item's current cost price
+    ADD_PRODUCT_SQL = text("""
+        INSERT INTO product_daily_sales
+            (store_code, sales_date, product_id, quantity_sold, times_sold, revenue, net_revenue, cost,
+             returned_quantity, returns_amount, returns_net, return_cost, updated_at)
+        SELECT :store_code, """ + LOCAL_DATE_SQL.format(column="now()") + """, i.product_id,
+               SUM(v.quantity_sold), SUM(v.times_sold), SUM(v.revenue), SUM(v.net_revenue),
+               SUM(v.quantity_sold * i.cost_price),
+               SUM(v.returned_quantity), SUM(v.returns_amount), SUM(v.returns_net),
+               SUM(v.returned_quantity * i.cost_price), now()
+        FROM unnest(
+            CAST(:inventory_item_ids AS integer[]),
+            CAST(:quantity_sold AS integer[]), CAST(:times_sold AS integer[]),
+            CAST(:revenue AS float8[]), CAST(:net_revenue AS float8[]),
+            CAST(:returned_quantity AS integer[]),
+            CAST(:returns_amount AS float8[]), CAST(:returns_net AS float8[])
+        ) AS v(inventory_item_id, quantity_sold, times_sold, revenue, net_revenue,
+               returned_quantity, returns_amount, returns_net)
+        JOIN inventory_items i ON i.id = v.inventory_item_id
+        GROUP BY i.product_id
+        ORDER BY i.product_id
+        ON CONFLICT ON CONSTRAINT uq_product_daily_sales DO UPDATE SET
+            quantity_sold = product_daily_sales.quantity_sold + EXCLUDED.quantity_sold,
+            times_sold = product_daily_sales.times_sold + EXCLUDED.times_sold,
+            revenue = product_daily_sales.revenue + EXCLUDED.revenue,
+            net_revenue = product_daily_sales.net_revenue + EXCLUDED.net_revenue,
+            cost = product_daily_sales.cost + EXCLUDED.cost,
+            returned_quantity = product_daily_sales.returned_quantity + EXCLUDED.returned_quantity,
+            returns_amount = product_daily_sales.returns_amount + EXCLUDED.returns_amount,
+            returns_net = product_daily_sales.returns_net + EXCLUDED.returns_net,
+            return_cost = product_daily_sales.return_cost + EXCLUDED.return_cost,
+            updated_at = now()
+    """)
+
+    DELETE_PRODUCTS_SQL = text("""
+        DELETE FROM product_daily_sales
+        WHERE store_code = :store_code
+          AND (CAST(:start_date AS date) IS NULL OR sales_date >= CAST(:start_date AS date))
+          AND (CAST(:end_date AS date) IS NULL OR sales_date <= CAST(:end_date AS date))
+    """)
+
+    # Recompute product rows from invoice and return lines, merged into one stream
+    REBUILD_PRODUCTS_SQL = text("""
+        WITH activity AS (
+            SELECT created_at, inventory_item_id, quantity AS quantity_sold, 1 AS times_sold,
+                   final_price AS revenue, base_price AS net_revenue,
+                   0 AS returned_quantity, 0 AS returns_amount, 0 AS returns_net
+            FROM invoice_items
+            WHERE (CAST(:start_at AS timestamptz) IS NULL OR created_at >= CAST(:start_at AS timestamptz))
+              AND (CAST(:end_at AS timestamptz) IS NULL OR created_at < CAST(:end_at AS timestamptz))
+            UNION ALL
+            SELECT created_at, inventory_item_id, 0, 0, 0, 0,
+                   return_quantity, total_return_price, total_return_price - return_gst_amount
+            FROM return_items
+            WHERE (CAST(:start_at AS timestamptz) IS NULL OR created_at >= CAST(:start_at AS timestamptz))
+              AND (CAST(:end_at AS timestamptz) IS NULL OR created_at < CAST(:end_at AS timestamptz))
+        )
+        INSERT INTO product_daily_sales
+            (store_code, sales_date, product_id, quantity_sold, times_sold, revenue, net_revenue, cost,
+             returned_quantity, returns_amount, returns_net, return_cost, updated_at)
+        SELECT :store_code, """ + LOCAL_DATE_SQL.format(column="a.created_at") + """, i.product_id,
+               SUM(a.quantity_sold), SUM(a.times_sold), SUM(a.revenue), SUM(a.net_revenue),
+               SUM(a.quantity_sold * i.cost_price),
+               SUM(a.returned_quantity), SUM(a.returns_amount), SUM(a.returns_net),
+               SUM(a.returned_quantity * i.cost_price), now()
+        FROM activity a
+        JOIN inventory_items i ON i.id = a.inventory_item_id
+        GROUP BY 2, 3
+    """)
+
+    # Every dashboard period in one pass over the month's rollup rows: per-day net figures
+    # (sales plus the negative returns, all payment methods) summed with FILTER per window
+    PERIOD_TOTALS_SQL = text("""
+        WITH days AS (
+            SELECT sales_date,
+                   SUM(gross_sales + returns_amount) AS sales,
+                   SUM(gst_amount + return_gst) AS gst,
+                   SUM(cgst_amount + return_cgst) AS cgst,
+                   SUM(sgst_amount + return_sgst) AS sgst,
+                   SUM(invoice_count) AS invoices
+            FROM daily_sales_rollup
+            WHERE store_code = :store_code AND sales_date >= :month_start AND sales_date <= :today
+            GROUP BY sales_date
+        )
+        SELECT
+            COALESCE(SUM(sales) FILTER (WHERE sales_date = :today), 0) AS daily_sales,
+            COALESCE(SUM(gst) FILTER (WHERE sales_date = :today), 0) AS daily_gst,
+            COALESCE(SUM(cgst) FILTER (WHERE sales_date = :today), 0) AS daily_cgst,
+            COALESCE(SUM(sgst) FILTER (WHERE sales_date = :today), 0) AS daily_sgst,
+            COALESCE(SUM(invoices) FILTER (WHERE sales_date = :today), 0) AS daily_invoices,
+            COALESCE(SUM(sales) FILTER (WHERE sales_date >= :week_start), 0) AS weekly_sales,
+            COALESCE(SUM(gst) FILTER (WHERE sales_date >= :week_start), 0) AS weekly_gst,
+            COALESCE(SUM(cgst) FILTER (WHERE sales_date >= :week_start), 0) AS weekly_cgst,
+            COALESCE(SUM(sgst) FILTER (WHERE sales_date >= :week_start), 0) AS weekly_sgst,
+            COALESCE(SUM(invoices) FILTER (WHERE sales_date >= :week_start), 0) AS weekly_invoices,
+            COALESCE(SUM(sales), 0) AS monthly_sales,
+            COALESCE(SUM(gst), 0) AS monthly_gst,
+            COALESCE(SUM(cgst), 0) AS monthly_cgst,
+            COALESCE(SUM(sgst), 0) AS monthly_sgst,
+            COALESCE(SUM(invoices), 0) AS monthly_invoices,
+            COALESCE(
+                json_agg(json_build_object(
+                    'date', to_char(sales_date, 'YYYY-MM-DD'), 'sales', sales, 'gst', gst, 'invoices', invoices
+                ) ORDER BY sales_date) FILTER (WHERE sales_date >= :week_start),
+                '[]'
+            ) AS trend
+        FROM days
+    """)
+
+    def _add(self, db: Session, totals: Dict[str, Dict[str, float]]):
+        """Add per-payment-method totals to today's rows"""
+        if not totals:
+            return
+        methods = sorted(totals)
+        params = {
+            column: [totals[method].get(column, 0) for method in methods]
+            for column in ROLLUP_COLUMNS
+        }
+        db.execute(self.ADD_SQL, dict(
+            params,
+            store_code=settings.STORE_CODE,
+            utc_offset=settings.STORE_UTC_OFFSET_MINUTES,
+            payment_methods=methods
+        ))
+
+    def record_sales(self, db: Session, invoices: Iterable[Dict]):
+        """
+        Count new invoices in today's rollup. Each invoice is a dict with payment_method,
+        total_final_price, total_gst_amount, total_cgst_amount and total_sgst_amount.
+        """
+        totals = {}
+        for invoice in invoices:
+            row = totals.setdefault(invoice.get("payment_method") or "UNKNOWN", {
+                "gross_sales": 0, "gst_amount": 0, "cgst_amount": 0, "sgst_amount": 0, "invoice_count": 0
+            })
+            row["gross_sales"] += invoice["total_final_price"]
+            row["gst_amount"] += invoice["total_gst_amount"]
+            row["cgst_amount"] += invoice["total_cgst_amount"]
+            row["sgst_amount"] += invoice["total_sgst_amount"]
+            row["invoice_count"] += 1
+        self._add(db, totals)
+
+    def record_return(self, db: Session, return_method: Optional[str], refund: Dict):
+        """Count a new return (amounts negative, as priced by price_return) under its refund method"""
+        self._add(db, {
+            return_method or "UNKNOWN": {
+                "returns_amount": refund["total_return_amount"],
+                "return_gst": refund["total_return_gst"],
+                "return_cgst": refund["total_return_cgst"],
+                "return_sgst": refund["total_return_sgst"],
+                "return_count": 1
+            }
+        })
+
+    def _add_products(self, db: Session, lines: List[Dict]):
+        """Add per-inventory-item line totals to today's product rows"""
+        if not lines:
+            return
+        params = {column: [line.get(column, 0) for line in lines] for column in PRODUCT_ROLLUP_COLUMNS}
+        db.execute(self.ADD_PRODUCT_SQL, dict(
+            params,
+            store_code=settings.STORE_CODE,
+            utc_offset=settings.STORE_UTC_OFFSET_MINUTES,
+            inventory_item_ids=[line["inventory_item_id"] for line in lines]
+        ))
+
+    def record_product_sales(self, db: Session, invoice_items: Iterable[Dict]):
+        """Count new invoice lines (inventory_item_id, quantity, final_price, base_price) per product"""
+        self._add_products(db, [
+            {
+                "inventory_item_id": item["inventory_item_id"],
+                "quantity_sold": item["quantity"],
+                "times_sold": 1,
+                "revenue": item["final_price"],
+                "net_revenue": item["base_price"]
+            }
+            for item in invoice_items
+        ])
+
+    def record_product_returns(self, db: Session, return_lines: Iterable[Dict]):
+        """
+        Count returned lines per product. Each line has inventory_item_id, return_quantity and
+        the (negative) total_return_price and return_gst_amount from price_return.
+        """
+        self._add_products(db, [
+            {
+                "inventory_item_id": line["inventory_item_id"],
+                "returned_quantity": line["return_quantity"],
+                "returns_amount": line["total_return_price"],
+                "returns_net": line["total_return_price"] - line["return_gst_amount"]
+            }
+            for line in return_lines
+            if line["inventory_item_id"] is not None
+        ])
+
+    def rebuild(self, db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """Recompute both rollups (optionally only for a range of store-local days); returns rows written"""
+        # Only one rebuild at a time
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('daily_sales_rollup'))"))
+        params = {
+            "store_code": settings.STORE_CODE,
+            "utc_offset": settings.STORE_UTC_OFFSET_MINUTES,
+            "start_date": start_date,
+            "end_date": end_date,
+            "start_at": store_day_bounds(start_date)[0] if start_date else None,
+            "end_at": store_day_bounds(end_date)[1] if end_date else None
+        }
+        db.execute(self.DELETE_SQL, params)
+        db.execute(self.DELETE_PRODUCTS_SQL, params)
+        return db.execute(self.REBUILD_SQL, params).rowcount + db.execute(self.REBUILD_PRODUCTS_SQL, params).rowcount
+
+    def is_empty(self, db: Session) -> bool:
+        """True while either rollup table has no rows yet (first start, or an upgrade that added one)"""
+        return db.execute(text(
+            "SELECT NOT EXISTS (SELECT 1 FROM daily_sales_rollup) OR NOT EXISTS (SELECT 1 FROM product_daily_sales)"
+        )).scalar()
+
+    def period_totals(self, db: Session, today: date, week_start: date, month_start: date):
+        """
+        Net (after returns) sales, GST, CGST, SGST and invoice count for today, the week and
+        the month (columns daily_*, weekly_*, monthly_*) plus the per-day trend since
+        week_start, all from one query
+        """
+        return db.execute(self.PERIOD_TOTALS_SQL, {
+            "store_code": settings.STORE_CODE,
+            "today": today,
+            "week_start": week_start,
+            "month_start": month_start
+        }).first()
+
+    def top_sellers(self, db: Session, start_date: date, end_date: date, metric: str = "quantity",
+                    group_by: str = "product", limit: int = 10, brand_id: Optional[int] = None,
+                    product_type: Optional[str] = None) -> List[Dict]:
+        """
+        Best sellers over store-local days start_date..end_date, net of returns, ranked by
+        units, revenue or margin (net revenue excluding GST minus cost). Grouped by product,
+        brand or product type, optionally within one brand and/or type.
+        """
+        # Sum the days per product first (an index-only scan of the date range), then join the
+        # few thousand product rows for names, brands and types
+        rollup = models.ProductDailySales
+        totals = db.query(
+            rollup.product_id.label("product_id"),
+            func.sum(rollup.quantity_sold - rollup.returned_quantity).label("quantity"),
+            func.sum(rollup.returned_quantity).label("returned_quantity"),
+            func.sum(rollup.revenue + rollup.returns_amount).label("revenue"),
+            func.sum(rollup.net_revenue + rollup.returns_net).label("net_revenue"),
+            func.sum(rollup.cost - rollup.return_cost).label("cost"),
+            func.sum(rollup.times_sold).label("times_sold")
+        ).filter(
+            rollup.store_code == settings.STORE_CODE,
+            rollup.sales_date >= start_date,
+            rollup.sales_date <= end_date
+        )
+        if brand_id is not None or product_type is not None:
+            products = db.query(models.Product.id)
+            if brand_id is not None:
+                products = products.filter(models.Product.brand_id == brand_id)
+            if product_type is not None:
+                products = products.filter(models.Product.type == product_type)
+            totals = totals.filter(rollup.product_id.in_(products))
+        totals = totals.group_by(rollup.product_id).subquery()
+
+        group_columns = {
+            "product": [
+                models.Product.id.label("product_id"), models.Product.name.label("product_name"),
+                models.Product.type.label("product_type"), models.Brand.name.label("brand_name")
+            ],
+            "brand": [models.Brand.id.label("brand_id"), models.Brand.name.label("brand_name")],
+            "type": [models.Product.type.label("product_type")]
+        }[group_by]
+        quantity = func.sum(totals.c.quantity)
+        revenue = func.sum(totals.c.revenue)
+        cost = func.sum(totals.c.cost)
+        margin = func.sum(totals.c.net_revenue) - cost
+        ranking = {"quantity": quantity, "revenue": revenue, "margin": margin}[metric]
+
+        rows = db.query(
+            *group_columns,
+            quantity.label("total_quantity"),
+            func.sum(totals.c.returned_quantity).label("returned_quantity"),
+            revenue.label("total_revenue"),
+            cost.label("total_cost"),
+            margin.label("margin"),
+            func.sum(totals.c.times_sold).label("times_sold")
+        ).select_from(totals).join(
+            models.Product, models.Product.id == totals.c.product_id
+        ).outerjoin(
+            models.Brand, models.Brand.id == models.Product.brand_id
+        ).group_by(*group_columns).order_by(desc(ranking), *group_columns).limit(limit).all()
+
+        results = []
+        for row in rows:
+            result = dict(row._mapping)
+            result["total_quantity"] = int(result["total_quantity"] or 0)
+            result["returned_quantity"] = int(result["returned_quantity"] or 0)
+            result["times_sold"] = int(result["times_sold"] or 0)
+            for column in ["total_revenue", "total_cost", "margin"]:
+                result[column] = round(float(result[column] or 0), 2)
+            results.append(result)
+        return results
+
+# Global sales rollup instance
+sales_rollup = SalesRollupService()
+
+if __name__ == "__main__":
+    # Backfill: python sales_rollup.py [FROM_DATE [TO_DATE]]  (YYYY-MM-DD, store-local, inclusive)
+    # Without dates the whole rollup is rebuilt from invoices and returns
+    import sys
+    from database import SessionLocal
+
+    start = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    end = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    db = SessionLocal()
+    try:
+        rows = sales_rollup.rebuild(db, start, end)
+        db.commit()
+        print(f"✅ Daily sales rollup rebuilt: {rows} rows")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Daily sales rollup rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
@@ -72,13 +72,197 @@ class InventoryItemSubtract(BaseModel):
 
 class InventoryItem(InventoryItemBase):
     id: int
+    last_sold_at: Optional[datetime.datetime] = None
     created_at: datetime.datetime
     updated_at: Optional[datetime.datetime] = None
-    product: Optional[schemas.Product] = None
+    product: Optional[Product] = None
     
     class Config:
         orm_mode = True
 
+# Inventory Import Schemas
+class InventoryImportError(BaseModel):
+    row: int  # Row number in the file (header is row 1)
+    barcode: Optional[str] = None
+    error: str
+
+class InventoryImportResponse(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    dry_run: bool = False
+    errors: List[InventoryImportError]
+
+class InventorySearchResult(BaseModel):
+    id: int
+    product_id: int
+    product_name: str
+    barcode: str
+    design_number: str
+    size: str
+    color: str
+    mrp: float
+    quantity: int
+    match_type: str  # exact, prefix or fuzzy
+    score: float  # Trigram similarity (0-1) for ranking fuzzy matches
+
+class VariantMatrixDesign(BaseModel):
+    design_number: str
+    quantities: List[List[Optional[int]]]  # [colour][size]; null = no such SKU
+    total_quantity: int
+
+class VariantMatrix(BaseModel):
+    product_id: int
+    product_name: str
+    size_type: str
+    sizes: List[str]  # Column order, following the product's size scale
+    colors: List[str]  # Row order
+    designs: List[VariantMatrixDesign]
+    size_totals: List[int]
+    total_quantity: int
+    sku_count: int
+
+# Stock Ledger Schemas
+class StockMovementCreate(BaseModel):
+    barcode: str
+    movement_type: str  # RECEIPT, ADJUSTMENT or TRANSFER (sales and returns are logged by checkout)
+    quantity: int  # Signed change: negative = out, positive = in
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    notes: Optional[str] = None
+
+class StockMovement(BaseModel):
+    id: int
+    inventory_item_id: int
+    movement_type: str
+    quantity: int
+    balance_after: int
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    notes: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: datetime.datetime
+    
+    class Config:
+        orm_mode = True
+
+class StockLevel(BaseModel):
+    inventory_item_id: int
+    product_id: int
+    barcode: str
+    design_number: str
+    size: str
+    color: str
+    cost_price: float
+    mrp: float
+    quantity: int
+    
+    class Config:
+        orm_mode = True
+
+class StockAsOfResponse(BaseModel):
+    as_of: datetime.datetime
+    total_quantity: int
+    total_cost_value: float
+    total_mrp_value: float
+    items: List[StockLevel]
+
+class StockSnapshotResponse(BaseModel):
+    snapshot_at: datetime.datetime
+    items: int
+
+# Stock Take Schemas
+class StockTakeCreate(BaseModel):
+    name: str
+    notes: Optional[str] = None
+    brand_id: Optional[int] = None  # Limit the count to one brand
+    product_id: Optional[int] = None  # ... or to one product
+
+class StockTakeSession(BaseModel):
+    id: int
+    name: str
+    notes: Optional[str] = None
+    status: str
+    brand_id: Optional[int] = None
+    product_id: Optional[int] = None
+    total_scans: int
+    started_at: datetime.datetime
+    last_scan_at: Optional[datetime.datetime] = None
+    posted_at: Optional[datetime.datetime] = None
+    created_by: Optional[int] = None
+    posted_by: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+class StockTakeScanBatch(BaseModel):
+    barcodes: List[str]  # One entry per scan; repeated barcodes count as several pieces
+    batch_id: Optional[str] = None  # Scanner-generated id; a retried batch is applied once
+
+class StockTakeScanResponse(BaseModel):
+    session_id: int
+    scans: int
+    distinct_barcodes: int
+    replayed: bool
+    total_scans: int
+
+class StockTakeVarianceLine(BaseModel):
+    barcode: str
+    inventory_item_id: Optional[int] = None
+    product_id: Optional[int] = None
+    design_number: Optional[str] = None
+    size: Optional[str] = None
+    color: Optional[str] = None
+    cost_price: Optional[float] = None
+    mrp: Optional[float] = None
+    expected: int
+    counted: int
+    variance: int  # counted - expected
+    status: str  # SHRINKAGE, EXCESS, MATCHED, UNKNOWN or OUT_OF_SCOPE
+
+class StockTakeVarianceSummary(BaseModel):
+    skus_in_scope: int
+    expected_quantity: int
+    counted_quantity: int
+    matched_skus: int
+    shrinkage_skus: int
+    excess_skus: int
+    unknown_barcodes: int
+    out_of_scope_barcodes: int
+    shrinkage_quantity: int
+    shrinkage_cost_value: float
+    shrinkage_mrp_value: float
+    excess_quantity: int
+    excess_cost_value: float
+    excess_mrp_value: float
+
+class StockTakeVarianceReport(BaseModel):
+    session: StockTakeSession
+    summary: StockTakeVarianceSummary
+    lines: List[StockTakeVarianceLine]
+
+class StockTakePostResponse(BaseModel):
+    session: StockTakeSession
+    summary: StockTakeVarianceSummary
+    adjustments: int
+
+# Label Schemas
+class BarcodeAllocationRequest(BaseModel):
+    count: int
+
+class BarcodeAllocationResponse(BaseModel):
+    first_barcode: str
+    last_barcode: str
+    barcodes: List[str]
+
+class LabelRequestItem(BaseModel):
+    barcode: str
+    copies: Optional[int] = None  # Defaults to the item's stock quantity
+
+class LabelSheetRequest(BaseModel):
+    items: List[LabelRequestItem]
+    allow_unregistered: bool = False  # Print barcode-only tags for barcodes not in inventory yet
+
 # Inventory Summary Schema
 class InventorySummary(BaseModel):
     product_id: int
@@ -165,6 +349,29 @@ class CheckoutResponse(BaseModel):
     invoice: Invoice
     message: str 
 
+class CheckoutBatchSale(CheckoutRequest):
+    client_reference: Optional[str] = None  # Till's own reference for the bill, echoed back in the result
+    idempotency_key: Optional[str] = None  # Same semantics as the Idempotency-Key header on /checkout/
+
+class CheckoutBatchRequest(BaseModel):
+    sales: List[CheckoutBatchSale]
+
+class CheckoutBatchResult(BaseModel):
+    index: int  # Position of the sale in the request
+    client_reference: Optional[str] = None
+    success: bool
+    status_code: int
+    invoice_id: Optional[int] = None
+    invoice_number: Optional[str] = None
+    total_final_price: Optional[float] = None
+    replayed: bool = False  # True when the idempotency key had already produced this invoice
+    error: Optional[str] = None
+
+class CheckoutBatchResponse(BaseModel):
+    results: List[CheckoutBatchResult]
+    succeeded: int
+    failed: int
+
 class ReturnItemBase(BaseModel):
     invoice_item_id: int
     inventory_item_id: int
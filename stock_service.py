@@ -0,0 +1,296 @@
+"""
+Stock Service
+Handles concurrency-safe stock changes for inventory items. Every change is written
+to the append-only stock_movements ledger in the same statement that updates the
+item's quantity (the per-SKU balance). Periodic snapshots of the ledger back the
+point-in-time stock query.
+"""
+
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Dict, Optional, Iterable
+
+MOVEMENT_TYPES = ["SALE", "RETURN", "RECEIPT", "ADJUSTMENT", "TRANSFER"]
+
+class StockService:
+    # Lock the affected rows in id order (so parallel tills never deadlock), apply the
+    # net change to rows that stay non-negative, and log one movement per requested
+    # line with its running balance, all in a single statement
+    MOVE_SQL = text("""
+        WITH wanted AS (
+            SELECT v.id, v.delta, v.ref, v.ord
+            FROM unnest(CAST(:ids AS integer[]), CAST(:deltas AS integer[]), CAST(:refs AS integer[]))
+                WITH ORDINALITY AS v(id, delta, ref, ord)
+        ),
+        totals AS (
+            SELECT id, SUM(delta) AS delta FROM wanted GROUP BY id
+        ),
+        locked AS (
+            SELECT i.id
+            FROM inventory_items i
+            JOIN totals t ON t.id = i.id
+            ORDER BY i.id
+            FOR UPDATE
+        ),
+        updated AS (
+            UPDATE inventory_items AS i
+            SET quantity = i.quantity + t.delta,
+                last_sold_at = CASE WHEN :movement_type = 'SALE' THEN now() ELSE i.last_sold_at END,
+                updated_at = now()
+            FROM totals t
+            WHERE i.id = t.id
+              AND i.id IN (SELECT id FROM locked)
+              AND (CAST(:allow_negative AS boolean) OR i.quantity + t.delta >= 0)
+            RETURNING i.id, i.quantity, t.delta
+        ),
+        moved AS (
+            INSERT INTO stock_movements
+                (inventory_item_id, movement_type, quantity, balance_after, reference_type, reference_id, notes, created_by)
+            SELECT w.id, :movement_type, w.delta,
+                   u.quantity - u.delta + SUM(w.delta) OVER (PARTITION BY w.id ORDER BY w.ord),
+                   :reference_type, w.ref, :notes, :created_by
+            FROM wanted w
+            JOIN updated u ON u.id = w.id
+            RETURNING id
+        )
+        SELECT id, quantity FROM updated
+    """)
+
+    LOCK_SQL = text("""
+        SELECT id, quantity FROM inventory_items
+        WHERE id = ANY(CAST(:ids AS integer[]))
+        ORDER BY id
+        FOR UPDATE
+    """)
+
+    # Log the starting quantity of newly created items as a receipt
+    RECEIPT_SQL = text("""
+        INSERT INTO stock_movements
+            (inventory_item_id, movement_type, quantity, balance_after, reference_type, notes, created_by)
+        SELECT id, 'RECEIPT', quantity, quantity, :reference_type, :notes, :created_by
+        FROM inventory_items
+        WHERE barcode = ANY(CAST(:barcodes AS varchar[])) AND quantity <> 0
+    """)
+
+    # Items whose stock predates the ledger get one opening movement, so the
+    # movements of every item always add up to its quantity
+    OPENING_BALANCE_SQL = text("""
+        INSERT INTO stock_movements (inventory_item_id, movement_type, quantity, balance_after, notes)
+        SELECT i.id, 'ADJUSTMENT', i.quantity, i.quantity, 'Opening balance'
+        FROM inventory_items i
+        WHERE i.quantity <> 0
+          AND NOT EXISTS (SELECT 1 FROM stock_movements m WHERE m.inventory_item_id = i.id)
+    """)
+
+    # Snapshot = previous snapshot + movements up to the cutoff
+    SNAPSHOT_SQL = text("""
+        WITH previous AS (
+            SELECT max(snapshot_at) AS snapshot_at FROM stock_snapshots WHERE snapshot_at < :as_of
+        ),
+        base AS (
+            SELECT s.inventory_item_id, s.quantity
+            FROM stock_snapshots s, previous p
+            WHERE s.snapshot_at = p.snapshot_at
+        ),
+        delta AS (
+            SELECT m.inventory_item_id, SUM(m.quantity) AS quantity
+            FROM stock_movements m, previous p
+            WHERE m.created_at > COALESCE(p.snapshot_at, '-infinity') AND m.created_at <= :as_of
+            GROUP BY m.inventory_item_id
+        )
+        INSERT INTO stock_snapshots (snapshot_at, inventory_item_id, quantity)
+        SELECT :as_of, COALESCE(b.inventory_item_id, d.inventory_item_id), COALESCE(b.quantity, 0) + COALESCE(d.quantity, 0)
+        FROM base b
+        FULL JOIN delta d ON d.inventory_item_id = b.inventory_item_id
+        ON CONFLICT ON CONSTRAINT uq_stock_snapshot_item DO NOTHING
+    """)
+
+    # Stock at a point in time = latest snapshot at or before it + movements since
+    STOCK_AS_OF_SQL = text("""
+        WITH base AS (
+            SELECT max(snapshot_at) AS snapshot_at FROM stock_snapshots WHERE snapshot_at <= :at
+        ),
+        delta AS (
+            SELECT m.inventory_item_id, SUM(m.quantity) AS quantity
+            FROM stock_movements m, base b
+            WHERE m.created_at > COALESCE(b.snapshot_at, '-infinity') AND m.created_at <= :at
+            GROUP BY m.inventory_item_id
+        ),
+        stock AS (
+            SELECT COALESCE(s.inventory_item_id, d.inventory_item_id) AS inventory_item_id,
+                   COALESCE(s.quantity, 0) + COALESCE(d.quantity, 0) AS quantity
+            FROM (
+                SELECT s.inventory_item_id, s.quantity
+                FROM stock_snapshots s, base b
+                WHERE s.snapshot_at = b.snapshot_at
+            ) s
+            FULL JOIN delta d ON d.inventory_item_id = s.inventory_item_id
+        )
+        SELECT i.id AS inventory_item_id, i.product_id, i.barcode, i.design_number, i.size, i.color,
+               i.cost_price, i.mrp, st.quantity
+        FROM stock st
+        JOIN inventory_items i ON i.id = st.inventory_item_id
+        WHERE st.quantity <> 0
+          AND (CAST(:product_id AS integer) IS NULL OR i.product_id = CAST(:product_id AS integer))
+        ORDER BY i.id
+    """)
+
+    def move(
+        self,
+        db: Session,
+        movement_type: str,
+        movements: List[Dict],
+        reference_type: Optional[str] = None,
+        notes: Optional[str] = None,
+        created_by: Optional[int] = None,
+        allow_negative: bool = False
+    ) -> List[Dict]:
+        """
+        Apply stock movements and log them in one statement.
+
+        Args:
+            movements: dicts with inventory_item_id, quantity (signed change) and an
+                optional reference_id; several lines may hit the same item
+            allow_negative: let a balance go below zero
+
+        Returns:
+            List of shortfalls ({"inventory_item_id", "available", "requested"}).
+            An empty list means every movement was applied. When it is not empty
+            the caller must roll back, since the items that did have stock were
+            already changed in the current transaction.
+        """
+        if not movements:
+            return []
+
+        rows = db.execute(self.MOVE_SQL, {
+            "ids": [movement["inventory_item_id"] for movement in movements],
+            "deltas": [movement["quantity"] for movement in movements],
+            "refs": [movement.get("reference_id") for movement in movements],
+            "movement_type": movement_type,
+            "reference_type": reference_type,
+            "notes": notes,
+            "created_by": created_by,
+            "allow_negative": allow_negative
+        }).fetchall()
+
+        totals = {}
+        for movement in movements:
+            item_id = movement["inventory_item_id"]
+            totals[item_id] = totals.get(item_id, 0) + movement["quantity"]
+        updated = {row.id for row in rows}
+        short_ids = [item_id for item_id in totals if item_id not in updated]
+        if not short_ids:
+            return []
+
+        available = dict(db.execute(
+            text("SELECT id, quantity FROM inventory_items WHERE id = ANY(CAST(:ids AS integer[]))"),
+            {"ids": short_ids}
+        ).fetchall())
+
+        return [
+            {
+                "inventory_item_id": item_id,
+                "available": available.get(item_id, 0),
+                "requested": -totals[item_id]
+            }
+            for item_id in short_ids
+        ]
+
+    def decrement(
+        self,
+        db: Session,
+        quantities: Dict[int, int],
+        movement_type: str = "SALE",
+        reference_type: Optional[str] = None,
+        reference_id: Optional[int] = None,
+        notes: Optional[str] = None,
+        created_by: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Atomically subtract stock for several inventory items (inventory_item_id -> quantity).
+        Returns shortfalls like move(); the caller must roll back when there are any.
+        """
+        return self.move(
+            db,
+            movement_type,
+            [
+                {"inventory_item_id": item_id, "quantity": -quantity, "reference_id": reference_id}
+                for item_id, quantity in quantities.items()
+            ],
+            reference_type=reference_type,
+            notes=notes,
+            created_by=created_by
+        )
+
+    def lock_quantities(self, db: Session, inventory_item_ids) -> Dict[int, int]:
+        """
+        Lock inventory rows (in id order) for the rest of the transaction and return
+        their on-hand quantities. Used when stock is allocated across many sales in
+        Python before a single move().
+        """
+        ids = sorted(set(inventory_item_ids))
+        if not ids:
+            return {}
+        return dict(db.execute(self.LOCK_SQL, {"ids": ids}).fetchall())
+
+    def record_receipts(
+        self,
+        db: Session,
+        barcodes: Iterable[str],
+        reference_type: Optional[str] = None,
+        notes: Optional[str] = None,
+        created_by: Optional[int] = None
+    ):
+        """Log the starting quantity of newly created items as RECEIPT movements"""
+        barcodes = list(barcodes)
+        if barcodes:
+            db.execute(self.RECEIPT_SQL, {
+                "barcodes": barcodes,
+                "reference_type": reference_type,
+                "notes": notes,
+                "created_by": created_by
+            })
+
+    def record_opening_balances(self, db: Session) -> int:
+        """Give items that have stock but no movements an opening movement; returns how many"""
+        # Serialize with other workers running the same startup step
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('stock_movements_opening_balance'))"))
+        return db.execute(self.OPENING_BALANCE_SQL).rowcount
+
+    def take_snapshot(self, db: Session, as_of: datetime) -> int:
+        """
+        Store every item's balance at a past cutoff, derived from the ledger. Use a
+        cutoff older than any open transaction (e.g. the start of today).
+        Returns the number of rows written (0 if that snapshot already exists).
+        """
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext('stock_snapshots'))"))
+        return db.execute(self.SNAPSHOT_SQL, {"as_of": as_of}).rowcount
+
+    def stock_as_of(self, db: Session, at: datetime, product_id: Optional[int] = None) -> List:
+        """Per-item stock at a point in time (items with a non-zero balance only)"""
+        return db.execute(self.STOCK_AS_OF_SQL, {"at": at, "product_id": product_id}).fetchall()
+
+# Global stock service instance
+stock_service = StockService()
+
+if __name__ == "__main__":
+    # Nightly job: python stock_service.py [YYYY-MM-DD]
+    # Snapshots stock as of the start of the given store-local day (default: today)
+    import sys
+    from database import SessionLocal
+    from store_time import store_day_start
+
+    day = store_day_start(datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None)
+    db = SessionLocal()
+    try:
+        stock_service.record_opening_balances(db)
+        rows = stock_service.take_snapshot(db, day)
+        db.commit()
+        print(f"✅ Stock snapshot as of {day.isoformat()}: {rows} items")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Stock snapshot failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
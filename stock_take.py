@@ -0,0 +1,162 @@
+"""
+Stock Take Service
+Physical stock-take sessions. Scanners upload barcodes in batches; each batch is
+collapsed to per-barcode counts in memory and merged into stock_take_counts with one
+upsert, so there is no round-trip per scan. The variance against book stock is one
+set-based query, and posting writes every adjustment through a single stock move.
+"""
+
+from collections import Counter
+from sqlalchemy.orm import Session
+from sqlalchemy import text, func
+from typing import List, Dict, Optional
+
+import models
+from stock_service import stock_service
+
+class StockTakeService:
+    # Remember a scanner batch id; returns no row when the batch was already applied
+    CLAIM_BATCH_SQL = text("""
+        INSERT INTO stock_take_batches (session_id, batch_id, scans)
+        VALUES (:session_id, :batch_id, :scans)
+        ON CONFLICT ON CONSTRAINT uq_stock_take_batch DO NOTHING
+        RETURNING id
+    """)
+
+    MERGE_COUNTS_SQL = text("""
+        INSERT INTO stock_take_counts (session_id, barcode, counted)
+        SELECT :session_id, v.barcode, v.counted
+        FROM unnest(CAST(:barcodes AS varchar[]), CAST(:counts AS integer[])) AS v(barcode, counted)
+        ON CONFLICT ON CONSTRAINT uq_stock_take_count_barcode
+        DO UPDATE SET counted = stock_take_counts.counted + EXCLUDED.counted
+    """)
+
+    # Book stock at session start = current quantity minus movements since the start,
+    # so sales rung up while the floor is being counted do not show up as variance.
+    # Items in scope that were never scanned count as 0; scanned barcodes that are not
+    # in scope are reported as UNKNOWN (not in inventory) or OUT_OF_SCOPE.
+    VARIANCE_SQL = text("""
+        WITH session AS (
+            SELECT id, started_at, brand_id, product_id FROM stock_take_sessions WHERE id = :session_id
+        ),
+        scope AS (
+            SELECT i.id, i.barcode, i.product_id, i.design_number, i.size, i.color, i.cost_price, i.mrp, i.quantity
+            FROM inventory_items i
+            JOIN products p ON p.id = i.product_id
+            CROSS JOIN session s
+            WHERE (s.product_id IS NULL OR i.product_id = s.product_id)
+              AND (s.brand_id IS NULL OR p.brand_id = s.brand_id)
+        ),
+        moved AS (
+            SELECT m.inventory_item_id, SUM(m.quantity) AS quantity
+            FROM stock_movements m
+            CROSS JOIN session s
+            WHERE m.created_at > s.started_at
+            GROUP BY m.inventory_item_id
+        ),
+        counts AS (
+            SELECT barcode, counted FROM stock_take_counts WHERE session_id = :session_id
+        ),
+        lines AS (
+            SELECT COALESCE(sc.barcode, c.barcode) AS barcode,
+                   sc.id AS inventory_item_id,
+                   sc.product_id, sc.design_number, sc.size, sc.color, sc.cost_price, sc.mrp,
+                   CASE WHEN sc.id IS NULL THEN 0 ELSE sc.quantity - COALESCE(mv.quantity, 0) END AS expected,
+                   COALESCE(c.counted, 0) AS counted
+            FROM scope sc
+            LEFT JOIN moved mv ON mv.inventory_item_id = sc.id
+            FULL JOIN counts c ON c.barcode = sc.barcode
+        )
+        SELECT l.*,
+               l.counted - l.expected AS variance,
+               CASE
+                   WHEN l.inventory_item_id IS NULL AND i.id IS NULL THEN 'UNKNOWN'
+                   WHEN l.inventory_item_id IS NULL THEN 'OUT_OF_SCOPE'
+                   WHEN l.counted < l.expected THEN 'SHRINKAGE'
+                   WHEN l.counted > l.expected THEN 'EXCESS'
+                   ELSE 'MATCHED'
+               END AS status
+        FROM lines l
+        LEFT JOIN inventory_items i ON l.inventory_item_id IS NULL AND i.barcode = l.barcode
+        ORDER BY l.barcode
+    """)
+
+    def record_scans(self, db: Session, session: models.StockTakeSession, barcodes: List[str],
+                     batch_id: Optional[str] = None) -> Dict:
+        """Add a batch of scanned barcodes to the session's counts"""
+        if batch_id:
+            claimed = db.execute(self.CLAIM_BATCH_SQL, {
+                "session_id": session.id, "batch_id": batch_id, "scans": len(barcodes)
+            }).first()
+            if claimed is None:
+                return {"scans": len(barcodes), "distinct_barcodes": 0, "replayed": True}
+
+        counts = Counter(barcode.strip() for barcode in barcodes if barcode and barcode.strip())
+        if counts:
+            db.execute(self.MERGE_COUNTS_SQL, {
+                "session_id": session.id,
+                "barcodes": list(counts.keys()),
+                "counts": list(counts.values())
+            })
+        session.total_scans = (session.total_scans or 0) + sum(counts.values())
+        session.last_scan_at = func.now()
+        return {"scans": sum(counts.values()), "distinct_barcodes": len(counts), "replayed": False}
+
+    def variance(self, db: Session, session: models.StockTakeSession) -> List:
+        """Every line of the count: items in scope and every scanned barcode"""
+        return db.execute(self.VARIANCE_SQL, {"session_id": session.id}).mappings().all()
+
+    def summarize(self, lines) -> Dict:
+        """Totals for the shrinkage and excess reports, valued at cost and MRP"""
+        summary = {
+            "skus_in_scope": 0, "expected_quantity": 0, "counted_quantity": 0,
+            "matched_skus": 0, "shrinkage_skus": 0, "excess_skus": 0,
+            "unknown_barcodes": 0, "out_of_scope_barcodes": 0,
+            "shrinkage_quantity": 0, "shrinkage_cost_value": 0.0, "shrinkage_mrp_value": 0.0,
+            "excess_quantity": 0, "excess_cost_value": 0.0, "excess_mrp_value": 0.0
+        }
+        for line in lines:
+            status = line["status"]
+            summary["counted_quantity"] += line["counted"]
+            if status == "UNKNOWN":
+                summary["unknown_barcodes"] += 1
+                continue
+            if status == "OUT_OF_SCOPE":
+                summary["out_of_scope_barcodes"] += 1
+                continue
+            summary["skus_in_scope"] += 1
+            summary["expected_quantity"] += line["expected"]
+            if status == "MATCHED":
+                summary["matched_skus"] += 1
+                continue
+            kind = "shrinkage" if status == "SHRINKAGE" else "excess"
+            quantity = abs(line["variance"])
+            summary[f"{kind}_skus"] += 1
+            summary[f"{kind}_quantity"] += quantity
+            summary[f"{kind}_cost_value"] += quantity * line["cost_price"]
+            summary[f"{kind}_mrp_value"] += quantity * line["mrp"]
+        for key in ("shrinkage_cost_value", "shrinkage_mrp_value", "excess_cost_value", "excess_mrp_value"):
+            summary[key] = round(summary[key], 2)
+        return summary
+
+    def post(self, db: Session, session: models.StockTakeSession, lines, created_by: Optional[int] = None) -> int:
+        """Bring book stock in line with the count (one ADJUSTMENT per differing item); returns the number posted"""
+        adjustments = [
+            {"inventory_item_id": line["inventory_item_id"], "quantity": line["variance"], "reference_id": session.id}
+            for line in lines
+            if line["status"] in ("SHRINKAGE", "EXCESS")
+        ]
+        # The count is authoritative, so the adjustment is applied even if it takes an item below zero
+        stock_service.move(
+            db,
+            "ADJUSTMENT",
+            adjustments,
+            reference_type="STOCK_TAKE",
+            notes=f"Stock take: {session.name}",
+            created_by=created_by,
+            allow_negative=True
+        )
+        return len(adjustments)
+
+# Global stock take service instance
+stock_take_service = StockTakeService()
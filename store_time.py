@@ -0,0 +1,53 @@
+"""
+Store-local time helpers
+All business dates (financial year, "today") are taken in the store's timezone,
+not the server's.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy import and_
+
+from config import settings
+
+STORE_TZ = timezone(timedelta(minutes=settings.STORE_UTC_OFFSET_MINUTES))
+
+def store_now() -> datetime:
+    """Current time in the store's timezone"""
+    return datetime.now(STORE_TZ)
+
+def financial_year(when: Optional[datetime] = None) -> str:
+    """Indian financial year (April to March) label for a date, e.g. '2026-27'"""
+    when = when or store_now()
+    if when.tzinfo is not None:
+        when = when.astimezone(STORE_TZ)
+    start_year = when.year if when.month >= 4 else when.year - 1
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+def as_store_time(when: datetime) -> datetime:
+    """Treat naive datetimes (e.g. from query parameters) as store-local time"""
+    return when.replace(tzinfo=STORE_TZ) if when.tzinfo is None else when
+
+def store_day_start(when: Optional[datetime] = None) -> datetime:
+    """Midnight at the start of the store-local day containing `when` (default: today)"""
+    when = as_store_time(when) if when else store_now()
+    return when.astimezone(STORE_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def store_day_bounds(first_day: Optional[date] = None, last_day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    [start, end) instants covering the store-local days first_day..last_day inclusive
+    (default: today only)
+    """
+    first_day = first_day or store_now().date()
+    last_day = last_day or first_day
+    start = datetime(first_day.year, first_day.month, first_day.day, tzinfo=STORE_TZ)
+    end = datetime(last_day.year, last_day.month, last_day.day, tzinfo=STORE_TZ) + timedelta(days=1)
+    return start, end
+
+def on_store_days(column, first_day: Optional[date] = None, last_day: Optional[date] = None):
+    """
+    Filter a timestamp column to store-local days first_day..last_day (default: today).
+    A plain range on the column, so an index on it can be used, unlike func.date(column).
+    """
+    start, end = store_day_bounds(first_day, last_day)
+    return and_(column >= start, column < end)
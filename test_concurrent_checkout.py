@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for checkout and /inventory/subtract
+Fires parallel sales at the same barcodes and verifies stock never goes negative
+and never oversells. Run this against a running server (local by default).
+"""
+
+import os
+import uuid
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend URL
+BASE_URL = os.getenv("POS_BASE_URL", "http://localhost:8000")
+
+# Stress parameters
+STOCK_PER_BARCODE = 5
+BARCODES = 3
+PARALLEL_CHECKOUTS = 40
+PARALLEL_SUBTRACTS = 20
+
+def test_login():
+    """Test login to get a token"""
+    try:
+        login_data = {
+            "username": os.getenv("POS_USERNAME", "admin"),
+            "password": os.getenv("POS_PASSWORD", "admin123")
+        }
+        response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
+        print(f"Login: {response.status_code}")
+        if response.status_code == 200:
+            return response.json()["access_token"]
+        print(f"Login failed: {response.text}")
+        return None
+    except Exception as e:
+        print(f"Login error: {e}")
+        return None
+
+def create_stock(headers):
+    """Create a brand, product and a few barcodes with limited stock"""
+    suffix = uuid.uuid4().hex[:8].upper()
+    brand = requests.post(f"{BASE_URL}/brands/", json={"name": f"Stress-{suffix}"}, headers=headers).json()
+    product = requests.post(
+        f"{BASE_URL}/products/",
+        json={"brand_id": brand["id"], "type": "Shirt", "size_type": "ALPHA", "gst_rate": 12.0},
+        headers=headers
+    ).json()
+
+    barcodes = []
+    for i in range(BARCODES):
+        barcode = f"STRESS-{suffix}-{i}"
+        response = requests.post(f"{BASE_URL}/inventory/", json={
+            "product_id": product["id"],
+            "barcode": barcode,
+            "design_number": f"D-{suffix}",
+            "size": "M",
+            "color": "Black",
+            "cost_price": 400.0,
+            "mrp": 999.0,
+            "quantity": STOCK_PER_BARCODE
+        }, headers=headers)
+        if response.status_code != 201:
+            raise RuntimeError(f"Failed to create inventory item: {response.text}")
+        barcodes.append(barcode)
+    return barcodes
+
+def get_quantity(barcode):
+    """Read the current on-hand quantity of a barcode"""
+    response = requests.get(f"{BASE_URL}/inventory/barcode/{barcode}")
+    return response.json()["quantity"]
+
+def test_parallel_checkouts(headers, barcodes):
+    """Every checkout buys one piece of every barcode; only STOCK_PER_BARCODE can succeed"""
+    cart = {"items": [{"barcode": barcode, "quantity": 1} for barcode in barcodes], "payment_method": "CASH"}
+
+    def checkout(_):
+        return requests.post(f"{BASE_URL}/checkout/", json=cart, headers=headers).status_code
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_CHECKOUTS) as pool:
+        statuses = list(pool.map(checkout, range(PARALLEL_CHECKOUTS)))
+
+    succeeded = statuses.count(200)
+    rejected = statuses.count(400)
+    quantities = [get_quantity(barcode) for barcode in barcodes]
+    print(f"Checkouts: {succeeded} succeeded, {rejected} rejected, other: {len(statuses) - succeeded - rejected}")
+    print(f"Remaining stock: {quantities}")
+
+    assert succeeded == STOCK_PER_BARCODE, f"Expected {STOCK_PER_BARCODE} sales, got {succeeded}"
+    assert all(quantity == 0 for quantity in quantities), f"Stock mismatch: {quantities}"
+    return True
+
+def test_parallel_subtracts(headers, barcode):
+    """Parallel /inventory/subtract calls must never take stock below zero"""
+    def subtract(_):
+        return requests.post(
+            f"{BASE_URL}/inventory/subtract",
+            json={"barcode": barcode, "quantity": 1},
+            headers=headers
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_SUBTRACTS) as pool:
+        statuses = list(pool.map(subtract, range(PARALLEL_SUBTRACTS)))
+
+    succeeded = statuses.count(200)
+    quantity = get_quantity(barcode)
+    print(f"Subtracts: {succeeded} succeeded, remaining: {quantity}")
+
+    assert succeeded == STOCK_PER_BARCODE, f"Expected {STOCK_PER_BARCODE} subtracts, got {succeeded}"
+    assert quantity == 0, f"Stock mismatch: {quantity}"
+    return True
+
+def main():
+    print("🧪 Concurrency stress test")
+    print("=" * 50)
+
+    token = test_login()
+    if not token:
+        print("❌ Cannot continue without login")
+        return False
+    headers = {"Authorization": f"Bearer {token}"}
+
+    try:
+        test_parallel_checkouts(headers, create_stock(headers))
+        print("✅ Parallel checkouts never oversold")
+
+        test_parallel_subtracts(headers, create_stock(headers)[0])
+        print("✅ Parallel subtracts never went negative")
+        return True
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return False
+
+if __name__ == "__main__":
+    main()
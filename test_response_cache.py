@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the report response cache
+Checks hits, tag invalidation, coalescing of concurrent misses and that an
+unreachable backend (e.g. Redis down) serves responses uncached instead of failing.
+Runs in-process; no server or database needed.
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from response_cache import ResponseCache, MemoryCacheBackend
+
+class UnreachableBackend(MemoryCacheBackend):
+    """Backend whose every call fails, like a Redis client timing out"""
+    name = "unreachable"
+
+    def generations(self, tags):
+        raise ConnectionError("cache server timed out")
+
+    def get(self, key):
+        raise ConnectionError("cache server timed out")
+
+    def set(self, key, value, ttl_seconds):
+        raise ConnectionError("cache server timed out")
+
+    def bump(self, tags):
+        raise ConnectionError("cache server timed out")
+
+def test_hits_and_invalidation():
+    cache = ResponseCache(MemoryCacheBackend(100))
+    calls = []
+    compute = lambda: calls.append(1) or {"sales": len(calls)}
+    first = cache.get_or_compute("dashboard:sales", ["sales"], {}, 30, compute)
+    second = cache.get_or_compute("dashboard:sales", ["sales"], {}, 30, compute)
+    cache.invalidate(["stock"])
+    third = cache.get_or_compute("dashboard:sales", ["sales"], {}, 30, compute)
+    cache.invalidate(["sales"])
+    fourth = cache.get_or_compute("dashboard:sales", ["sales"], {}, 30, compute)
+    ok = first == second == third == {"sales": 1} and fourth == {"sales": 2}
+    print(f"Hits and invalidation: {'OK' if ok else 'FAILED'} ({len(calls)} computations)")
+    return ok
+
+def test_coalescing():
+    cache = ResponseCache(MemoryCacheBackend(100))
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"value": 1}
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(
+            lambda _: cache.get_or_compute("ml:stock-alerts", ["sales"], {}, 30, slow), range(8)
+        ))
+    ok = len(calls) == 1 and all(result == {"value": 1} for result in results)
+    print(f"Coalesced misses: {'OK' if ok else 'FAILED'} ({len(calls)} computations for 8 requests)")
+    return ok
+
+def test_unreachable_backend():
+    cache = ResponseCache(UnreachableBackend(100))
+    try:
+        results = [cache.get_or_compute("dashboard:sales", ["sales"], {"days": 7}, 30, lambda: {"sales": 1}) for _ in range(2)]
+        cache.invalidate(["sales"])
+    except Exception as e:
+        print(f"Unreachable backend: FAILED ({e})")
+        return False
+    errors = cache.stats()["endpoints"]["dashboard:sales"]["errors"]
+    ok = results == [{"sales": 1}, {"sales": 1}] and errors == 2
+    print(f"Unreachable backend: {'OK' if ok else 'FAILED'} (served uncached, {errors} errors counted)")
+    return ok
+
+if __name__ == "__main__":
+    print("🧪 Testing response cache...")
+    results = [test_hits_and_invalidation(), test_coalescing(), test_unreachable_backend()]
+    if not all(results):
+        print("❌ Response cache tests failed")
+        sys.exit(1)
+    print("✅ Response cache tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the WhatsApp outbox dispatcher
+Checks that a message whose delivery keeps raising backs off, stops after
+WHATSAPP_OUTBOX_MAX_ATTEMPTS and ends FAILED, and that a message left SENDING
+by a dead worker with no attempts left is failed instead of re-claimed.
+Runs against DATABASE_URL (use a disposable database); no messages are sent.
+"""
+
+import sys
+from sqlalchemy import text
+
+import models
+import database
+from config import settings
+from whatsapp_outbox import enqueue_whatsapp_message, whatsapp_dispatcher
+from whatsapp_service import whatsapp_service
+
+def queue_message(phone_number):
+    db = database.SessionLocal()
+    try:
+        whatsapp_log = enqueue_whatsapp_message(db, phone_number, "Thank you for shopping with us", "INVOICE")
+        db.commit()
+        return db.query(models.WhatsAppOutbox).filter(
+            models.WhatsAppOutbox.whatsapp_log_id == whatsapp_log.id
+        ).one().id
+    finally:
+        db.close()
+
+def outbox_row(outbox_id):
+    db = database.SessionLocal()
+    try:
+        entry = db.query(models.WhatsAppOutbox).filter(models.WhatsAppOutbox.id == outbox_id).one()
+        return entry.status, entry.attempts, entry.last_error, entry.whatsapp_log.status
+    finally:
+        db.close()
+
+def make_due(outbox_id):
+    """Skip the backoff so the next drain picks the message up again"""
+    db = database.SessionLocal()
+    try:
+        db.execute(text("UPDATE whatsapp_outbox SET next_attempt_at = now() WHERE id = :id"), {"id": outbox_id})
+        db.commit()
+    finally:
+        db.close()
+
+def unreachable(phone_number, message):
+    raise ConnectionError("messaging API unreachable")
+
+def test_delivery_keeps_raising():
+    outbox_id = queue_message("919000000101")
+    for _ in range(settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS + 3):
+        whatsapp_dispatcher.drain()
+        make_due(outbox_id)
+    status, attempts, last_error, log_status = outbox_row(outbox_id)
+    ok = status == "FAILED" and attempts == settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS and log_status == "FAILED"
+    print(f"Delivery keeps raising: {'OK' if ok else 'FAILED'} "
+          f"(status {status}, {attempts} attempts, last error: {last_error})")
+    return ok
+
+def test_abandoned_claim():
+    outbox_id = queue_message("919000000102")
+    db = database.SessionLocal()
+    try:
+        # As if the worker died mid-send on its last attempt and the lease ran out
+        db.execute(text("UPDATE whatsapp_outbox SET status = 'SENDING', attempts = :attempts WHERE id = :id"),
+                   {"attempts": settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS, "id": outbox_id})
+        db.commit()
+    finally:
+        db.close()
+    whatsapp_dispatcher.drain()
+    status, attempts, last_error, log_status = outbox_row(outbox_id)
+    ok = status == "FAILED" and attempts == settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS and log_status == "FAILED"
+    print(f"Abandoned last attempt: {'OK' if ok else 'FAILED'} (status {status}, {attempts} attempts)")
+    return ok
+
+if __name__ == "__main__":
+    print("🧪 Testing WhatsApp outbox retries...")
+    models.Base.metadata.create_all(bind=database.engine)
+    # Every delivery raises, as when the messaging API is unreachable
+    send_text_message = whatsapp_service.send_text_message
+    whatsapp_service.send_text_message = unreachable
+    try:
+        results = [test_delivery_keeps_raising(), test_abandoned_claim()]
+    finally:
+        whatsapp_service.send_text_message = send_text_message
+    if not all(results):
+        print("❌ WhatsApp outbox tests failed")
+        sys.exit(1)
+    print("✅ WhatsApp outbox tests passed")
@@ -0,0 +1,91 @@
+"""
+Variant Matrix
+Size x colour stock grid per design of a product, built from one grouped query over
+inventory_items instead of shipping every item to the browser. Matrices are cached
+per product and dropped whenever stock of that product moves (checkout, returns,
+receipts, adjustments, stock takes). Like the barcode cache, each worker has its own
+cache and the TTL bounds how long another worker can serve a stale grid.
+"""
+
+import re
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Dict, Any
+
+import models
+from barcode_cache import BarcodeCache
+from config import settings
+
+def _natural_key(size: str):
+    """Sizes outside the product's scale sort numerically where they are numbers (e.g. waist 31, 33)"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", size)]
+
+class VariantMatrixService:
+    def order_sizes(self, sizes, size_scale: List[str]) -> List[str]:
+        """Sizes in the order of the product's size scale, unknown sizes after them"""
+        position = {size: index for index, size in enumerate(size_scale)}
+        known = sorted((size for size in sizes if size in position), key=position.get)
+        unknown = sorted((size for size in sizes if size not in position), key=_natural_key)
+        return known + unknown
+
+    def build(self, db: Session, product: models.Product, size_scale: List[str]) -> Dict[str, Any]:
+        """
+        Grid of on-hand quantities for every design of a product. Each design has one
+        row per colour and one column per size; a cell is null when no such SKU exists
+        and 0 when it exists but is out of stock.
+        """
+        rows = db.query(
+            models.InventoryItem.design_number,
+            models.InventoryItem.size,
+            models.InventoryItem.color,
+            func.sum(models.InventoryItem.quantity).label("quantity"),
+            func.count(models.InventoryItem.id).label("skus")
+        ).filter(
+            models.InventoryItem.product_id == product.id
+        ).group_by(
+            models.InventoryItem.design_number,
+            models.InventoryItem.size,
+            models.InventoryItem.color
+        ).all()
+
+        sizes = self.order_sizes({row.size for row in rows}, size_scale)
+        colors = sorted({row.color for row in rows}, key=str.lower)
+        size_index = {size: index for index, size in enumerate(sizes)}
+        color_index = {color: index for index, color in enumerate(colors)}
+
+        designs = {}
+        size_totals = [0] * len(sizes)
+        for row in rows:
+            grid = designs.get(row.design_number)
+            if grid is None:
+                grid = designs[row.design_number] = [[None] * len(sizes) for _ in colors]
+            grid[color_index[row.color]][size_index[row.size]] = row.quantity
+            size_totals[size_index[row.size]] += row.quantity
+
+        return {
+            "product_id": product.id,
+            "product_name": product.name,
+            "size_type": product.size_type,
+            "sizes": sizes,
+            "colors": colors,
+            "designs": [
+                {
+                    "design_number": design_number,
+                    "quantities": grid,
+                    "total_quantity": sum(cell or 0 for cells in grid for cell in cells)
+                }
+                for design_number, grid in sorted(designs.items(), key=lambda design: _natural_key(design[0]))
+            ],
+            "size_totals": size_totals,
+            "total_quantity": sum(size_totals),
+            "sku_count": sum(row.skus for row in rows)
+        }
+
+# Global variant matrix service instance
+variant_matrix_service = VariantMatrixService()
+
+# Same LRU/TTL cache as the barcode lookups, keyed by product id
+variant_matrix_cache = BarcodeCache(
+    max_entries=settings.VARIANT_MATRIX_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.VARIANT_MATRIX_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,190 @@
+"""
+WhatsApp Outbox
+Messages are written to the outbox inside the business transaction (e.g. checkout)
+and delivered later by a background dispatcher, so slow messaging never blocks a sale.
+"""
+
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+import database
+from config import settings
+from whatsapp_service import whatsapp_service
+
+logger = logging.getLogger(__name__)
+
+# A claimed message is invisible to other dispatchers for this long; if the
+# worker dies mid-send the claim expires and the message is retried
+CLAIM_LEASE_SECONDS = 60
+
+def enqueue_whatsapp_message(
+    db: Session,
+    phone_number: str,
+    message: str,
+    message_type: str,
+    customer_id: Optional[int] = None,
+    invoice_id: Optional[int] = None,
+    template_id: Optional[int] = None
+) -> models.WhatsAppLog:
+    """Queue a WhatsApp message in the caller's transaction (does not commit)"""
+    whatsapp_log = models.WhatsAppLog(
+        customer_id=customer_id,
+        invoice_id=invoice_id,
+        template_id=template_id,
+        phone_number=phone_number,
+        message_type=message_type,
+        message_content=message,
+        status="PENDING"
+    )
+    db.add(whatsapp_log)
+    db.flush()
+    db.add(models.WhatsAppOutbox(whatsapp_log_id=whatsapp_log.id, status="PENDING", attempts=0))
+    return whatsapp_log
+
+class WhatsAppOutboxDispatcher:
+    # Due messages that have used every attempt (e.g. the worker kept dying mid-send)
+    EXPIRE_SQL = text("""
+        WITH expired AS (
+            UPDATE whatsapp_outbox
+            SET status = 'FAILED',
+                last_error = COALESCE(last_error, 'Delivery did not complete'),
+                updated_at = now()
+            WHERE status IN ('PENDING', 'SENDING') AND next_attempt_at <= now() AND attempts >= :max_attempts
+            RETURNING whatsapp_log_id
+        )
+        UPDATE whatsapp_logs SET status = 'FAILED'
+        WHERE id IN (SELECT whatsapp_log_id FROM expired)
+    """)
+    CLAIM_SQL = text("""
+        UPDATE whatsapp_outbox
+        SET status = 'SENDING',
+            attempts = attempts + 1,
+            next_attempt_at = now() + make_interval(secs => :lease),
+            updated_at = now()
+        WHERE id IN (
+            SELECT id FROM whatsapp_outbox
+            WHERE status IN ('PENDING', 'SENDING') AND next_attempt_at <= now() AND attempts < :max_attempts
+            ORDER BY id
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id
+    """)
+
+    def __init__(self):
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def claim_batch(self, db: Session, batch_size: int) -> List[int]:
+        """Claim up to batch_size due messages; safe to run from several workers at once"""
+        max_attempts = settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS
+        db.execute(self.EXPIRE_SQL, {"max_attempts": max_attempts})
+        rows = db.execute(self.CLAIM_SQL, {
+            "lease": CLAIM_LEASE_SECONDS, "batch_size": batch_size, "max_attempts": max_attempts
+        }).fetchall()
+        db.commit()
+        return [row.id for row in rows]
+
+    def deliver(self, db: Session, outbox_id: int):
+        """Send one claimed message and record the result on the outbox row and its WhatsApp log"""
+        entry = db.query(models.WhatsAppOutbox).filter(models.WhatsAppOutbox.id == outbox_id).first()
+        if entry is None:
+            return
+        whatsapp_log = entry.whatsapp_log
+
+        result = whatsapp_service.send_text_message(whatsapp_log.phone_number, whatsapp_log.message_content)
+
+        whatsapp_log.interakt_message_id = result.get("message_id")
+        whatsapp_log.error_message = result.get("error")
+        if result["success"]:
+            entry.status = "SENT"
+            entry.last_error = None
+            whatsapp_log.status = result["status"]
+            whatsapp_log.sent_at = datetime.now(timezone.utc)
+        else:
+            self._record_failure(entry, whatsapp_log, result.get("error"))
+        db.commit()
+
+    def record_error(self, db: Session, outbox_id: int, error: str):
+        """Record a delivery that raised, in a fresh transaction, so the row backs off or fails"""
+        entry = db.query(models.WhatsAppOutbox).filter(models.WhatsAppOutbox.id == outbox_id).first()
+        if entry is None:
+            return
+        entry.whatsapp_log.error_message = error
+        self._record_failure(entry, entry.whatsapp_log, error)
+        db.commit()
+
+    def _record_failure(self, entry: models.WhatsAppOutbox, whatsapp_log: models.WhatsAppLog, error: Optional[str]):
+        entry.last_error = error
+        if entry.attempts >= settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS:
+            entry.status = "FAILED"
+            whatsapp_log.status = "FAILED"
+        else:
+            # Exponential backoff before the next attempt
+            entry.status = "PENDING"
+            entry.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=2 ** entry.attempts * 5)
+
+    def drain(self, batch_size: Optional[int] = None) -> int:
+        """Deliver every message that is currently due; returns the number processed"""
+        batch_size = batch_size or settings.WHATSAPP_OUTBOX_BATCH_SIZE
+        processed = 0
+        db = database.SessionLocal()
+        try:
+            while not self._stop_event.is_set():
+                outbox_ids = self.claim_batch(db, batch_size)
+                if not outbox_ids:
+                    break
+                for outbox_id in outbox_ids:
+                    try:
+                        self.deliver(db, outbox_id)
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Error delivering WhatsApp outbox message {outbox_id}: {e}")
+                        try:
+                            self.record_error(db, outbox_id, str(e))
+                        except Exception as record_error:
+                            # The lease expires and the claim's attempt limit still applies
+                            db.rollback()
+                            logger.error(f"Error recording WhatsApp outbox failure {outbox_id}: {record_error}")
+                    processed += 1
+        finally:
+            db.close()
+        return processed
+
+    def run_forever(self):
+        """Poll the outbox until stop() is called"""
+        logger.info("WhatsApp outbox dispatcher started")
+        while not self._stop_event.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"WhatsApp outbox dispatcher error: {e}")
+            self._stop_event.wait(settings.WHATSAPP_OUTBOX_POLL_SECONDS)
+        logger.info("WhatsApp outbox dispatcher stopped")
+
+    def start(self):
+        """Start the dispatcher in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="whatsapp-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the dispatcher thread to stop and wait for it"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+# Global WhatsApp outbox dispatcher instance
+whatsapp_dispatcher = WhatsAppOutboxDispatcher()
+
+if __name__ == "__main__":
+    # Run as a standalone worker process
+    models.Base.metadata.create_all(bind=database.engine)
+    whatsapp_dispatcher.run_forever()